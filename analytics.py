@@ -0,0 +1,107 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from models import Employee
+from store import index_key
+
+# Fields employees can be grouped by in the analytics endpoints
+GROUP_FIELDS = ("department", "role", "status", "employment_type", "city", "is_active")
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# Headcount and salary figures of one group, kept current as employees change
+# Salaries are held in a sorted list, so percentiles are a lookup and an
+# update is a binary search plus one list insert or delete.
+class SalaryGroup:
+    __slots__ = ("count", "total", "salaries")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.salaries: List[float] = []
+
+    def add(self, salary: float) -> None:
+        self.count += 1
+        self.total += salary
+        insort(self.salaries, salary)
+
+    def remove(self, salary: float) -> None:
+        self.count -= 1
+        self.total -= salary
+        del self.salaries[bisect_left(self.salaries, salary)]
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Linearly interpolated q-th percentile (0-100) of the salaries"""
+        if not self.salaries:
+            return None
+        position = (len(self.salaries) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(self.salaries) - 1)
+        fraction = position - lower
+        return self.salaries[lower] + (self.salaries[upper] - self.salaries[lower]) * fraction
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 2),
+            "mean": round(self.total / self.count, 2) if self.count else None,
+            "min": self.salaries[0] if self.salaries else None,
+            "max": self.salaries[-1] if self.salaries else None,
+            "percentiles": {f"p{q:g}": self.percentile(q) for q in percentiles},
+        }
+
+# Aggregates over all employees, overall and grouped by each GROUP_FIELDS field
+# Built once from the store's contents and then subscribed to it: each write
+# moves the old record out of its groups and the new one in, so reading the
+# aggregates costs O(groups) however many employees there are.
+class EmployeeAggregates:
+    def __init__(self, employees: Iterable[Employee] = ()):
+        self.overall = SalaryGroup()
+        self._groups: Dict[str, Dict[object, SalaryGroup]] = {field: {} for field in GROUP_FIELDS}
+        self._lock = threading.Lock()
+        for employee in employees:
+            self._add(employee)
+
+    def _add(self, employee: Employee) -> None:
+        self.overall.add(employee.salary)
+        for field, groups in self._groups.items():
+            key = index_key(getattr(employee, field))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = SalaryGroup()
+            group.add(employee.salary)
+
+    def _remove(self, employee: Employee) -> None:
+        self.overall.remove(employee.salary)
+        for field, groups in self._groups.items():
+            key = index_key(getattr(employee, field))
+            group = groups[key]
+            group.remove(employee.salary)
+            if not group.count:
+                del groups[key]
+
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        with self._lock:
+            if old is not None:
+                self._remove(old)
+            if new is not None:
+                self._add(new)
+
+    def headcount(self, by: str) -> Dict[str, int]:
+        with self._lock:
+            return {str(key): group.count for key, group in sorted(self._groups[by].items(), key=_group_order)}
+
+    def salary(self, by: Optional[str], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        """{"overall": summary, "groups": {value: summary}} (no groups if `by` is None)"""
+        with self._lock:
+            groups = {}
+            if by is not None:
+                groups = {
+                    str(key): group.summary(percentiles)
+                    for key, group in sorted(self._groups[by].items(), key=_group_order)
+                }
+            return {"overall": self.overall.summary(percentiles), "groups": groups}
+
+# Groups are listed by value (mixed types compare as strings)
+def _group_order(item):
+    return str(item[0])
@@ -1,11 +1,21 @@
+import asyncio
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status, Security, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthorizationCredentials, HTTPBasic, HTTPBasicCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.requests import cookie_parser
 from pydantic import BaseModel
 import secrets
+import threading
+import time
+
+from metrics import stage, timed
 
 # Security settings
 # SECRET_KEY: Used for signing JWT tokens - should be kept secret in production
@@ -15,6 +25,19 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours instead of 30 minutes
 
+# Verified-token cache
+# TOKEN_CACHE_SIZE: Most tokens remembered at once (least recently used go first)
+# TOKEN_CACHE_TTL: Lifetime in seconds of tokens that carry no "exp" claim
+TOKEN_CACHE_SIZE = 4096
+TOKEN_CACHE_TTL = 300
+
+# Password hashing pool
+# HASH_WORKERS: Threads that run bcrypt (each hash or verify takes tens of ms)
+# HASH_QUEUE_LIMIT: Requests allowed to wait for a free thread; past that,
+#   logins are turned away (429) instead of piling up behind a login storm
+HASH_WORKERS = int(os.environ.get("HR_HASH_WORKERS", "4"))
+HASH_QUEUE_LIMIT = int(os.environ.get("HR_HASH_QUEUE_LIMIT", "32"))
+
 # Password hashing
 # pwd_context: Handles password hashing and verification using bcrypt
 # oauth2_scheme: FastAPI dependency that extracts the JWT token from the Authorization header
@@ -41,7 +64,7 @@ async def get_current_user_basic(credentials: HTTPBasicCredentials = Depends(sec
         )
     
     # Return the user from the database
-    user = get_user(fake_users_db, username=credentials.username)
+    user = get_cached_user(credentials.username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -93,10 +116,12 @@ fake_users_db = {
 
 # Helper functions
 # Verifies if a plain password matches a hashed password
+@timed("auth.bcrypt_verify")
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 # Generates a password hash using bcrypt
+@timed("auth.bcrypt_hash")
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -107,6 +132,179 @@ def get_user(db, username: str):
         return UserInDB(**user_dict)
     return None
 
+# Verifying a JWT and building a UserInDB model on every request is a
+# measurable share of a protected request's CPU, so both results are cached:
+# token -> username until the token expires, username -> UserInDB until the
+# user changes. Cached users are shared between requests; treat them as read-only.
+class TokenCache:
+    """Bounded LRU cache of verified tokens, each kept until its expiry"""
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[str]:
+        """Return the username of a cached, unexpired token, or None"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, username = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return username
+
+    def put(self, token: str, username: str, expires_at: Optional[float]) -> None:
+        if expires_at is None:
+            expires_at = time.time() + TOKEN_CACHE_TTL
+        with self._lock:
+            self._entries[token] = (expires_at, username)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, username: str) -> None:
+        """Forget every token issued to `username`"""
+        with self._lock:
+            for token in [token for token, entry in self._entries.items() if entry[1] == username]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache()
+_user_cache: Dict[str, UserInDB] = {}
+
+# Retrieves a user from fake_users_db, reusing the model built last time
+def get_cached_user(username: str):
+    user = _user_cache.get(username)
+    if user is None:
+        user = get_user(fake_users_db, username)
+        if user is not None:
+            _user_cache[username] = user
+    return user
+
+# Must be called whenever a user in fake_users_db changes (disabled, edited or
+# removed), so no cached token keeps resolving to the old user
+def invalidate_user(username: str):
+    _user_cache.pop(username, None)
+    token_cache.discard_user(username)
+
+# Updates fields of a stored user, e.g. update_user("admin", disabled=True)
+def update_user(username: str, **changes):
+    fake_users_db[username].update(changes)
+    invalidate_user(username)
+
+# Returns the user a token belongs to, or None if the token is invalid,
+# expired or its user no longer exists
+def get_user_from_token(token: str):
+    username = token_cache.get(token)
+    if username is None:
+        try:
+            with stage("auth.jwt_decode"):
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        username = payload.get("sub")
+        if username is None:
+            return None
+        username = TokenData(username=username).username
+        token_cache.put(token, username, payload.get("exp"))
+    return get_cached_user(username)
+
+# bcrypt holds a thread for tens of milliseconds; run on the event loop it
+# would stall every other request on the worker. The pool runs it on a fixed
+# set of threads, admits at most `queue_limit` waiting requests on top of
+# those, and records how long requests waited and how long hashing took.
+class HashPoolSaturated(Exception):
+    """Raised when the password hashing pool has no room for another request"""
+
+class LatencyStats:
+    """Count, total and maximum of observed durations in seconds"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+        }
+
+class PasswordHashPool:
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self.queue_wait = LatencyStats()
+        self.hash_latency = LatencyStats()
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool; raise HashPoolSaturated if it is full"""
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HashPoolSaturated()
+            self._in_flight += 1
+        future = self._executor.submit(self._timed, time.perf_counter(), func, *args)
+        # Released on completion or cancellation, even if the call never ran
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _timed(self, submitted: float, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.queue_wait.observe(started - submitted)
+                self.hash_latency.observe(finished - started)
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self.workers, 0),
+                "rejected": self.rejected,
+                "queue_wait": self.queue_wait.as_dict(),
+                "hash_latency": self.hash_latency.as_dict(),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+hash_pool = PasswordHashPool()
+
+# Async variants of the password helpers for use in endpoints; they run
+# bcrypt on hash_pool and may raise HashPoolSaturated
+async def verify_password_async(plain_password, hashed_password):
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await hash_pool.run(get_password_hash, password)
+
 # Authenticates a user by verifying username and password
 def authenticate_user(db, username: str, password: str):
     user = get_user(db, username)
@@ -116,6 +314,15 @@ def authenticate_user(db, username: str, password: str):
         return False
     return user
 
+# Same as authenticate_user, with the password check run on hash_pool
+async def authenticate_user_async(db, username: str, password: str):
+    user = get_user(db, username)
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
 # Creates a JWT access token with optional expiration time
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -124,29 +331,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with stage("auth.jwt_encode"):
+        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 # FastAPI dependency that extracts and validates the JWT token
 # Returns the current authenticated user or raises an exception
+@timed("auth.bearer_user")
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        # Handle invalid tokens
-        raise credentials_exception
-    # Get the user from the database
-    user = get_user(fake_users_db, username=token_data.username)
+    # Verify the token and get its user (cached until the token expires)
+    user = get_user_from_token(token) if token else None
     if user is None:
         raise credentials_exception
     return user
@@ -158,7 +357,87 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+# Request state key (request.state.access_token) of the resolved token
+ACCESS_TOKEN_STATE_KEY = "access_token"
+
+# Returns the token of an "Authorization: Bearer <token>" header value, or None
+def _parse_bearer(value: bytes) -> Optional[str]:
+    scheme, _, param = value.decode("latin-1").partition(" ")
+    if scheme.lower() == "bearer" and param:
+        return param
+    return None
+
+def has_bearer_token(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization" and _parse_bearer(value):
+            return True
+    return False
+
+# Returns the access token of a request from the ASGI scope: the access_token
+# cookie, else the session (when SessionMiddleware has run), else the
+# Authorization Bearer header. The cookie and session win over the header, as
+# when their token used to be copied over the Authorization header. Raw
+# headers are scanned in place, not copied.
+def resolve_access_token(scope) -> Optional[str]:
+    cookie_header = None
+    bearer = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            bearer = bearer or _parse_bearer(value)
+        elif name == b"cookie":
+            cookie_header = value
+    if cookie_header is not None:
+        token = cookie_parser(cookie_header.decode("latin-1")).get("access_token")
+        if token:
+            return token
+    session = scope.get("session")
+    if session:
+        token = session.get("access_token")
+        if token:
+            return token
+    return bearer
+
+# Pure ASGI middleware that resolves the access token once per request and
+# stores it in request state for get_current_user_from_token. Add it before
+# SessionMiddleware so it runs inside it and can see the session.
+class TokenResolverMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            with stage("auth.resolve_token"):
+                scope.setdefault("state", {})[ACCESS_TOKEN_STATE_KEY] = resolve_access_token(scope)
+        await self.app(scope, receive, send)
+
+# Session modes (HR_SESSION_MODE) for SelectiveSessionMiddleware
+# always: every request goes through the session layer
+# browser: requests with a Bearer token skip it (no cookie to verify, no
+#   Set-Cookie to sign); browsers and Swagger UI keep their session
+# off: no sessions at all; tokens come from the header or the cookie
+SESSION_MODES = ("always", "browser", "off")
+
+# Pure ASGI wrapper that runs SessionMiddleware only for requests that need a
+# session, as chosen by `mode`; other requests go straight to the app with no
+# "session" in scope
+class SelectiveSessionMiddleware:
+    def __init__(self, app, mode: str = "browser", **session_options):
+        if mode not in SESSION_MODES:
+            raise ValueError(f"Unknown session mode {mode!r}; use one of {', '.join(SESSION_MODES)}")
+        self.app = app
+        self.mode = mode
+        self.session_app = SessionMiddleware(app, **session_options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+        elif self.mode == "always" or (self.mode == "browser" and not has_bearer_token(scope)):
+            await self.session_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
 # Function to get current user from token (JWT)
+@timed("auth.current_user")
 async def get_current_user_from_token(
     request: Request,
     token: str = Depends(oauth2_scheme)
@@ -169,29 +448,22 @@ async def get_current_user_from_token(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # If no token in header, try to get from cookie or session
-    if not token:
-        token = request.cookies.get("access_token")
-        if not token and "session" in request.scope:
-            try:
-                token = request.session.get("access_token")
-            except Exception:
-                pass
+    # TokenResolverMiddleware has already looked in the cookie, session and
+    # header; without it, look here in the same order
+    state = request.scope.get("state", {})
+    if ACCESS_TOKEN_STATE_KEY in state:
+        token = state[ACCESS_TOKEN_STATE_KEY]
+    else:
+        token = resolve_access_token(request.scope)
     
     if not token:
         raise credentials_exception
         
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-        
-    user = get_user(fake_users_db, username=username)
+    user = get_user_from_token(token)
     if user is None:
         raise credentials_exception
+    if user.disabled:
+        raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
 # Function to get current user from bearer token
@@ -212,18 +484,8 @@ def _process_token(token: str):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        # Handle invalid tokens
-        raise credentials_exception
-    # Get the user from the database
-    user = get_user(fake_users_db, username=token_data.username)
+    # Verify the token and get its user (cached until the token expires)
+    user = get_user_from_token(token) if token else None
     if user is None:
         raise credentials_exception
     return user
@@ -0,0 +1,316 @@
+"""
+API throughput and latency under a mixed workload, plus micro-benchmarks
+
+For each dataset size the app (main.app) starts in a fresh process on that
+many generated employees (the bulk generator's output, so a million rows load
+in seconds) and concurrent clients replay a seeded mix of requests against it
+in process, through httpx's ASGI transport:
+  login              POST /login                                  2%
+  list               GET /employees/?skip=...&limit=50           20%
+  get                GET /employees/{employee_id}                45%
+  change_department  PUT /employees/{employee_id}/change-department  15%
+  resign             PUT /employees/{employee_id}/resign          5%
+  create             POST /employees/                            13%
+Requests go through the whole ASGI stack (middleware, auth, validation,
+serialization, the store and its write-ahead log) but no HTTP server or
+network. Throughput and p50/p99 latency are reported per endpoint.
+
+Micro-benchmarks then time, on the same data, the data-access functions the
+endpoints call, Employee.model_validate, and JWT encode/decode.
+
+Results are saved as JSON (with the commit, Python version and settings);
+--compare prints the change against an earlier results file and flags
+regressions. The storage backend and record format follow HR_STORAGE_BACKEND
+and HR_RECORD_FORMAT as for the app.
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m benchmarks.api --rows 10000 100000 1000000
+    python -m benchmarks.api --rows 10000 --compare benchmarks/results/api-20261017-120000.json
+    HR_STORAGE_BACKEND=sqlite python -m benchmarks.api --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+
+from benchmarks.search import percentile
+
+WORKLOAD = {"login": 2, "list": 20, "get": 45, "change_department": 15, "resign": 5, "create": 13}
+DEPARTMENTS = ("Engineering", "HR", "Sales", "Design", "Data")
+LOGIN = {"username": "admin", "password": "adminpassword"}
+AS_OF = date(2026, 1, 1)  # Generated data is drawn relative to a fixed date
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+# Dataset: generated straight into the storage the app starts from
+def prepare_data(directory: str, rows: int, seed: int) -> None:
+    from generate_employees import save_employees_bulk
+    from persistence import SNAPSHOT_FILE
+
+    data_dir = os.path.join(directory, "data")
+    os.makedirs(data_dir)
+    os.environ["HR_DATA_DIR"] = data_dir
+    if os.environ.get("HR_STORAGE_BACKEND", "memory") == "sqlite":
+        seed_file = os.path.join(directory, "employees.ndjson")
+        save_employees_bulk(rows, seed_file, "ndjson", seed, as_of=AS_OF)
+        os.environ["HR_SEED_FILE"] = seed_file
+    else:
+        save_employees_bulk(rows, os.path.join(data_dir, SNAPSHOT_FILE), "snapshot", seed, as_of=AS_OF)
+
+def summarize(timings, elapsed: float, errors: int = 0) -> dict:
+    timings = sorted(timings)
+    if not timings:
+        return {"count": 0, "errors": errors}
+    return {
+        "count": len(timings),
+        "errors": errors,
+        "throughput": round(len(timings) / elapsed, 1),
+        "mean_ms": round(sum(timings) / len(timings) * 1e3, 3),
+        "p50_ms": round(percentile(timings, 50) * 1e3, 3),
+        "p99_ms": round(percentile(timings, 99) * 1e3, 3),
+    }
+
+# HTTP workload
+async def replay(main, rows: int, requests: int, clients: int, warmup: int, seed: int) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/login", data=LOGIN)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        template = (await client.get("/employees/EMP1001", headers=headers)).json()
+        template["employee_id"] = ""
+        names, weights = list(WORKLOAD), list(WORKLOAD.values())
+        timings = {name: [] for name in WORKLOAD}
+        errors = Counter()
+
+        def random_id(rng):
+            return f"EMP{1000 + rng.randint(1, rows)}"
+
+        def send(name, rng):
+            if name == "login":
+                return client.post("/login", data=LOGIN)
+            if name == "list":
+                return client.get("/employees/", params={"skip": rng.randrange(min(rows, 10_000)), "limit": 50},
+                                  headers=headers)
+            if name == "get":
+                return client.get(f"/employees/{random_id(rng)}", headers=headers)
+            if name == "change_department":
+                return client.put(f"/employees/{random_id(rng)}/change-department",
+                                  json={"department": rng.choice(DEPARTMENTS)}, headers=headers)
+            if name == "resign":
+                return client.put(f"/employees/{random_id(rng)}/resign", headers=headers)
+            return client.post("/employees/", json=template, headers=headers)
+
+        async def run_client(index, count, record):
+            rng = random.Random(f"{seed}-{index}-{record}")
+            for _ in range(count):
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                response = await send(name, rng)
+                elapsed = time.perf_counter() - start
+                if record:
+                    timings[name].append(elapsed)
+                    if response.status_code >= 400:
+                        errors[name] += 1
+
+        await asyncio.gather(*(run_client(index, warmup // clients, False) for index in range(clients)))
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client(index, requests // clients, True) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    every = [timing for values in timings.values() for timing in values]
+    return {
+        "clients": clients,
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(every, elapsed, sum(errors.values())),
+        "endpoints": {name: summarize(values, elapsed, errors[name]) for name, values in timings.items()},
+    }
+
+# Micro-benchmarks
+def time_calls(func, calls: int) -> dict:
+    timings = []
+    for call in range(calls):
+        start = time.perf_counter()
+        func(call)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "calls": calls,
+        "ops_per_s": round(calls / sum(timings), 1),
+        "p50_us": round(percentile(timings, 50) * 1e6, 2),
+        "p99_us": round(percentile(timings, 99) * 1e6, 2),
+    }
+
+def run_micro(main, rows: int, calls: int, seed: int) -> dict:
+    from jose import jwt
+
+    from auth import ALGORITHM, SECRET_KEY, create_access_token
+    from models import Employee
+
+    rng = random.Random(seed)
+    ids = [f"EMP{1000 + rng.randint(1, rows)}" for _ in range(calls)]
+    template = main.get_employee_by_id("EMP1001")
+    raw = template.model_dump(mode="json")
+    token = create_access_token({"sub": "admin"})
+    benchmarks = {
+        "get_employee_by_id": lambda call: main.get_employee_by_id(ids[call]),
+        "get_employees": lambda call: main.get_employees(skip=call % min(rows, 10_000), limit=100),
+        "find_employees": lambda call: main.find_employees({"department": DEPARTMENTS[call % 5]}, limit=100),
+        "get_employee_page": lambda call: main.get_employee_page(after=ids[call], limit=100),
+        "employee_model_validate": lambda call: Employee.model_validate(raw),
+        "jwt_encode": lambda call: create_access_token({"sub": "admin"}),
+        "jwt_decode": lambda call: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]),
+        # Writes last, so the reads above see the generated data only
+        "update_employee": lambda call: main.update_employee(ids[call], {"department": DEPARTMENTS[call % 5]}),
+        "create_employee": lambda call: main.create_employee(template),
+    }
+    return {name: time_calls(func, calls) for name, func in benchmarks.items()}
+
+# One dataset, run in a fresh process: main.py builds its store and indexes
+# at import, from the environment prepare_data sets up
+def run_dataset(rows: int, requests: int, clients: int, warmup: int, micro_calls: int, seed: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        prepare_data(directory, rows, seed)
+        generated = time.perf_counter() - start
+        start = time.perf_counter()
+        import main
+        loaded = time.perf_counter() - start
+        try:
+            http = asyncio.run(replay(main, rows, requests, clients, warmup, seed))
+            micro = run_micro(main, rows, micro_calls, seed)
+        finally:
+            if main.persistence is not None:
+                main.persistence.close(compact=False)
+            else:
+                main.employees_db.close()
+    return {
+        "rows": rows,
+        "generate_s": round(generated, 2),
+        "startup_s": round(loaded, 2),
+        "http": http,
+        "micro": micro,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Comparison with an earlier run
+# (metric, True when higher is better) for each figure compared
+HTTP_METRICS = (("throughput", True), ("p50_ms", False), ("p99_ms", False))
+MICRO_METRICS = (("ops_per_s", True), ("p50_us", False), ("p99_us", False))
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Print the change of every figure against `baseline`; return how many regressed"""
+    regressions = 0
+    for rows, dataset in current["datasets"].items():
+        old = baseline.get("datasets", {}).get(rows)
+        if old is None:
+            continue
+        print(f"rows {rows} vs {baseline['meta'].get('commit') or 'baseline'}:")
+        sections = [(f"http {name}", old["http"]["endpoints"].get(name), figures, HTTP_METRICS)
+                    for name, figures in dataset["http"]["endpoints"].items()]
+        sections.insert(0, ("http total", old["http"]["total"], dataset["http"]["total"], HTTP_METRICS))
+        sections += [(f"micro {name}", old["micro"].get(name), figures, MICRO_METRICS)
+                     for name, figures in dataset["micro"].items()]
+        for label, before, after, metrics in sections:
+            if not before:
+                continue
+            changes = []
+            for metric, higher_is_better in metrics:
+                if not before.get(metric) or after.get(metric) is None:
+                    continue
+                change = after[metric] / before[metric] - 1
+                worse = -change if higher_is_better else change
+                flag = ""
+                if worse > threshold:
+                    flag = " REGRESSION"
+                    regressions += 1
+                changes.append(f"{metric} {before[metric]:g} -> {after[metric]:g} ({change:+.0%}){flag}")
+            print(f"  {label:<32} " + "  ".join(changes))
+    return regressions
+
+def print_dataset(dataset: dict) -> None:
+    http = dataset["http"]
+    total = http["total"]
+    print(f"rows: {dataset['rows']}  (generated in {dataset['generate_s']:.1f} s, app started in "
+          f"{dataset['startup_s']:.1f} s)")
+    print(f"  http: {total['count']} requests from {http['clients']} clients in {http['elapsed_s']:.1f} s, "
+          f"{total['throughput']:.0f} req/s, p50 {total['p50_ms']:.2f} ms, p99 {total['p99_ms']:.2f} ms, "
+          f"{total['errors']} errors")
+    for name, figures in http["endpoints"].items():
+        if figures["count"]:
+            print(f"    {name:<18} {figures['count']:6d} req  {figures['throughput']:8.0f} req/s  "
+                  f"p50 {figures['p50_ms']:8.2f} ms  p99 {figures['p99_ms']:8.2f} ms  {figures['errors']} errors")
+    print("  micro:")
+    for name, figures in dataset["micro"].items():
+        print(f"    {name:<24} {figures['ops_per_s']:12.0f} ops/s  p50 {figures['p50_us']:9.1f} us  "
+              f"p99 {figures['p99_us']:9.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--requests", type=int, default=5000, help="measured HTTP requests per dataset")
+    parser.add_argument("--warmup", type=int, default=500, help="HTTP requests sent before measuring")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent HTTP clients")
+    parser.add_argument("--micro-calls", type=int, default=2000, help="calls per micro-benchmark")
+    parser.add_argument("--seed", type=int, default=42, help="seed for the data and the request mix")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/api-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="relative change counted as a regression when comparing (default 0.20)")
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    results = {
+        "meta": {
+            "started": started.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "storage_backend": os.environ.get("HR_STORAGE_BACKEND", "memory"),
+            "record_format": os.environ.get("HR_RECORD_FORMAT", "model"),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "datasets": {},
+    }
+    spawn = multiprocessing.get_context("spawn")
+    for rows in args.rows:
+        with ProcessPoolExecutor(1, mp_context=spawn) as executor:
+            dataset = executor.submit(run_dataset, rows, args.requests, args.clients, args.warmup,
+                                      args.micro_calls, args.seed).result()
+        results["datasets"][str(rows)] = dataset
+        print_dataset(dataset)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"api-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"{regressions} figures regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Memory per employee for each in-memory representation
+
+Measures, with tracemalloc, what stays allocated after loading N employees:
+  dicts     the parsed JSON dicts the service used to keep (22 keys each)
+  model     EmployeeStore: validated Employee models (HR_RECORD_FORMAT=model)
+  compact   CompactEmployeeStore: slotted records with interned strings
+            (HR_RECORD_FORMAT=compact)
+The two stores include their indexes and ID ordering. Every representation is
+loaded from freshly parsed JSON, so no strings are shared between runs.
+
+Run from the repository root:
+    python -m benchmarks.memory --rows 100000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.startup import make_rows
+from store import CompactEmployeeStore, EmployeeStore
+
+def retained_bytes(text: str, build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = json.loads(text)
+    kept = build(rows)
+    del rows
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    text = json.dumps(make_rows(args.rows))
+    results = {
+        "dicts": retained_bytes(text, lambda rows: list(rows)),
+        "model": retained_bytes(text, EmployeeStore),
+        "compact": retained_bytes(text, CompactEmployeeStore),
+    }
+    print(f"rows: {args.rows}")
+    for name, size in results.items():
+        per_row = size / args.rows
+        print(f"  {name:<8} {size / 1e6:9.1f} MB  {per_row:8.0f} bytes/employee  "
+              f"{results['dicts'] / size:5.2f}x vs dicts")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Requests per second through the token-resolution middleware
+
+Compares the old add_token_to_header middleware (a BaseHTTPMiddleware that
+rebuilt the raw header list to inject the cookie token as an Authorization
+header) with TokenResolverMiddleware (pure ASGI, resolves the token once and
+stores it in request state). Both apps serve one protected route behind
+SessionMiddleware; requests are driven straight through the ASGI interface,
+so the figures are framework overhead only, no HTTP server or network.
+
+Run from the repository root:
+    python -m benchmarks.middleware --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import Depends, FastAPI, Request
+from starlette.middleware.sessions import SessionMiddleware
+
+from auth import TokenResolverMiddleware, create_access_token, get_current_user_from_token
+
+def make_app(resolver: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/protected")
+    async def protected(user=Depends(get_current_user_from_token)):
+        return {"username": user.username}
+
+    if resolver:
+        app.add_middleware(TokenResolverMiddleware)
+    app.add_middleware(SessionMiddleware, secret_key="benchmark")
+    if not resolver:
+        @app.middleware("http")
+        async def add_token_to_header(request: Request, call_next):
+            token = request.cookies.get("access_token")
+            if not token and "session" in request.scope:
+                try:
+                    token = request.session.get("access_token")
+                except Exception:
+                    pass
+            if token:
+                try:
+                    request.headers.__dict__["_list"] = [
+                        (k, v) for k, v in request.headers.__dict__["_list"]
+                        if k.decode().lower() != "authorization"
+                    ]
+                    request.headers.__dict__["_list"].append(
+                        (b"authorization", f"Bearer {token}".encode())
+                    )
+                except Exception:
+                    pass
+            return await call_next(request)
+    return app
+
+def make_scope(headers):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/protected", "raw_path": b"/protected",
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+async def requests_per_second(app, headers, count: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(make_scope(list(headers)), receive, send)
+    elapsed = time.perf_counter() - start
+    assert set(status) == {200}, set(status)
+    return count / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "admin"})
+    cases = {
+        "bearer header": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())],
+        "cookie": [(b"host", b"testserver"), (b"cookie", f"access_token={token}".encode())],
+    }
+    apps = {"before": make_app(resolver=False), "after": make_app(resolver=True)}
+    for case, headers in cases.items():
+        results = {}
+        for name, app in apps.items():
+            asyncio.run(requests_per_second(app, headers, 200))  # warm up
+            results[name] = asyncio.run(requests_per_second(app, headers, args.requests))
+        print(f"{case}:")
+        print(f"  before (BaseHTTPMiddleware header rewrite): {results['before']:8.0f} req/s")
+        print(f"  after  (ASGI token resolver):               {results['after']:8.0f} req/s")
+        print(f"  speedup: {results['after'] / results['before']:.2f}x")
+
+if __name__ == "__main__":
+    main()
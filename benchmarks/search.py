@@ -0,0 +1,86 @@
+"""
+Search index latency at scale
+
+Builds a SearchIndex over N synthetic employees (names drawn from Faker
+pools the size of a large workforce's) and times queries of each kind:
+  prefix    the first 1-4 letters of a first or last name
+  exact     a full first or last name
+  full      "first last" (two tokens, intersected)
+  typo      a name with one letter replaced (fuzzy trigram matching)
+  id        an employee ID prefix ("EMP12345" or just "12345")
+Latencies are for SearchIndex.search() with the endpoint's default limit (20).
+The index only reads the three searched fields, so rows are plain tuples.
+
+Run from the repository root:
+    python -m benchmarks.search --rows 1000000
+"""
+import argparse
+import random
+import string
+import time
+from collections import namedtuple
+
+from faker import Faker
+
+from search_index import SearchIndex
+from store import EMPLOYEE_ID_PREFIX, FIRST_EMPLOYEE_NUMBER
+
+Row = namedtuple("Row", "employee_id first_name last_name")
+
+def make_rows(count: int, seed: int = 42):
+    fake = Faker()
+    fake.seed_instance(seed)
+    first_names = list({fake.first_name() for _ in range(20_000)})
+    last_names = list({fake.last_name() for _ in range(50_000)})
+    rng = random.Random(seed)
+    rows = [
+        Row(f"{EMPLOYEE_ID_PREFIX}{FIRST_EMPLOYEE_NUMBER + number}", rng.choice(first_names), rng.choice(last_names))
+        for number in range(count)
+    ]
+    return rows, first_names, last_names
+
+def make_queries(rows, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    queries = {kind: [] for kind in ("prefix", "exact", "full", "typo", "id")}
+    for _ in range(count):
+        row = rng.choice(rows)
+        name = rng.choice((row.first_name, row.last_name))
+        queries["prefix"].append(name[:rng.randint(1, 4)])
+        queries["exact"].append(name)
+        queries["full"].append(f"{row.first_name} {row.last_name}")
+        position = rng.randrange(len(name))
+        queries["typo"].append(name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:])
+        id_prefix = row.employee_id[:rng.randint(len(EMPLOYEE_ID_PREFIX) + 2, len(row.employee_id))]
+        if rng.random() < 0.5:
+            id_prefix = id_prefix[len(EMPLOYEE_ID_PREFIX):]
+        queries["id"].append(id_prefix)
+    return queries
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000, help="queries of each kind")
+    args = parser.parse_args()
+
+    rows, first_names, last_names = make_rows(args.rows)
+    start = time.perf_counter()
+    index = SearchIndex(rows)
+    build = time.perf_counter() - start
+    print(f"rows: {args.rows}  ({len(first_names)} first names, {len(last_names)} last names)")
+    print(f"index build: {build:.1f} s")
+
+    for kind, queries in make_queries(rows, args.queries).items():
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"  {kind:<7} p50 {percentile(timings, 50) * 1e6:7.0f} us   p99 {percentile(timings, 99) * 1e6:7.0f} us   "
+              f"max {timings[-1] * 1e6:7.0f} us")
+
+if __name__ == "__main__":
+    main()
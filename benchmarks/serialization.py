@@ -0,0 +1,62 @@
+"""
+Per-row cost of serializing employees on the read path
+
+Compares the old GET /employees/ path (model_validate every stored dict, then
+let FastAPI validate and encode the response_model again) with the current one
+(records are stored as validated Employee models and dumped straight to JSON
+bytes with a TypeAdapter).
+
+Run from the repository root:
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from generate_employees import generate_employees
+from models import Employee
+
+employee_list_adapter = TypeAdapter(List[Employee])
+
+# Old read path: re-validate each stored dict, then what FastAPI does for
+# response_model=List[Employee] (validate, encode, json.dumps)
+def serialize_before(rows: List[dict]) -> bytes:
+    models = [Employee.model_validate(row) for row in rows]
+    validated = employee_list_adapter.validate_python(models)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+# New read path: rows are already Employee models
+def serialize_after(rows: List[Employee]) -> bytes:
+    return employee_list_adapter.dump_json(rows)
+
+def time_per_row(func, rows, repeat: int) -> float:
+    """Best-of-`repeat` time per row in microseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per response (the limit parameter)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    raw_rows = generate_employees(args.rows)
+    models = [Employee.model_validate(row) for row in raw_rows]
+
+    before = time_per_row(serialize_before, raw_rows, args.repeat)
+    after = time_per_row(serialize_after, models, args.repeat)
+    print(f"rows per response: {args.rows}")
+    print(f"before (validate + response_model): {before:8.2f} us/row")
+    print(f"after  (TypeAdapter.dump_json):     {after:8.2f} us/row")
+    print(f"speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
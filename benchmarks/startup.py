@@ -0,0 +1,87 @@
+"""
+Time to load the employee table at startup
+
+Compares the three ways the service has loaded its data:
+  json      json.load of an employees JSON file, convert, validate every record
+  ndjson    the NDJSON snapshot written by earlier versions (validates every row)
+  snapshot  the binary columnar snapshot (no parsing of JSON, no validation)
+
+Rows are copies of sample_employees.json with fresh employee IDs.
+
+Run from the repository root:
+    python -m benchmarks.startup --rows 10000 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from migrate_data import convert_employee_data, load_employees
+from persistence import read_legacy_snapshot, read_snapshot, write_snapshot
+from store import EmployeeStore, EMPLOYEE_ID_PREFIX, FIRST_EMPLOYEE_NUMBER
+
+def make_rows(count: int) -> list:
+    sample = convert_employee_data(load_employees())
+    rows = []
+    for number in range(count):
+        row = dict(sample[number % len(sample)])
+        row["employee_id"] = f"{EMPLOYEE_ID_PREFIX}{FIRST_EMPLOYEE_NUMBER + number}"
+        rows.append(row)
+    return rows
+
+def write_files(directory: str, store: EmployeeStore) -> dict:
+    paths = {
+        "json": os.path.join(directory, "employees.json"),
+        "ndjson": os.path.join(directory, "employees.snapshot.ndjson"),
+        "snapshot": os.path.join(directory, "employees.snapshot"),
+    }
+    employees = store.snapshot()
+    with open(paths["json"], "w") as f:
+        json.dump([employee.model_dump(mode="json") for employee in employees], f)
+    with open(paths["ndjson"], "w") as f:
+        f.write(json.dumps({"seq": 0, "last_number": store.last_number, "count": len(employees)}) + "\n")
+        for employee in employees:
+            f.write(employee.model_dump_json() + "\n")
+    write_snapshot(paths["snapshot"], 0, store.last_number, employees)
+    return paths
+
+def load_json(path: str) -> EmployeeStore:
+    with open(path, "r") as f:
+        return EmployeeStore(convert_employee_data(json.load(f)))
+
+LOADERS = {
+    "json": load_json,
+    "ndjson": lambda path: read_legacy_snapshot(path)[1],
+    "snapshot": lambda path: read_snapshot(path)[1],
+}
+
+def best_time(func, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        store = func(path)
+        best = min(best, time.perf_counter() - start)
+        del store
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for count in args.rows:
+        store = EmployeeStore(make_rows(count))
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_files(directory, store)
+            print(f"rows: {count}")
+            baseline = None
+            for name, loader in LOADERS.items():
+                elapsed = best_time(loader, paths[name], args.repeat)
+                baseline = baseline or elapsed
+                size = os.path.getsize(paths[name]) / 1e6
+                print(f"  {name:<9} {elapsed * 1000:9.1f} ms  {size:7.1f} MB  {baseline / elapsed:5.1f}x")
+
+if __name__ == "__main__":
+    main()
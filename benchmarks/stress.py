@@ -0,0 +1,269 @@
+"""
+Concurrency stress test for the employee stores and the write endpoints
+
+Store level: worker threads hammer one store at a time (model, compact and
+SQLite) with compare-and-set increments on a few shared "counter" employees,
+single and batch updates, creates and deletes, while reader threads check
+every versioned read against its version.
+
+HTTP level: concurrent clients drive every mutation endpoint of the app
+in-process (POST /employees/, POST /employees/bulk, PUT change-department
+with and without If-Match, PUT bulk/change-department, PUT resign). The
+backend is the one main.py is configured for (HR_STORAGE_BACKEND).
+
+Afterwards it checks that:
+  - no compare-and-set increment was lost (counters moved once per success)
+  - every (record, version) read was consistent
+  - the secondary indexes and subscribed aggregates agree with a full scan
+  - the employee count matches the creates and deletes that succeeded
+and exits non-zero if any of that does not hold.
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m benchmarks.stress --threads 8 --ops 2000 --requests 2000
+    HR_STORAGE_BACKEND=sqlite python -m benchmarks.stress
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from analytics import EmployeeAggregates
+from migrate_data import convert_employee_data, load_employees
+from sqlite_store import SQLiteEmployeeStore
+from store import INDEXED_FIELDS, CompactEmployeeStore, EmployeeStore, VersionConflict, index_key
+
+COUNTERS = 4
+CITIES = ("Lagos", "Oslo", "Lima", "Pune")
+DEPARTMENTS = ("Engineering", "Sales", "Finance", "Support")
+
+class Failed(Exception):
+    pass
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        raise Failed(message)
+
+# Invariants shared by both levels
+def check_consistency(store, aggregates: EmployeeAggregates, label: str) -> None:
+    employees = list(store.snapshot())
+    check(len(employees) == len(store), f"{label}: snapshot has {len(employees)} employees, len() says {len(store)}")
+    for field in INDEXED_FIELDS:
+        expected = {}
+        for employee in employees:
+            expected.setdefault(index_key(getattr(employee, field)), set()).add(employee.employee_id)
+        for key, ids in expected.items():
+            found = {employee.employee_id for employee in store.find({field: key}, limit=len(employees) + 1)}
+            check(found == ids, f"{label}: index on {field}={key!r} has {len(found)} IDs, a scan finds {len(ids)}")
+    rebuilt = EmployeeAggregates(employees)
+    for field in ("department", "status", "city"):
+        check(aggregates.headcount(field) == rebuilt.headcount(field), f"{label}: {field} headcount drifted")
+    check(aggregates.overall.salaries == rebuilt.overall.salaries, f"{label}: salary aggregates drifted")
+
+# Store level
+def stress_store(store, threads: int, ops: int, label: str) -> None:
+    aggregates = EmployeeAggregates(store.snapshot())
+    store.subscribe(aggregates.on_change)
+    seed_ids = [employee.employee_id for employee in store.snapshot()]
+    counters, others = seed_ids[:COUNTERS], seed_ids[COUNTERS:]
+    initial = {employee_id: store.version(employee_id) for employee_id in counters}
+    template = store.get(others[0])
+
+    increments = Counter()
+    conflicts = Counter()
+    created = Counter()
+    deleted = Counter()
+    errors = []
+    stop = threading.Event()
+
+    def increment(employee_id):
+        # Each success sets department to "C<version>", so a reader can tell
+        # whether a record and the version it came with belong together
+        while True:
+            employee, version = store.get_versioned(employee_id)
+            try:
+                store.update(employee_id, {"department": f"C{version + 1}"}, expected_version=version)
+                return
+            except VersionConflict:
+                conflicts[employee_id] += 1
+
+    def writer(seed):
+        rng = random.Random(seed)
+        own = []
+        try:
+            for _ in range(ops):
+                choice = rng.random()
+                if choice < 0.35:
+                    employee_id = rng.choice(counters)
+                    increment(employee_id)
+                    increments[employee_id] += 1
+                elif choice < 0.55:
+                    store.update(rng.choice(others), {"city": rng.choice(CITIES), "salary": rng.randint(30, 200) * 1000})
+                elif choice < 0.65:
+                    store.update_many({employee_id: {"department": rng.choice(DEPARTMENTS)}
+                                       for employee_id in rng.sample(others, 10)})
+                elif choice < 0.8:
+                    own.append(store.create(template).employee_id)
+                    created[seed] += 1
+                elif choice < 0.85:
+                    own.extend(employee.employee_id for employee in store.create_many([template] * 5))
+                    created[seed] += 5
+                elif own:
+                    if store.delete(own.pop(rng.randrange(len(own)))):
+                        deleted[seed] += 1
+        except Exception as exc:
+            errors.append(exc)
+
+    def reader(seed):
+        rng = random.Random(seed)
+        reads = 0
+        try:
+            while not stop.is_set():
+                employee, version = store.get_versioned(rng.choice(counters))
+                if version > initial[employee.employee_id]:
+                    check(employee.department == f"C{version}",
+                          f"{label}: read {employee.employee_id} at version {version} with department {employee.department}")
+                store.find({"department": rng.choice(DEPARTMENTS)}, limit=20)
+                store.page(limit=20)
+                reads += 1
+                if isinstance(store, SQLiteEmployeeStore):
+                    time.sleep(0.001)  # Leave the connection pool to the writers
+        except Exception as exc:
+            errors.append(exc)
+
+    workers = [threading.Thread(target=writer, args=(seed,)) for seed in range(threads)]
+    readers = [threading.Thread(target=reader, args=(1000 + seed,)) for seed in range(2)]
+    start = time.perf_counter()
+    for thread in workers + readers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    for employee_id in counters:
+        check(store.version(employee_id) == initial[employee_id] + increments[employee_id],
+              f"{label}: {employee_id} took {increments[employee_id]} increments, version is {store.version(employee_id)}")
+    check(len(store) == len(seed_ids) + sum(created.values()) - sum(deleted.values()),
+          f"{label}: {len(store)} employees after {sum(created.values())} creates and {sum(deleted.values())} deletes")
+    check_consistency(store, aggregates, label)
+    print(f"  {label:<8} {threads * ops} writes in {elapsed:5.1f} s, "
+          f"{sum(increments.values())} CAS increments ({sum(conflicts.values())} conflicts retried): ok")
+
+# HTTP level
+async def stress_http(clients: int, requests: int) -> None:
+    import httpx
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        response = await client.post("/login", data={"username": "admin", "password": "adminpassword"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        store = main.employees_db
+        if main.persistence is not None:
+            aggregates = await main.aggregates.wait()
+        else:
+            aggregates = EmployeeAggregates(store.snapshot())
+            store.subscribe(aggregates.on_change)
+        seed_ids = [employee.employee_id for employee in store.snapshot()]
+        counters, others = seed_ids[:COUNTERS], seed_ids[COUNTERS:]
+        for employee_id in counters:
+            await client.put(f"/employees/{employee_id}/change-department", json={"department": "H0"}, headers=headers)
+        template = store.get(others[0]).model_dump(mode="json")
+        del template["employee_id"]
+        increments = Counter()
+        preconditions_failed = Counter()
+        created = Counter()
+
+        async def expect(response, *statuses):
+            check(response.status_code in statuses, f"HTTP {response.request.method} {response.request.url.path}: "
+                  f"{response.status_code} {response.text[:200]}")
+            return response
+
+        async def increment(employee_id):
+            # GET, then PUT with If-Match; a 412 means someone else got there first
+            while True:
+                response = await expect(await client.get(f"/employees/{employee_id}", headers=headers), 200)
+                number = int(response.json()["department"][1:])
+                response = await client.put(
+                    f"/employees/{employee_id}/change-department", json={"department": f"H{number + 1}"},
+                    headers={**headers, "If-Match": response.headers["etag"]},
+                )
+                await expect(response, 200, 412)
+                if response.status_code == 200:
+                    increments[employee_id] += 1
+                    return
+                preconditions_failed[employee_id] += 1
+
+        async def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(requests // clients):
+                choice = rng.random()
+                if choice < 0.3:
+                    await increment(rng.choice(counters))
+                elif choice < 0.5:
+                    await expect(await client.put(f"/employees/{rng.choice(others)}/change-department",
+                                                  json={"department": rng.choice(DEPARTMENTS)}, headers=headers), 200)
+                elif choice < 0.6:
+                    await expect(await client.put(f"/employees/{rng.choice(others)}/resign", headers=headers), 200)
+                elif choice < 0.75:
+                    await expect(await client.post("/employees/", json={"employee_id": "", **template}, headers=headers), 200)
+                    created[seed] += 1
+                elif choice < 0.85:
+                    await expect(await client.post("/employees/bulk", json=[template] * 5, headers=headers), 200)
+                    created[seed] += 5
+                else:
+                    moves = {employee_id: rng.choice(DEPARTMENTS) for employee_id in rng.sample(others, 10)}
+                    await expect(await client.put("/employees/bulk/change-department", json={"moves": moves},
+                                                  headers=headers), 200)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(seed) for seed in range(clients)))
+        elapsed = time.perf_counter() - start
+
+        for employee_id in counters:
+            department = store.get(employee_id).department
+            check(department == f"H{increments[employee_id]}",
+                  f"HTTP: {employee_id} took {increments[employee_id]} increments but is in {department}")
+        check(len(store) == len(seed_ids) + sum(created.values()),
+              f"HTTP: {len(store)} employees after {sum(created.values())} creates")
+        check_consistency(store, aggregates, "HTTP")
+        print(f"  {main.STORAGE_BACKEND:<8} {requests} requests from {clients} clients in {elapsed:5.1f} s, "
+              f"{sum(increments.values())} If-Match increments ({sum(preconditions_failed.values())} got 412): ok")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8, help="writer threads per store")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per writer thread")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent HTTP clients")
+    parser.add_argument("--requests", type=int, default=2000, help="HTTP requests in total")
+    args = parser.parse_args()
+
+    sample = convert_employee_data(load_employees())
+    with tempfile.TemporaryDirectory() as directory:
+        # The app keeps its data here, and must not touch the real data directory
+        os.environ["HR_DATA_DIR"] = os.path.join(directory, "app")
+        try:
+            print("store level:")
+            stress_store(EmployeeStore(sample), args.threads, args.ops, "model")
+            stress_store(CompactEmployeeStore(sample), args.threads, args.ops, "compact")
+            sqlite_store = SQLiteEmployeeStore(os.path.join(directory, "stress.db"), seed=lambda: sample)
+            stress_store(sqlite_store, args.threads, args.ops // 4, "sqlite")
+            sqlite_store.close()
+            print("HTTP level:")
+            asyncio.run(stress_http(args.clients, args.requests))
+        except Failed as exc:
+            print(f"FAILED: {exc}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
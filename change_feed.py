@@ -0,0 +1,101 @@
+import asyncio
+import secrets
+import threading
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from models import Employee
+
+# Events kept in memory; consumers further behind than this must resync
+CHANGE_FEED_CAPACITY = 10_000
+
+# One mutation in the change feed. `employee` is the record after the change
+# (None for deletes), so consumers can apply events without fetching anything.
+class ChangeEvent(BaseModel):
+    seq: int                            # Monotonic sequence number within the feed's epoch
+    op: str                             # "create", "update" or "delete"
+    employee_id: str
+    employee: Optional[Employee] = None
+    timestamp: str
+
+# Change feed of employee mutations for incremental sync
+# Subscribed to the store, it numbers every write with a monotonic sequence
+# number and keeps the latest events in a bounded ring buffer. Consumers ask
+# for the events after the last sequence number they applied; a consumer that
+# has fallen out of the buffer, or holds a sequence number from another epoch
+# (the feed restarts with the process), is told to resync from a full export.
+#
+# Writers may call in from any thread; waiting consumers run on event loops.
+class ChangeFeed:
+    def __init__(self, capacity: int = CHANGE_FEED_CAPACITY):
+        self.epoch = secrets.token_hex(4)
+        self.capacity = capacity
+        self._events: deque = deque(maxlen=capacity)
+        self._last_seq = 0
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        with self._lock:
+            self._last_seq += 1
+            self._events.append(ChangeEvent.model_construct(
+                seq=self._last_seq,
+                op=operation,
+                employee_id=(new or old).employee_id,
+                employee=new,
+                timestamp=datetime.now().isoformat(),
+            ))
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def is_current(self, epoch: Optional[str], since: int) -> bool:
+        """Whether a consumer at (epoch, since) can continue from this feed"""
+        if epoch is not None and epoch != self.epoch:
+            return False
+        with self._lock:
+            first_seq = self._events[0].seq if self._events else self._last_seq + 1
+            return first_seq - 1 <= since <= self._last_seq
+
+    def since(self, since: int, limit: int = 1000) -> List[ChangeEvent]:
+        """Events with seq > since, oldest first (check is_current first)"""
+        with self._lock:
+            if not self._events or since >= self._last_seq:
+                return []
+            # Sequence numbers are contiguous, so the start is found by offset
+            start = max(since + 1 - self._events[0].seq, 0)
+            end = min(start + limit, len(self._events))
+            return [self._events[index] for index in range(start, end)]
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for an event after `since`; True if there is one"""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self._lock:
+            if self._last_seq > since:
+                return True
+            self._waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
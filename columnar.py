@@ -0,0 +1,200 @@
+import threading
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from models import Employee
+from store import index_key
+
+# Fields stored as categorical codes (int32 index into a sorted category list)
+CATEGORICAL_FIELDS = ("department", "role", "status", "employment_type", "city", "gender", "is_active")
+DATE_FIELDS = ("date_of_birth", "start_date", "end_date")
+# Numeric values reports can bin and summarize, with their default bin width
+METRICS = {"salary": 10000.0, "age": 5.0, "tenure": 1.0}
+MAX_HISTOGRAM_BINS = 1000
+
+DAYS_PER_YEAR = 365.25
+
+# Day ordinal of 1970-01-01, the datetime64 epoch
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NO_DATE = np.iinfo(np.int64).min  # int64 value of NaT
+
+# datetime64[D] array of dates (None becomes NaT), via day ordinals: much
+# faster than letting NumPy convert date objects one by one
+def _encode_dates(values: List[Optional[date]]) -> np.ndarray:
+    days = np.fromiter(
+        (value.toordinal() - _EPOCH_ORDINAL if value is not None else _NO_DATE for value in values),
+        dtype=np.int64, count=len(values),
+    )
+    return days.view("datetime64[D]")
+
+# Codes for a sequence of values, and the sorted categories they index
+# Values are coded as they are (enum members hash like their names) and only
+# the distinct ones are converted to plain category values afterwards.
+def _encode_categorical(values: List[Any]):
+    lookup: Dict[Any, int] = {}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32, count=len(values))
+    distinct = [index_key(value) for value in lookup]
+    order = sorted(range(len(distinct)), key=lambda code: str(distinct[code]))
+    remap = np.empty(len(distinct), dtype=np.int32)
+    remap[order] = np.arange(len(distinct), dtype=np.int32)
+    return (remap[codes] if len(codes) else codes), [distinct[code] for code in order]
+
+# Column-per-field, array-backed copy of the employee table for reports
+# Built from a list of employees (or a store's snapshot_rows(): anything with
+# the Employee fields as attributes) in one pass; every report is then a handful
+# of vectorized NumPy operations over whole columns instead of a Python loop
+# over records. The snapshot is immutable: ColumnarView builds a new one after
+# writes.
+class ColumnarSnapshot:
+    def __init__(self, employees: Sequence[Employee]):
+        self.size = len(employees)
+        self.employee_ids = np.array([employee.employee_id for employee in employees], dtype=object)
+        self.salary = np.fromiter((employee.salary for employee in employees), dtype=np.float64, count=self.size)
+        # None (no end date) becomes NaT
+        self.dates: Dict[str, np.ndarray] = {
+            field: _encode_dates([getattr(employee, field) for employee in employees])
+            for field in DATE_FIELDS
+        }
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List[Any]] = {}
+        for field in CATEGORICAL_FIELDS:
+            values = [getattr(employee, field) for employee in employees]
+            self.codes[field], self.categories[field] = _encode_categorical(values)
+
+    def mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Rows matching every (field, value) filter; None values are ignored"""
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            try:
+                code = self.categories[field].index(index_key(value))
+            except ValueError:
+                return np.zeros(self.size, dtype=bool)
+            mask &= self.codes[field] == code
+        return mask
+
+    def metric(self, name: str, as_of: Optional[date] = None) -> np.ndarray:
+        """Values of a metric for every row: salary, or age / tenure in years at `as_of`"""
+        if name == "salary":
+            return self.salary
+        today = np.datetime64(as_of or date.today(), "D")
+        if name == "age":
+            days = today - self.dates["date_of_birth"]
+        elif name == "tenure":
+            # Tenure runs to the end date, or to `as_of` for current employees
+            end = self.dates["end_date"]
+            days = np.where(np.isnat(end), today, end) - self.dates["start_date"]
+        else:
+            raise ValueError(f"Unknown metric {name!r}; use one of {', '.join(METRICS)}")
+        return days.astype(np.float64) / DAYS_PER_YEAR
+
+    def histogram(self, metric: str, bin_width: Optional[float] = None, by: Optional[str] = None,
+                  filters: Optional[Dict[str, Any]] = None, as_of: Optional[date] = None) -> dict:
+        """Counts per bin of `metric`, overall or per group of `by`
+
+        Bins are [edge, edge + bin_width) aligned to multiples of bin_width.
+        Returns {"edges": [...], "groups": {group: [count per bin]}}, where the
+        only group is "all" when `by` is None.
+        """
+        bin_width = bin_width or METRICS[metric]
+        mask = self.mask(filters)
+        values = self.metric(metric, as_of)[mask]
+        if not len(values):
+            return {"edges": [], "groups": {}}
+        first = np.floor(values.min() / bin_width)
+        bins = np.floor(values / bin_width).astype(np.int64) - int(first)
+        bin_count = int(bins.max()) + 1
+        if bin_count > MAX_HISTOGRAM_BINS:
+            raise ValueError(f"bin_width {bin_width:g} gives {bin_count} bins; the limit is {MAX_HISTOGRAM_BINS}")
+        edges = ((np.arange(bin_count + 1) + first) * bin_width).tolist()
+        if by is None:
+            return {"edges": edges, "groups": {"all": np.bincount(bins, minlength=bin_count).tolist()}}
+        codes = self.codes[by][mask]
+        categories = self.categories[by]
+        counts = np.bincount(codes.astype(np.int64) * bin_count + bins, minlength=len(categories) * bin_count)
+        counts = counts.reshape(len(categories), bin_count)
+        present = counts.sum(axis=1) > 0
+        return {
+            "edges": edges,
+            "groups": {str(categories[code]): counts[code].tolist() for code in np.flatnonzero(present)},
+        }
+
+    def summary(self, metric: str, by: Optional[str] = None,
+                filters: Optional[Dict[str, Any]] = None, as_of: Optional[date] = None) -> Dict[str, dict]:
+        """Count, sum, mean, min and max of `metric`, overall ("all") or per group of `by`"""
+        mask = self.mask(filters)
+        values = self.metric(metric, as_of)[mask]
+        if not len(values):
+            return {}
+        if by is None:
+            return {"all": _summarize(len(values), values.sum(), values.min(), values.max())}
+        codes = self.codes[by][mask]
+        categories = self.categories[by]
+        counts = np.bincount(codes, minlength=len(categories))
+        sums = np.bincount(codes, weights=values, minlength=len(categories))
+        # Min and max per group by sorting on the group code once
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        sorted_values = values[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        minimums = np.minimum.reduceat(sorted_values, starts)
+        maximums = np.maximum.reduceat(sorted_values, starts)
+        return {
+            str(categories[code]): _summarize(counts[code], sums[code], minimum, maximum)
+            for code, minimum, maximum in zip(sorted_codes[starts], minimums, maximums)
+        }
+
+def _summarize(count, total, minimum, maximum) -> dict:
+    return {
+        "count": int(count),
+        "sum": round(float(total), 2),
+        "mean": round(float(total) / int(count), 2),
+        "min": round(float(minimum), 2),
+        "max": round(float(maximum), 2),
+    }
+
+# Keeps a ColumnarSnapshot of a store, rebuilt lazily on the first report
+# after a write. Subscribed to the store, it only counts writes; the caller
+# takes the employee rows and passes them to rebuild() with the write count it
+# saw beforehand, so a write racing the rebuild leaves the view stale rather
+# than missing. current() rebuilds one at a time: reports arriving while a
+# rebuild runs wait for it and reuse it.
+class ColumnarView:
+    def __init__(self):
+        self.version = 0
+        self._built_version = -1
+        self._snapshot: Optional[ColumnarSnapshot] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        self.version += 1
+
+    @property
+    def stale(self) -> bool:
+        return self._snapshot is None or self._built_version != self.version
+
+    @property
+    def snapshot(self) -> Optional[ColumnarSnapshot]:
+        return self._snapshot
+
+    def current(self, rows: Callable[[], Sequence[Employee]]) -> ColumnarSnapshot:
+        """The snapshot, rebuilt from rows() first if a write has happened since"""
+        if not self.stale:
+            return self._snapshot
+        with self._rebuild_lock:
+            if not self.stale:
+                return self._snapshot
+            version = self.version
+            return self.rebuild(rows(), version)
+
+    def rebuild(self, employees: Sequence[Employee], version: int) -> ColumnarSnapshot:
+        snapshot = ColumnarSnapshot(employees)
+        with self._lock:
+            if version >= self._built_version:
+                self._snapshot = snapshot
+                self._built_version = version
+        return snapshot
@@ -0,0 +1,30 @@
+import zlib
+from typing import Iterable, Iterator
+
+from models import Employee
+
+# Rows are serialized and sent in batches of this many employees
+EXPORT_BATCH_SIZE = 500
+
+# Streams employees as NDJSON (one JSON object per line)
+# Rows are serialized batch by batch as the response is consumed, so memory use
+# depends on the batch size, not on how many employees are exported.
+def iter_ndjson(employees: Iterable[Employee], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    batch = []
+    for employee in employees:
+        batch.append(employee.model_dump_json())
+        if len(batch) >= batch_size:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
+
+# Gzip-compresses a stream of byte chunks on the fly
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    # wbits=31 selects the gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
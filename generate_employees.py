@@ -1,7 +1,15 @@
 from faker import Faker
+import argparse
+import json
+import os
 import random
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
+import numpy as np
+
 # Initialize Faker library for generating realistic fake data
 fake = Faker()
 
@@ -108,9 +116,317 @@ def save_employees_to_json(employees, filename="sample_employees.json"):
     with open(filename, "w") as f:
         json.dump(employees, f, indent=2, cls=DateEncoder)
 
+# Bulk generation, for load fixtures of hundreds of thousands to millions of rows
+# generate_employee() makes some twenty Faker calls per record, and
+# generate_employees() keeps every record in one list. The bulk generator
+# instead samples names and addresses from pools of Faker values built once,
+# draws every numeric and categorical field for a whole chunk of rows at once
+# with NumPy, generates chunks in a process pool and streams them to the
+# output file in order. Each chunk is seeded by (seed, chunk index), so a seed
+# always gives the same file whatever the number of workers (for a given
+# Faker version, which the pools come from).
+CHUNK_SIZE = 20_000
+POOL_SIZE = 10_000
+OUTPUT_FORMATS = ("ndjson", "json", "snapshot")
+
+# Choices for the categorical fields, in the order their codes are drawn
+CHOICES = {
+    "gender": ["Male", "Female", "Other"],
+    "identification_type": ["Aadhar", "SSN"],
+    "role": roles,
+    "department": ["Engineering", "HR", "Sales", "Design", "Data"],
+    "status": ["Employed", "Resigned", "Terminated"],
+    "employment_type": ["Permanent", "Contractor", "Intern"],
+}
+# Names are drawn straight from Faker's weighted name lists in one call;
+# first_name() and last_name() would redo the weighting for every name
+def _weighted_names(attribute):
+    def draw(pool_fake, size):
+        provider = next(provider for provider in pool_fake.providers if hasattr(provider, attribute))
+        return pool_fake.random_elements(getattr(provider, attribute), length=size, use_weighting=True)
+    return draw
+
+# Fields sampled from the Faker pools, and how to draw a pool of values
+POOLED = {
+    "first_name": _weighted_names("first_names"),
+    "last_name": _weighted_names("last_names"),
+    "street": lambda pool_fake, size: [pool_fake.street_address() for _ in range(size)],
+    "city": lambda pool_fake, size: [pool_fake.city() for _ in range(size)],
+    "state": lambda pool_fake, size: [pool_fake.state() for _ in range(size)],
+    "current_work_location": lambda pool_fake, size: [pool_fake.city() + " Tech Park" for _ in range(size)],
+}
+# Field order of an employee record (and of the Employee model)
+FIELDS = [
+    "employee_id", "first_name", "last_name", "date_of_birth", "gender", "identification_no",
+    "identification_type", "street", "city", "state", "country", "current_work_location", "role",
+    "department", "salary", "system_assigned", "system_asset_id", "is_active", "status", "start_date",
+    "end_date", "employment_type",
+]
+
+_SSN = 1  # Code of "SSN" in CHOICES["identification_type"]
+_LETTERS = np.array(list(string.ascii_letters))
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _build_pool(field, seed, size):
+    pool_fake = Faker()
+    pool_fake.seed_instance(f"{seed}-{field}")
+    return np.array(POOLED[field](pool_fake, size), dtype=object)
+
+def build_pools(seed, size=POOL_SIZE, executor=None):
+    """
+    Build the pools of Faker values the bulk generator samples from
+
+    Pools hold repeated draws rather than distinct values, so common names
+    stay as common as Faker makes them. Each pool has its own seed, so they
+    can be built in parallel and still come out the same.
+
+    Args:
+        seed (int): Seed for Faker
+        size (int): Number of values per pool
+        executor (Executor): Builds the pools in parallel if given
+
+    Returns:
+        dict: Field name to NumPy object array of values
+    """
+    fields = list(POOLED)
+    build = executor.map if executor else map
+    return dict(zip(fields, build(_build_pool, fields, [seed] * len(fields), [size] * len(fields))))
+
+def _years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # February 29th
+        return day.replace(year=day.year - years, day=28)
+
+def _json_strings(values):
+    return np.array([json.dumps(value) for value in values], dtype=object)
+
+_CHOICE_VALUES = {field: np.array(values, dtype=object) for field, values in CHOICES.items()}
+_CHOICE_JSON = {field: _json_strings(values) for field, values in CHOICES.items()}
+
+def _draw_chunk(pools, seed, chunk_index, first_id, count, as_of):
+    # Every field of `count` employees, drawn column by column: pool and
+    # choice indexes, day ordinals and numbers as NumPy arrays, and the few
+    # per-row strings as lists
+    rng = np.random.default_rng([seed, chunk_index])
+    today = as_of.toordinal()
+    draws = {field: rng.integers(0, len(pools[field]), count) for field in POOLED}
+    draws.update((field, rng.integers(0, len(values), count)) for field, values in CHOICES.items())
+
+    # Same ranges as generate_employee: started within the last 5 years,
+    # aged 22 to 60, inactive employees left between their start and today
+    draws["start_date"] = rng.integers(_years_before(as_of, 5).toordinal(), today + 1, count)
+    draws["is_active"] = rng.integers(0, 2, count)
+    draws["end_date"] = draws["start_date"] + (rng.random(count) * (today + 1 - draws["start_date"])).astype(np.int64)
+    draws["date_of_birth"] = rng.integers(_years_before(as_of, 61).toordinal() + 1,
+                                          _years_before(as_of, 22).toordinal() + 1, count)
+    draws["status"][draws["is_active"] == 1] = 0  # Active employees can only be "Employed"
+    draws["salary"] = np.round(rng.uniform(40000, 150000, count), 2)
+    draws["system_assigned"] = rng.integers(0, 2, count).astype(bool)
+
+    # SSNs (area 001-899 except 666) or 12 digit Aadhar numbers, matching
+    # the identification type
+    area = rng.integers(1, 900, count)
+    area[area == 666] = 667
+    group = rng.integers(1, 100, count)
+    serial = rng.integers(1, 10000, count)
+    aadhar = rng.integers(10 ** 11, 10 ** 12, count)
+    draws["identification_no"] = [
+        f"{a:03d}-{g:02d}-{s:04d}" if kind == _SSN else str(n)
+        for kind, a, g, s, n in zip(draws["identification_type"].tolist(), area.tolist(), group.tolist(),
+                                    serial.tolist(), aadhar.tolist())
+    ]
+    # Asset IDs like SYS-aBc-0123 for about half the employees
+    letters = _LETTERS[rng.integers(0, len(_LETTERS), (count, 3))].view("<U3").ravel()
+    digits = rng.integers(0, 10000, count)
+    has_asset = rng.integers(0, 2, count).astype(bool)
+    draws["system_asset_id"] = [
+        f"SYS-{text}-{number:04d}" if present else None
+        for text, number, present in zip(letters.tolist(), digits.tolist(), has_asset.tolist())
+    ]
+    draws["employee_id"] = [f"EMP{1000 + number}" for number in range(first_id, first_id + count)]
+    return draws
+
+def _chunk_columns(pools, draws):
+    # Columns in snapshot encoding (see persistence.write_snapshot_columns):
+    # dates as day ordinals, enums as their values. Pooled and categorical
+    # columns are indexed out of object arrays, so equal values share one
+    # string object.
+    active = draws["is_active"] == 1
+    columns = {field: pools[field][draws[field]].tolist() for field in POOLED}
+    columns.update((field, values[draws[field]].tolist()) for field, values in _CHOICE_VALUES.items())
+    columns.update(
+        employee_id=draws["employee_id"],
+        identification_no=draws["identification_no"],
+        system_asset_id=draws["system_asset_id"],
+        country=["USA"] * len(active),
+        date_of_birth=draws["date_of_birth"].tolist(),
+        start_date=draws["start_date"].tolist(),
+        end_date=np.where(active, None, draws["end_date"].astype(object)).tolist(),
+        salary=draws["salary"].tolist(),
+        system_assigned=draws["system_assigned"].tolist(),
+        is_active=draws["is_active"].tolist(),
+    )
+    return [columns[field] for field in FIELDS]
+
+def _iso_dates(ordinals):
+    # Quoted ISO dates for an array of day ordinals, formatted by NumPy
+    text = np.datetime_as_string((ordinals - _EPOCH_ORDINAL).astype("datetime64[D]"))
+    return np.char.add(np.char.add('"', text), '"')
+
+# One compact JSON object per line, in the same shape the NDJSON export writes
+_LINE = "{" + ",".join(f'"{field}":%s' for field in FIELDS) + "}\n"
+
+def _chunk_lines(encoded_pools, draws):
+    # NDJSON text of a chunk; pool and choice values are JSON encoded once
+    # up front, so every line is one %-format of ready-made fragments
+    active = draws["is_active"] == 1
+    columns = {field: encoded_pools[field][draws[field]].tolist() for field in POOLED}
+    columns.update((field, values[draws[field]].tolist()) for field, values in _CHOICE_JSON.items())
+    columns.update(
+        employee_id=[f'"{employee_id}"' for employee_id in draws["employee_id"]],
+        identification_no=[f'"{number}"' for number in draws["identification_no"]],
+        system_asset_id=[f'"{asset}"' if asset else "null" for asset in draws["system_asset_id"]],
+        country=['"USA"'] * len(active),
+        date_of_birth=_iso_dates(draws["date_of_birth"]).tolist(),
+        start_date=_iso_dates(draws["start_date"]).tolist(),
+        end_date=np.where(active, "null", _iso_dates(draws["end_date"])).tolist(),
+        salary=[repr(salary) for salary in draws["salary"].tolist()],
+        system_assigned=np.where(draws["system_assigned"], "true", "false").tolist(),
+        is_active=draws["is_active"].tolist(),
+    )
+    return "".join([_LINE % row for row in zip(*(columns[field] for field in FIELDS))])
+
+# Pools of the current process, set once per worker
+_pools = None
+_encoded_pools = None
+
+def _init_worker(pools):
+    global _pools, _encoded_pools
+    _pools = pools
+    _encoded_pools = {field: _json_strings(values) for field, values in pools.items()}
+
+def _generate_chunk(output_format, seed, chunk_index, first_id, count, as_of):
+    draws = _draw_chunk(_pools, seed, chunk_index, first_id, count, as_of)
+    if output_format == "snapshot":
+        return _chunk_columns(_pools, draws)
+    return _chunk_lines(_encoded_pools, draws)
+
+def _ordered_results(executor, tasks, window):
+    # Results of `tasks` in order, with at most `window` chunks in flight, so
+    # memory stays bounded however far the workers get ahead of the writer
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(_generate_chunk, *task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def generate_chunks(n, output_format="ndjson", seed=0, workers=None, as_of=None):
+    """
+    Generate n employees in chunks, in a process pool
+
+    Args:
+        n (int): Number of employees; IDs run from EMP1001 to EMP(1000 + n)
+        output_format (str): "snapshot" yields lists of snapshot columns,
+            anything else yields NDJSON text
+        seed (int): Seed for the whole run
+        workers (int): Worker processes, defaults to the CPU count; 1
+            generates in this process
+        as_of (date): The "today" dates are drawn relative to, defaults to today
+
+    Yields:
+        str or list: One chunk of up to CHUNK_SIZE employees at a time, in order
+    """
+    as_of = as_of or date.today()
+    workers = workers or os.cpu_count() or 1
+    tasks = (
+        (output_format, seed, index, first_id, min(CHUNK_SIZE, n + 1 - first_id), as_of)
+        for index, first_id in enumerate(range(1, n + 1, CHUNK_SIZE))
+    )
+    if workers <= 1:
+        _init_worker(build_pools(seed))
+        yield from (_generate_chunk(*task) for task in tasks)
+        return
+    with ProcessPoolExecutor(min(workers, len(POOLED))) as executor:
+        pools = build_pools(seed, executor=executor)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pools,)) as executor:
+        yield from _ordered_results(executor, tasks, window=2 * workers)
+
+def save_employees_bulk(n, filename, output_format="ndjson", seed=0, workers=None, as_of=None):
+    """
+    Generate n employees with the bulk generator and stream them to a file
+
+    Args:
+        n (int): Number of employees to generate
+        filename (str): Output file
+        output_format (str): "ndjson" (one employee per line), "json" (a JSON
+            array, one employee per line) or "snapshot" (the service's
+            snapshot format; name the file employees.snapshot in an empty
+            HR_DATA_DIR and the service starts from it)
+        seed (int): Seed for the whole run; the same seed gives the same file
+        workers (int): Worker processes, defaults to the CPU count
+        as_of (date): The "today" dates are drawn relative to, defaults to today
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown format {output_format!r}; use one of {', '.join(OUTPUT_FORMATS)}")
+    chunks = generate_chunks(n, output_format, seed, workers, as_of)
+    if output_format == "snapshot":
+        # The snapshot is a single pickle of whole columns, so the columns
+        # are collected; they hold shared pool strings, not records
+        from persistence import write_snapshot_columns
+        columns = [[] for _ in FIELDS]
+        for chunk in chunks:
+            for column, values in zip(columns, chunk):
+                column.extend(values)
+        write_snapshot_columns(filename, 0, 1000 + n, n, columns)
+        return
+    with open(filename, "w", encoding="utf-8") as f:
+        if output_format == "ndjson":
+            f.writelines(chunks)
+            return
+        f.write("[\n")
+        first = True
+        for chunk in chunks:
+            if not first:
+                f.write(",\n")
+            f.write(chunk[:-1].replace("\n", ",\n"))
+            first = False
+        f.write("\n]\n")
+
+def _format_for(filename):
+    extension = os.path.splitext(filename)[1].lstrip(".")
+    return extension if extension in OUTPUT_FORMATS else "ndjson"
+
 # Generate and save new sample data when run directly
+# Without options this writes 100 employees to sample_employees.json as it
+# always has; --count or --output switch to the bulk generator, e.g.
+#   python generate_employees.py --count 1000000 --output employees.ndjson --seed 42
+#   python generate_employees.py --count 1000000 --output data/employees.snapshot
 if __name__ == "__main__":
-    print("Generating new sample employee data...")
-    employees = generate_employees(100)
-    save_employees_to_json(employees)
-    print(f"Generated {len(employees)} employees and saved to sample_employees.json")
+    parser = argparse.ArgumentParser(description="Generate sample employee data")
+    parser.add_argument("--count", type=int, help="number of employees (bulk generator)")
+    parser.add_argument("--output", help="output file (bulk generator); the format follows the extension")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="output format, overriding the extension")
+    parser.add_argument("--seed", type=int, help="seed; the same seed gives the same file")
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="date the data is generated as of (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.count is None and args.output is None:
+        print("Generating new sample employee data...")
+        employees = generate_employees(100)
+        save_employees_to_json(employees)
+        print(f"Generated {len(employees)} employees and saved to sample_employees.json")
+    else:
+        import time
+        count = args.count if args.count is not None else 100
+        output = args.output or "employees.ndjson"
+        output_format = args.format or _format_for(output)
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        start = time.perf_counter()
+        save_employees_bulk(count, output, output_format, seed, args.workers, args.as_of)
+        elapsed = time.perf_counter() - start
+        print(f"Generated {count} employees ({output_format}, seed {seed}) in {elapsed:.1f} s "
+              f"and saved to {output}")
@@ -0,0 +1,97 @@
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from models import Employee
+
+# Response cache bounds: entries and total bytes of cached bodies
+RESPONSE_CACHE_ENTRIES = 1024
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+
+# Version counters for HTTP caching of employee reads
+# Subscribed to the store, it bumps the collection version on any write;
+# records carry their own version in the store. ETags embed a per-process
+# epoch, since the in-memory store's versions restart when the service does.
+class VersionTracker:
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self.collection = 0
+
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        self.collection += 1
+
+    def record_etag(self, version: int) -> str:
+        return f'"{self.epoch}-r{version}"'
+
+    def collection_etag(self) -> str:
+        return f'"{self.epoch}-c{self.collection}"'
+
+# ETag derived from the response body itself, for when no version is known
+def content_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+# Whether an If-None-Match header value matches `etag` (weak comparison, as
+# RFC 9110 requires for If-None-Match)
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+# Whether an If-Match header value matches `etag` (strong comparison, as RFC
+# 9110 requires for If-Match: weak validators never match)
+def if_match_matches(if_match: str, etag: str) -> bool:
+    if if_match.strip() == "*":
+        return True
+    if etag.startswith("W/"):
+        return False
+    return any(candidate.strip() == etag for candidate in if_match.split(","))
+
+# Bounded LRU cache of serialized response bodies
+# Keys include the version the body was rendered at, so a write never has to
+# find and evict stale entries: they are simply no longer asked for and age
+# out as new bodies are added.
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_ENTRIES, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if len(body) > self.max_bytes // 4:
+            return  # Not worth evicting a quarter of the cache for one body
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
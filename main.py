@@ -1,22 +1,40 @@
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, Literal
+import asyncio
+import base64
 import json
+import logging
 import os
-from fastapi import FastAPI, Depends, HTTPException, status, Security, Request, Response, Body
+import threading
+from fastapi import FastAPI, Depends, HTTPException, status, Security, Request, Response, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from datetime import datetime, timedelta, timezone
-from pydantic import BaseModel, Field
+from datetime import date, datetime, timedelta, timezone
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 # Import only the models that exist in your models.py file
-from models import Employee, StatusType, EmploymentType
+from models import Employee, StatusType, EmploymentType, RoleType
 from auth import (
-    Token, User, authenticate_user, create_access_token, 
-    fake_users_db, ACCESS_TOKEN_EXPIRE_MINUTES,
+    Token, User, authenticate_user_async, create_access_token, 
+    fake_users_db, ACCESS_TOKEN_EXPIRE_MINUTES, hash_pool, HashPoolSaturated,
     get_current_user_from_token, get_current_user_from_bearer,
-    get_current_user_basic
+    get_current_user_basic, TokenResolverMiddleware, SelectiveSessionMiddleware, SESSION_MODES
+)
+from migrate_data import stream_employees
+from persistence import EmployeePersistence, WriteAheadLogFailed
+from sqlite_store import SQLiteChangeFeed, SQLiteEmployeeStore
+from export import iter_ndjson, iter_gzip
+from http_cache import VersionTracker, ResponseCache, content_etag, etag_matches, if_match_matches
+from store import index_key, EmployeeStore, CompactEmployeeStore, VersionConflict
+from change_feed import ChangeFeed, ChangeEvent
+from analytics import EmployeeAggregates, DEFAULT_PERCENTILES
+from columnar import ColumnarSnapshot, ColumnarView
+from search_index import SearchIndex
+from warmup import VersionedIndex, WarmIndex
+from metrics import (
+    REGISTRY, EXPOSITION_CONTENT_TYPE, CallbackMetric, MetricsMiddleware, SlowRequestProfiler, stage, timed
 )
-from generate_employees import generate_employees
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="login",
@@ -47,6 +65,87 @@ class EmployeeResignResponse(BaseModel):
     details: Employee
     timestamp: str
 
+# Serializer for read endpoints: dumps stored Employee models straight to JSON bytes
+employee_list_adapter = TypeAdapter(List[Employee])
+
+# Page of employees returned when GET /employees/ is called with a cursor
+class EmployeePage(BaseModel):
+    items: List[Employee]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; None on the last page
+
+# Salary figures of a group of employees (analytics endpoints)
+class SalarySummary(BaseModel):
+    count: int
+    sum: float
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[str, Optional[float]]  # "p50" -> salary
+
+class HeadcountResponse(BaseModel):
+    by: str
+    total: int
+    groups: Dict[str, int]  # Group value -> number of employees
+
+class SalaryStatsResponse(BaseModel):
+    by: Optional[str] = None
+    overall: SalarySummary
+    groups: Dict[str, SalarySummary]  # Empty unless grouped with ?by=
+
+# Reports over the columnar snapshot
+class HistogramReport(BaseModel):
+    metric: str
+    by: Optional[str] = None
+    edges: List[float]              # Bin i counts values in [edges[i], edges[i + 1])
+    groups: Dict[str, List[int]]    # Group value ("all" when ungrouped) -> count per bin
+
+class MetricSummary(BaseModel):
+    count: int
+    sum: float
+    mean: float
+    min: float
+    max: float
+
+class MetricSummaryReport(BaseModel):
+    metric: str
+    by: Optional[str] = None
+    groups: Dict[str, MetricSummary]  # Group value ("all" when ungrouped) -> summary
+
+# Batch of change feed events returned by GET /employees/changes
+class ChangeFeedPage(BaseModel):
+    epoch: str                      # Pass back as ?epoch= with the next request
+    events: List[ChangeEvent]
+    last_seq: int                   # Pass back as ?since= for the next batch
+    resync_required: bool = False   # True when the events since ?since= are gone: re-export, then follow from last_seq
+
+# Largest batch accepted by the bulk endpoints
+MAX_BULK_ITEMS = 5000
+
+# Largest page GET /employees/ returns
+MAX_PAGE = 1000
+
+# Outcome of one item in a bulk create, reported in request order
+class BulkCreateItem(BaseModel):
+    index: int                                      # Position of the item in the request
+    employee_id: Optional[str] = None               # Allocated ID if the item was created
+    errors: Optional[List[Dict[str, Any]]] = None   # Validation errors if it was rejected
+
+class BulkCreateResponse(BaseModel):
+    message: str
+    created: int
+    failed: int
+    results: List[BulkCreateItem]
+    timestamp: str
+
+class BulkDepartmentChangeRequest(BaseModel):
+    moves: Dict[str, str]  # employee_id -> new department
+
+class BulkDepartmentChangeResponse(BaseModel):
+    message: str
+    changes: Dict[str, Dict[str, str]]  # employee_id -> {"from": ..., "to": ...}
+    errors: Dict[str, str]              # employee_id -> reason it was skipped
+    timestamp: str
+
 # Initialize FastAPI app with Swagger UI configuration and documentation
 app = FastAPI(
     title="HR Employee Service",
@@ -64,8 +163,18 @@ app = FastAPI(
     swagger_ui_parameters={"persistAuthorization": True}  # Keep authorization between refreshes
 )
 
-# IMPORTANT: Add SessionMiddleware FIRST
-app.add_middleware(SessionMiddleware, secret_key="your-secret-key")
+# Resolve the access token (header, cookie or session) once per request; it
+# is added first so it runs inside the session layer and can read the session
+app.add_middleware(TokenResolverMiddleware)
+
+# IMPORTANT: Add the session layer right after it (it must wrap the resolver)
+# HR_SESSION_MODE: "browser" (default) skips sessions for Bearer requests,
+#   "always" signs a session on every request, "off" disables sessions
+SESSION_MODE = os.environ.get("HR_SESSION_MODE", "browser")
+if SESSION_MODE not in SESSION_MODES:
+    raise ValueError(f"Unknown HR_SESSION_MODE {SESSION_MODE!r}; use one of {', '.join(SESSION_MODES)}")
+if SESSION_MODE != "off":
+    app.add_middleware(SelectiveSessionMiddleware, mode=SESSION_MODE, secret_key="your-secret-key")
 
 # Then add CORS middleware
 app.add_middleware(
@@ -76,88 +185,339 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory employee storage
-employees_db = []
+# Request metrics, added last so they time every other layer too
+# HR_PROFILE_SLOW_MS: when set, a sampling profiler records where requests
+#   slower than this many milliseconds spent their time (served at
+#   /metrics/slow-requests); unset, nothing is sampled
+# HR_PROFILE_INTERVAL_MS: how often the profiler samples, 5 ms by default
+PROFILE_SLOW_MS = os.environ.get("HR_PROFILE_SLOW_MS")
+if PROFILE_SLOW_MS:
+    slow_request_profiler = SlowRequestProfiler(
+        float(PROFILE_SLOW_MS) / 1000,
+        interval=float(os.environ.get("HR_PROFILE_INTERVAL_MS", "5")) / 1000
+    )
+    slow_request_profiler.start()
+else:
+    slow_request_profiler = None
+app.add_middleware(MetricsMiddleware, profiler=slow_request_profiler)
 
-# Load sample employees or generate new ones
-def load_employees():
-    try:
-        # Try to load from sample_employees.json
-        with open("sample_employees.json", "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Generate new employees if file doesn't exist or is invalid
-        return generate_employees(100)
-
-# Initialize employees data
-employees_db = load_employees()
-
-# Function to convert existing employee data to new format
-def convert_employee_data():
-    for employee in employees_db:
-        if "name" in employee and "first_name" not in employee:
-            # Split name into first_name and last_name
-            name_parts = employee["name"].split(" ", 1)
-            employee["first_name"] = name_parts[0]
-            employee["last_name"] = name_parts[1] if len(name_parts) > 1 else ""
-            del employee["name"]
-            
-        # Convert address to separate fields
-        if "address" in employee:
-            address_parts = employee["address"].split(", ", 3)
-            employee["street"] = address_parts[0] if len(address_parts) > 0 else ""
-            employee["city"] = address_parts[1] if len(address_parts) > 1 else ""
-            state_zip = address_parts[2].split(" ", 1) if len(address_parts) > 2 else ["", ""]
-            employee["state"] = state_zip[0]
-            employee["country"] = "USA"  # Default country
-            del employee["address"]
-            
-        # Convert is_active to 0/1
-        if "is_active" in employee and isinstance(employee["is_active"], bool):
-            employee["is_active"] = 1 if employee["is_active"] else 0
-
-# Convert existing data when app starts
-convert_employee_data()
+# Storage configuration
+# HR_STORAGE_BACKEND: "memory" (default) keeps employees in process memory,
+#   persisted to a write-ahead log; "sqlite" keeps them in a SQLite database
+#   that several workers can share
+# HR_DATA_DIR: directory for the snapshot and write-ahead log (memory backend)
+# HR_SQLITE_PATH / HR_SQLITE_POOL_SIZE: database file and connections per worker
+# HR_RECORD_FORMAT: how the memory backend holds employees: "model" (default)
+#   keeps the validated models, "compact" keeps slotted records with shared
+#   strings (far less memory per employee, models rebuilt on each read)
+STORAGE_BACKEND = os.environ.get("HR_STORAGE_BACKEND", "memory")
+DATA_DIR = os.environ.get("HR_DATA_DIR", "data")
+SQLITE_PATH = os.environ.get("HR_SQLITE_PATH", os.path.join(DATA_DIR, "employees.db"))
+SQLITE_POOL_SIZE = int(os.environ.get("HR_SQLITE_POOL_SIZE", "4"))
+RECORD_FORMAT = os.environ.get("HR_RECORD_FORMAT", "model")
+RECORD_STORES = {"model": EmployeeStore, "compact": CompactEmployeeStore}
+# HR_SEED_FILE: employee file (JSON array or NDJSON) that seeds empty storage
+# HR_WARM_INDEXES: "startup" (default) builds the search index and analytics
+#   aggregates before the app serves; "background" builds them, and the
+#   columnar report snapshot, while the app already serves (searches and
+#   analytics wait until theirs is ready)
+SEED_FILE = os.environ.get("HR_SEED_FILE", "sample_employees.json")
+WARM_INDEXES = os.environ.get("HR_WARM_INDEXES", "startup")
+if WARM_INDEXES not in ("startup", "background"):
+    raise ValueError(f"Unknown HR_WARM_INDEXES {WARM_INDEXES!r}; use 'startup' or 'background'")
+
+# Uvicorn only configures its own loggers, so the app's modules (seed
+# progress, index warm-up, write-ahead log errors, slow requests) would log
+# INFO lines nowhere: they go through uvicorn's log handlers instead.
+# Logging set up by whoever runs the app (a root handler) is left alone.
+APP_LOGGERS = ("migrate_data", "persistence", "warmup", "metrics")
+
+def configure_logging():
+    if logging.getLogger().handlers:
+        return
+    # uvicorn.error has none of its own; it propagates to "uvicorn"
+    handlers = logging.getLogger("uvicorn").handlers or [logging.StreamHandler()]
+    for name in APP_LOGGERS:
+        app_logger = logging.getLogger(name)
+        app_logger.setLevel(logging.INFO)
+        app_logger.propagate = False
+        for handler in handlers:
+            app_logger.addHandler(handler)
+
+# Before the storage opens, so its seed and recovery progress is seen
+configure_logging()
+
+# Sample data only seeds empty storage; it is streamed in (converted to the
+# new format and validated one record at a time) so a large file never has to
+# fit in memory as a whole
+def seed_employees():
+    return stream_employees(SEED_FILE)
+
+if STORAGE_BACKEND == "sqlite":
+    os.makedirs(os.path.dirname(SQLITE_PATH) or ".", exist_ok=True)
+    persistence = None
+    employees_db = SQLiteEmployeeStore(SQLITE_PATH, seed=seed_employees, pool_size=SQLITE_POOL_SIZE)
+elif STORAGE_BACKEND == "memory":
+    # In-memory employee storage, indexed by employee_id and made durable by a
+    # write-ahead log; on startup the store is recovered from DATA_DIR
+    if RECORD_FORMAT not in RECORD_STORES:
+        raise ValueError(f"Unknown HR_RECORD_FORMAT {RECORD_FORMAT!r}; use 'model' or 'compact'")
+    persistence = EmployeePersistence(DATA_DIR, store_class=RECORD_STORES[RECORD_FORMAT])
+    employees_db = persistence.open(seed_employees)
+else:
+    raise ValueError(f"Unknown HR_STORAGE_BACKEND {STORAGE_BACKEND!r}; use 'memory' or 'sqlite'")
+
+# On shutdown, flush the log and write a final snapshot so the next start has
+# little to replay, or close the database connections
+@app.on_event("shutdown")
+def close_storage():
+    if persistence is not None:
+        persistence.close()
+    else:
+        employees_db.close()
+
+@app.on_event("shutdown")
+def close_hash_pool():
+    hash_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_profiler():
+    if slow_request_profiler is not None:
+        slow_request_profiler.stop()
+
+# Once the write-ahead log has failed, memory may hold a change that is not
+# on disk: writes are refused until a restart recovers the store from disk
+STORAGE_FAILED_DETAIL = "Storage failed to persist a change; writes are disabled until the service restarts"
+
+def check_writable():
+    if persistence is not None and persistence.failure is not None:
+        raise HTTPException(status_code=503, detail=STORAGE_FAILED_DETAIL)
 
 # Employee data access functions
+# Each is timed as a "store.<name>" stage in hr_stage_duration_seconds
+@timed("store.get_employees")
 def get_employees(skip: int = 0, limit: int = 100):
-    return employees_db[skip: skip + limit]
+    return employees_db.list(skip=skip, limit=limit)
+
+@timed("store.find_employees")
+def find_employees(filters: Dict[str, Any], skip: int = 0, limit: int = 100):
+    # Filtered lookups go through the store's secondary indexes;
+    # without filters this is the same as get_employees
+    return employees_db.find(filters, skip=skip, limit=limit)
+
+@timed("store.get_employee_page")
+def get_employee_page(after: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None):
+    # Keyset pagination: returns (employees, last employee_id or None)
+    return employees_db.page(after=after, limit=limit, filters=filters)
+
+def export_employees(compress: bool = False):
+    # Snapshot the store up front, then serialize rows lazily as they are sent
+    chunks = iter_ndjson(employees_db.snapshot())
+    return iter_gzip(chunks) if compress else chunks
 
+@timed("store.get_employee_by_id")
 def get_employee_by_id(employee_id: str):
-    for employee in employees_db:
-        if employee["employee_id"] == employee_id:
-            return employee
-    return None
+    return employees_db.get(employee_id)
 
+@timed("store.get_versioned_employee")
+def get_versioned_employee(employee_id: str):
+    # (employee, version) or None
+    return employees_db.get_versioned(employee_id)
+
+@timed("store.create_employee")
 def create_employee(employee: dict):
-    # Generate a new employee ID
-    max_id = 1000
-    for emp in employees_db:
-        emp_id = int(emp["employee_id"].replace("EMP", ""))
-        if emp_id > max_id:
-            max_id = emp_id
-    
-    new_employee = employee.copy()
-    new_employee["employee_id"] = f"EMP{max_id + 1}"
-    
-    employees_db.append(new_employee)
-    return new_employee
-
-def update_employee(employee_id: str, employee_update: dict):
-    for i, employee in enumerate(employees_db):
-        if employee["employee_id"] == employee_id:
-            # Update only the fields that are provided
-            updated_employee = {**employee, **employee_update}
-            employees_db[i] = updated_employee
-            return updated_employee
-    return None
+    check_writable()
+    # The store allocates the next employee ID from its monotonic counter
+    return employees_db.create(employee)
+
+@timed("store.update_employee")
+def update_employee(employee_id: str, employee_update: dict, expected_version: Optional[int] = None):
+    check_writable()
+    # Update only the fields that are provided; with expected_version the
+    # store raises VersionConflict if the record changed in the meantime
+    return employees_db.update(employee_id, employee_update, expected_version=expected_version)
+
+@timed("store.create_employees")
+def create_employees(employees: List[Employee]):
+    check_writable()
+    # IDs are allocated in one step and indexes updated once for the whole batch
+    return employees_db.create_many(employees)
+
+@timed("store.update_employees")
+def update_employees(employee_updates: Dict[str, dict]):
+    check_writable()
+    # Returns ([(old, new), ...], {employee_id: error}) for the batch
+    return employees_db.update_many(employee_updates)
 
+@timed("store.delete_employee")
 def delete_employee(employee_id: str):
-    for i, employee in enumerate(employees_db):
-        if employee["employee_id"] == employee_id:
-            employees_db.pop(i)
-            return True
-    return False
+    check_writable()
+    return employees_db.delete(employee_id)
+
+# Waits, without blocking the event loop, until every change made so far is on
+# disk; write endpoints call this before they acknowledge a change
+async def persist_changes():
+    # SQLite commits are already durable when a write returns
+    if persistence is not None:
+        try:
+            await asyncio.wrap_future(persistence.sync())
+        except (OSError, WriteAheadLogFailed):
+            raise HTTPException(status_code=503, detail=STORAGE_FAILED_DETAIL)
+
+# Runs a data access function; backends that block on I/O run in the threadpool
+# so they don't stall the event loop
+async def call_store(func, *args, **kwargs):
+    if employees_db.blocking:
+        return await run_in_threadpool(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+# HTTP caching of employee reads
+# Every write bumps the written record's version and the collection version;
+# reads send an ETag built from them, answer a matching If-None-Match with
+# 304, and reuse serialized bodies from response_cache. With the SQLite
+# backend other workers write to the same database, so versions kept in this
+# process can't be trusted: ETags are hashed from the body instead, which
+# still saves the transfer but not the serialization.
+if persistence is not None:
+    versions = VersionTracker()
+    employees_db.subscribe(versions.on_change)
+else:
+    versions = None
+response_cache = ResponseCache()
+
+# Change feed of every write. In memory for the in-process backends; on
+# SQLite it reads the changes table, so every worker serves the same feed.
+# Its reads may block: go through call_store.
+change_feed = SQLiteChangeFeed(employees_db) if persistence is None else ChangeFeed()
+employees_db.subscribe(change_feed.on_change)
+
+# Parses an SSE Last-Event-ID ("<epoch>:<seq>") into (epoch, seq), or None
+def parse_event_id(event_id: str):
+    epoch, _, seq = event_id.partition(":")
+    return (epoch, int(seq)) if seq.isdigit() else None
+
+# Headcount and salary aggregates behind the analytics endpoints, updated by
+# every write so a dashboard refresh costs O(groups). They are built as
+# configured by HR_WARM_INDEXES. With the SQLite backend other workers write
+# too, so they are rebuilt on the first request after a write from any worker.
+if persistence is not None:
+    aggregates = WarmIndex("analytics aggregates", EmployeeAggregates)
+    aggregates.start(employees_db, background=WARM_INDEXES == "background")
+else:
+    aggregates = VersionedIndex("analytics aggregates", EmployeeAggregates, employees_db)
+
+async def current_aggregates():
+    if persistence is not None:
+        return await aggregates.wait()
+    return await run_in_threadpool(aggregates.current)
+
+# Columnar (NumPy) copy of the employee table for reports, rebuilt on the
+# first report after a write. With the SQLite backend that means a write from
+# any worker, as for the aggregates.
+if persistence is not None:
+    columns_view = ColumnarView()
+    employees_db.subscribe(columns_view.on_change)
+else:
+    columns_view = VersionedIndex("report columns", lambda employees: ColumnarSnapshot(list(employees)), employees_db)
+
+# Columns are read straight from the store's rows (packed records with the
+# compact format), off the event loop
+def build_columns():
+    if persistence is None:
+        return columns_view.current()
+    return columns_view.current(employees_db.snapshot_rows)
+
+async def current_columns():
+    if persistence is not None and not columns_view.stale:
+        return columns_view.snapshot
+    return await run_in_threadpool(build_columns)
+
+if persistence is not None and WARM_INDEXES == "background":
+    threading.Thread(target=build_columns, name="warm-columns", daemon=True).start()
+
+# Name / employee ID search index, kept current by every write. With the
+# SQLite backend it is rebuilt on the first search after a write from any
+# worker instead.
+if persistence is not None:
+    search_index = WarmIndex("search index", SearchIndex)
+    search_index.start(employees_db, background=WARM_INDEXES == "background")
+else:
+    search_index = VersionedIndex("search index", SearchIndex, employees_db)
+
+async def current_search_index():
+    if persistence is not None:
+        return await search_index.wait()
+    return await run_in_threadpool(search_index.current)
+
+@timed("store.get_employees_by_ids")
+def get_employees_by_ids(employee_ids: List[str]):
+    # An employee deleted since the search ran is left out
+    employees = (employees_db.get(employee_id) for employee_id in employee_ids)
+    return [employee for employee in employees if employee is not None]
+
+# ETag of one employee, as GET /employees/{employee_id} sends it
+def employee_etag(employee: Employee, version: int) -> str:
+    if versions is not None:
+        return versions.record_etag(version)
+    return content_etag(employee.model_dump_json().encode())
+
+# Read-modify-write of one employee with optimistic concurrency control
+# `make_changes(employee)` returns the changes to apply; they are written only
+# if the record is still at the version they were computed from. With an
+# If-Match header the client's ETag must match that version too, and a
+# conflict is answered with 412; without one, the change is recomputed from
+# the fresh record and retried. Returns (old, new, new ETag).
+async def modify_employee(request: Request, employee_id: str, make_changes):
+    if_match = request.headers.get("if-match")
+    while True:
+        current = await call_store(get_versioned_employee, employee_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        employee, version = current
+        if if_match is not None and not if_match_matches(if_match, employee_etag(employee, version)):
+            raise HTTPException(status_code=412, detail="Employee has been modified; fetch it again and retry")
+        try:
+            updated_employee = await call_store(update_employee, employee_id, make_changes(employee), version)
+        except VersionConflict:
+            if if_match is not None:
+                raise HTTPException(status_code=412, detail="Employee has been modified; fetch it again and retry")
+            continue
+        if updated_employee is None:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        return employee, updated_employee, employee_etag(updated_employee, version + 1)
+
+# Serves a JSON read with ETag/If-None-Match handling; `render` is awaited to
+# build the body bytes when it is not cached
+async def cached_json_response(request: Request, key, etag: Optional[str], render):
+    if_none_match = request.headers.get("if-none-match")
+    if etag is not None:
+        if if_none_match and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        body = response_cache.get((key, etag))
+        if body is None:
+            body = await render()
+            response_cache.put((key, etag), body)
+    else:
+        body = await render()
+        etag = content_etag(body)
+        if if_none_match and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+# Cursors are opaque to clients: the last employee_id of a page, base64url-encoded
+def encode_cursor(employee_id: str) -> str:
+    return base64.urlsafe_b64encode(employee_id.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[str]:
+    if not cursor:
+        return None  # An empty cursor starts from the first page
+    try:
+        employee_id = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except ValueError:  # binascii.Error and UnicodeDecodeError are both ValueErrors
+        employee_id = ""
+    if not employee_id:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return employee_id
 
 # Global token storage (for development/testing only)
 CURRENT_TOKEN = None
@@ -171,8 +531,16 @@ async def login_for_access_token(
 ):
     global CURRENT_TOKEN
     
-    # Authenticate user credentials
-    user = authenticate_user(fake_users_db, form_data.username, form_data.password)
+    # Authenticate user credentials (bcrypt runs on the hashing pool; when
+    # it is saturated the login is shed so the rest of the API stays responsive)
+    try:
+        user = await authenticate_user_async(fake_users_db, form_data.username, form_data.password)
+    except HashPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         # Return 401 if authentication fails
         raise HTTPException(
@@ -189,8 +557,9 @@ async def login_for_access_token(
     # Store token globally (for development/testing only)
     CURRENT_TOKEN = access_token
     
-    # Store token in session
-    request.session["access_token"] = access_token
+    # Store token in session (if this request has one; see HR_SESSION_MODE)
+    if "session" in request.scope:
+        request.session["access_token"] = access_token
     
     # Set token in cookie
     response.set_cookie(
@@ -204,45 +573,6 @@ async def login_for_access_token(
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-# Create a middleware to safely handle token
-@app.middleware("http")
-async def add_token_to_header(request: Request, call_next):
-    # Skip for login endpoint
-    if request.url.path == "/login":
-        return await call_next(request)
-    
-    # Try to get token from cookie first (more reliable)
-    token = request.cookies.get("access_token")
-    
-    # Then try session if available
-    if not token and "session" in request.scope:
-        try:
-            token = request.session.get("access_token")
-        except Exception:
-            # Handle any session-related errors gracefully
-            pass
-    
-    # If token exists, add it to request headers
-    if token:
-        # Add token to headers safely - replace any existing Authorization header
-        try:
-            # Remove any existing Authorization header
-            request.headers.__dict__["_list"] = [
-                (k, v) for k, v in request.headers.__dict__["_list"] 
-                if k.decode().lower() != "authorization"
-            ]
-            # Add the token from session/cookie
-            request.headers.__dict__["_list"].append(
-                (b"authorization", f"Bearer {token}".encode())
-            )
-        except Exception:
-            # If we can't modify headers, continue anyway
-            pass
-    
-    # Process the request
-    response = await call_next(request)
-    return response
-
 # Get current user from token with global fallback
 async def get_current_user_with_global_fallback(
     request: Request,
@@ -269,30 +599,222 @@ async def get_current_user_with_global_fallback(
     # ... (you would typically validate the token here)
 
 # Protected endpoint that accepts JWT token authentication
-@app.get("/employees/", response_model=List[Employee])
+@app.get("/employees/", response_model=Union[List[Employee], EmployeePage])
 async def read_employees(
+    request: Request,
     current_user: User = Depends(get_current_user_from_token),
-    skip: int = 0, 
-    limit: int = 100
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE),
+    cursor: Optional[str] = None,
+    department: Optional[str] = None,
+    role: Optional[RoleType] = None,
+    status_filter: Optional[StatusType] = Query(None, alias="status"),
+    employment_type: Optional[EmploymentType] = None,
+    is_active: Optional[int] = Query(None, ge=0, le=1),
+    city: Optional[str] = None
 ):
     """
     Get all employees with pagination.
+    Optionally filter by department, role, status, employment_type, is_active and city;
+    filters are combined with AND and served from the store's indexes.
+
+    Pass `cursor` (empty for the first page) to use keyset pagination instead of
+    skip/limit: the response is then an EmployeePage ordered by employee ID whose
+    `next_cursor` fetches the following page. Pages stay correct while employees
+    are added or removed, and cost the same at any depth.
+    Responses carry an ETag; send it back in If-None-Match to get 304 Not
+    Modified while no employee has changed.
     This endpoint uses JWT token authentication.
     """
-    employees = get_employees(skip=skip, limit=limit)
-    return [Employee.model_validate(emp) for emp in employees]
+    filters = {
+        "department": department,
+        "role": role,
+        "status": status_filter,
+        "employment_type": employment_type,
+        "is_active": is_active,
+        "city": city,
+    }
+
+    # Stored records are already validated Employee models, so they are
+    # serialized straight to JSON bytes instead of going through response_model
+    async def render():
+        if cursor is not None:
+            employees, last_id = await call_store(get_employee_page, after=decode_cursor(cursor), limit=limit, filters=filters)
+            page = EmployeePage.model_construct(
+                items=employees,
+                next_cursor=encode_cursor(last_id) if last_id is not None else None
+            )
+            with stage("serialize.employee_page"):
+                return page.model_dump_json().encode()
+        employees = await call_store(find_employees, filters, skip=skip, limit=limit)
+        with stage("serialize.employee_list"):
+            return employee_list_adapter.dump_json(employees)
+
+    key = ("employees", skip, limit, cursor, tuple(index_key(value) for value in filters.values()))
+    etag = versions.collection_etag() if versions is not None else None
+    return await cached_json_response(request, key, etag, render)
+
+# Search employees by name or employee ID
+# Declared before /employees/{employee_id} so "search" is not taken as an ID
+@app.get("/employees/search", response_model=List[Employee])
+async def search_employees(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = True,
+    current_user: User = Depends(get_current_user_from_token)
+):
+    """
+    Search employees by first name, last name or employee ID.
+    Each word of `q` must match a name exactly or as a prefix, or the start of
+    the employee ID ("EMP12" or just "12"); with `fuzzy`, names with a typo
+    match too. Results are ranked (exact, then prefix, then fuzzy matches) and
+    at most `limit` are returned.
+    This endpoint uses JWT token authentication.
+    """
+    index = await current_search_index()
+    employee_ids = [employee_id for employee_id, _ in index.search(q, limit=limit, fuzzy=fuzzy)]
+    employees = await call_store(get_employees_by_ids, employee_ids)
+    with stage("serialize.employee_list"):
+        body = employee_list_adapter.dump_json(employees)
+    return Response(content=body, media_type="application/json")
+
+# Change feed: employee mutations since a sequence number (long-poll)
+# Declared before /employees/{employee_id} so "changes" is not taken as an ID
+@app.get("/employees/changes", response_model=ChangeFeedPage)
+async def read_employee_changes(
+    current_user: User = Depends(get_current_user_from_token),
+    since: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=MAX_BULK_ITEMS),
+    wait: float = Query(0, ge=0, le=60)
+):
+    """
+    Incremental sync of employee changes.
+    Without `since`, returns no events and the current `last_seq`: take it,
+    export all employees, then poll with since=last_seq and the returned epoch.
+    Each event carries the full record after the change (none for deletes),
+    so events can be applied as-is and replaying one twice is harmless.
+    With `wait` > 0 the request is held for up to that many seconds until an
+    event arrives (long-poll). `resync_required` means the requested events
+    are no longer kept; start over from an export.
+    """
+    if since is None:
+        last_seq = await call_store(lambda: change_feed.last_seq)
+        page = ChangeFeedPage.model_construct(epoch=change_feed.epoch, events=[], last_seq=last_seq, resync_required=False)
+        return Response(content=page.model_dump_json(), media_type="application/json")
+    if wait and await call_store(change_feed.is_current, epoch, since):
+        await change_feed.wait(since, wait)
+    if not await call_store(change_feed.is_current, epoch, since):
+        last_seq = await call_store(lambda: change_feed.last_seq)
+        page = ChangeFeedPage.model_construct(epoch=change_feed.epoch, events=[], last_seq=last_seq, resync_required=True)
+        return Response(content=page.model_dump_json(), media_type="application/json")
+    events = await call_store(change_feed.since, since, limit)
+    page = ChangeFeedPage.model_construct(
+        epoch=change_feed.epoch,
+        events=events,
+        last_seq=events[-1].seq if events else since,
+        resync_required=False
+    )
+    with stage("serialize.change_feed_page"):
+        body = page.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
+# Change feed as Server-Sent Events
+@app.get("/employees/changes/stream")
+async def stream_employee_changes(
+    request: Request,
+    current_user: User = Depends(get_current_user_from_token),
+    since: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = None
+):
+    """
+    Stream employee changes as Server-Sent Events.
+    Each event has id "<epoch>:<seq>", the operation as its event type and
+    the ChangeEvent as data. Reconnecting clients resume from Last-Event-ID;
+    without it, and without `since`, only new changes are sent. A "resync"
+    event (data: epoch and last_seq) ends the stream when the client has
+    fallen too far behind.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and parse_event_id(last_event_id):
+        epoch, since = parse_event_id(last_event_id)
+    elif since is None:
+        epoch, since = change_feed.epoch, await call_store(lambda: change_feed.last_seq)
+
+    async def events():
+        position = since
+        while True:
+            if not await call_store(change_feed.is_current, epoch, position):
+                resync = {"epoch": change_feed.epoch, "last_seq": await call_store(lambda: change_feed.last_seq)}
+                yield f"event: resync\ndata: {json.dumps(resync)}\n\n"
+                return
+            batch = await call_store(change_feed.since, position, 500)
+            for event in batch:
+                yield f"id: {change_feed.epoch}:{event.seq}\nevent: {event.op}\ndata: {event.model_dump_json()}\n\n"
+            if batch:
+                position = batch[-1].seq
+            elif not await change_feed.wait(position, 15):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Stream every employee as NDJSON (one JSON object per line)
+# Declared before /employees/{employee_id} so "export" is not taken as an ID
+@app.get("/employees/export")
+async def export_all_employees(
+    current_user: User = Depends(get_current_user_from_token),
+    gzip: bool = False
+):
+    """
+    Export the full employee table as NDJSON, in employee ID order.
+    Rows are streamed as they are serialized from a consistent snapshot, so
+    writes made during the export do not affect it. Set gzip=true to download
+    a gzip-compressed file (employees.ndjson.gz) instead.
+    """
+    # The snapshot is taken off the event loop; Starlette sends the rows from
+    # the threadpool too, serializing them as it goes
+    chunks = await run_in_threadpool(export_employees, gzip)
+    if gzip:
+        return StreamingResponse(
+            chunks,
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="employees.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="employees.ndjson"'}
+    )
 
 # Get a specific employee by ID
 @app.get("/employees/{employee_id}", response_model=Employee)
 async def read_employee(
+    request: Request,
     employee_id: str,
     current_user: User = Depends(get_current_user_from_token)
 ):
-    """Get a specific employee by ID"""
-    employee = get_employee_by_id(employee_id)
-    if employee is None:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    return Employee.model_validate(employee)
+    """Get a specific employee by ID (with ETag / If-None-Match support)"""
+    async def render():
+        employee = await call_store(get_employee_by_id, employee_id)
+        if employee is None:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        with stage("serialize.employee"):
+            return employee.model_dump_json().encode()
+
+    # The record's own version: writes to other employees keep its ETag valid.
+    # Version 0 means there is no such record, which no precondition (not
+    # even If-None-Match: *) can match.
+    etag = None
+    if versions is not None:
+        version = employees_db.version(employee_id)
+        if version == 0:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        etag = versions.record_etag(version)
+    return await cached_json_response(request, ("employee", employee_id), etag, render)
 
 # Create a new employee
 @app.post("/employees/", response_model=EmployeeCreateResponse)
@@ -301,106 +823,301 @@ async def create_new_employee(
     current_user: User = Depends(get_current_user_from_token)
 ):
     """Create a new employee"""
-    # Convert Pydantic model to dict
-    employee_dict = employee.model_dump()
-    
-    # Ensure is_active is 0 or 1, not boolean
-    if isinstance(employee_dict["is_active"], bool):
-        employee_dict["is_active"] = 1 if employee_dict["is_active"] else 0
-        
-    # Create the employee
-    new_employee = create_employee(employee_dict)
+    # The request body is already a validated Employee, so it is stored as-is
+    new_employee = await call_store(create_employee, employee)
+    await persist_changes()
     
     # Return enhanced response
     return EmployeeCreateResponse(
-        message=f"✅ Employee {new_employee['first_name']} {new_employee['last_name']} created successfully!",
-        employee_id=new_employee["employee_id"],
-        details=Employee.model_validate(new_employee),
+        message=f"✅ Employee {new_employee.first_name} {new_employee.last_name} created successfully!",
+        employee_id=new_employee.employee_id,
+        details=new_employee,
         timestamp=datetime.now().isoformat()
     )
 
 
+# Create many employees in one request
+@app.post("/employees/bulk", response_model=BulkCreateResponse)
+async def create_employees_bulk(
+    employees: List[Dict[str, Any]] = Body(...),
+    current_user: User = Depends(get_current_user_from_token)
+):
+    """
+    Create up to MAX_BULK_ITEMS employees in one request.
+    Each item is validated on its own: valid items are created and invalid ones
+    are reported with their validation errors, by position in the request.
+    Items take the same fields as POST /employees/; employee_id may be omitted
+    since new IDs are always allocated.
+    """
+    if len(employees) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} employees per request")
+
+    # Validate every item, collecting errors instead of failing the batch
+    valid: List[Employee] = []
+    valid_positions: List[int] = []
+    results: List[BulkCreateItem] = []
+    for index, item in enumerate(employees):
+        try:
+            valid.append(Employee.model_validate({"employee_id": "", **item}))
+            valid_positions.append(index)
+        except ValidationError as exc:
+            results.append(BulkCreateItem(
+                index=index,
+                errors=exc.errors(include_url=False, include_context=False, include_input=False)
+            ))
+
+    created = await call_store(create_employees, valid)
+    await persist_changes()
+    results.extend(
+        BulkCreateItem(index=index, employee_id=employee.employee_id)
+        for index, employee in zip(valid_positions, created)
+    )
+    results.sort(key=lambda result: result.index)
+
+    return BulkCreateResponse(
+        message=f"✅ {len(created)} employees created, {len(employees) - len(created)} rejected",
+        created=len(created),
+        failed=len(employees) - len(created),
+        results=results,
+        timestamp=datetime.now().isoformat()
+    )
+
+# Move many employees between departments in one request
+# Declared before /employees/{employee_id}/change-department so "bulk" is not taken as an ID
+@app.put("/employees/bulk/change-department", response_model=BulkDepartmentChangeResponse)
+async def update_employee_departments_bulk(
+    request_body: BulkDepartmentChangeRequest,
+    current_user: User = Depends(get_current_user_from_token)
+):
+    """Change the department of up to MAX_BULK_ITEMS employees (employee_id -> department)"""
+    if len(request_body.moves) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} employees per request")
+
+    updated, errors = await call_store(update_employees, {
+        employee_id: {"department": department}
+        for employee_id, department in request_body.moves.items()
+    })
+    await persist_changes()
+
+    return BulkDepartmentChangeResponse(
+        message=f"🔄 {len(updated)} departments changed, {len(errors)} skipped",
+        changes={
+            new.employee_id: {"from": old.department, "to": new.department}
+            for old, new in updated
+        },
+        errors=errors,
+        timestamp=datetime.now().isoformat()
+    )
+
 # Update an existing employee's department
 @app.put("/employees/{employee_id}/change-department", response_model=EmployeeDepartmentChangeResponse)
 async def update_employee_department(
+    request: Request,
+    response: Response,
     employee_id: str,
     department: str = Body(..., embed=True),
     current_user: User = Depends(get_current_user_from_token)
 ):
-    """Update an employee's department"""
-    # Find the employee
-    employee = get_employee_by_id(employee_id)
-    if employee is None:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    
-    # Store old department for response
-    old_department = employee["department"]
-    
+    """
+    Update an employee's department.
+    Send the employee's ETag in If-Match to apply the change only if nobody
+    has modified the employee since (412 Precondition Failed otherwise).
+    """
     # Update only the department field
-    employee_update = {"department": department}
-    
-    # Update the employee
-    updated_employee = update_employee(employee_id, employee_update)
-    if updated_employee is None:
-        raise HTTPException(status_code=404, detail="Employee not found")
+    employee, updated_employee, etag = await modify_employee(
+        request, employee_id, lambda employee: {"department": department}
+    )
+    await persist_changes()
+    response.headers["ETag"] = etag
+
+    # Store old department for response
+    old_department = employee.department
     
     # Return enhanced response
     return EmployeeDepartmentChangeResponse(
-        message=f"🔄 Department changed successfully for {updated_employee['first_name']} {updated_employee['last_name']}!",
+        message=f"🔄 Department changed successfully for {updated_employee.first_name} {updated_employee.last_name}!",
         changes={
             "from": old_department,
             "to": department
         },
         employee_id=employee_id,
-        details=Employee.model_validate(updated_employee),
+        details=updated_employee,
         timestamp=datetime.now().isoformat()
     )
 
 # Resign an employee using PUT method
 @app.put("/employees/{employee_id}/resign", response_model=EmployeeResignResponse)
 async def resign_employee(
+    request: Request,
+    response: Response,
     employee_id: str,
     current_user: User = Depends(get_current_user_from_token)
 ):
-    """Resign an employee (change status to Resigned and is_active to 0)"""
-    # Find the employee
-    employee = get_employee_by_id(employee_id)
-    if employee is None:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    
-    # Calculate employment duration
-    start_date = datetime.strptime(employee["start_date"], "%Y-%m-%d")
+    """
+    Resign an employee (change status to Resigned and is_active to 0).
+    Honors If-Match like change-department.
+    """
     end_date = datetime.now(timezone.utc)
-    duration_days = (end_date.date() - start_date.date()).days
-    years = duration_days // 365
-    months = (duration_days % 365) // 30
-    days = (duration_days % 365) % 30
-    
+
     # Update status to Resigned and is_active to 0
     employee_update = {
         "status": "Resigned",
         "is_active": 0,
         "end_date": end_date.strftime("%Y-%m-%d")
     }
-    
+
     # Update the employee
-    updated_employee = update_employee(employee_id, employee_update)
-    if updated_employee is None:
-        raise HTTPException(status_code=404, detail="Employee not found")
+    employee, updated_employee, etag = await modify_employee(request, employee_id, lambda employee: employee_update)
+    await persist_changes()
+    response.headers["ETag"] = etag
+
+    # Calculate employment duration
+    start_date = employee.start_date
+    duration_days = (end_date.date() - start_date).days
+    years = duration_days // 365
+    months = (duration_days % 365) // 30
+    days = (duration_days % 365) % 30
     
     # Return enhanced response
     return EmployeeResignResponse(
-        message=f"👋 {updated_employee['first_name']} {updated_employee['last_name']} has resigned!",
+        message=f"👋 {updated_employee.first_name} {updated_employee.last_name} has resigned!",
         employee_id=employee_id,
         employment_duration=f"{years} years, {months} months, {days} days",
-        last_department=updated_employee["department"],
-        last_role=updated_employee["role"],
+        last_department=updated_employee.department,
+        last_role=updated_employee.role.value,
         resignation_date=end_date.strftime("%Y-%m-%d"),
-        details=Employee.model_validate(updated_employee),
+        details=updated_employee,
         timestamp=datetime.now().isoformat()
     )
 
 
+# Field employees can be grouped by in the analytics endpoints
+GroupField = Literal["department", "role", "status", "employment_type", "city", "is_active"]
+
+# Headcount per group
+@app.get("/analytics/headcount", response_model=HeadcountResponse)
+async def read_headcount(
+    current_user: User = Depends(get_current_user_from_token),
+    by: GroupField = "department"
+):
+    """Number of employees per department, role, status, employment_type, city or is_active"""
+    stats = await current_aggregates()
+    return HeadcountResponse(by=by, total=stats.overall.count, groups=stats.headcount(by))
+
+# Salary sum, mean, min, max and percentiles, overall and per group
+@app.get("/analytics/salary", response_model=SalaryStatsResponse)
+async def read_salary_stats(
+    current_user: User = Depends(get_current_user_from_token),
+    by: Optional[GroupField] = None,
+    percentiles: List[float] = Query(list(DEFAULT_PERCENTILES))
+):
+    """
+    Salary statistics over all employees, and per group when `by` is given.
+    Repeat `percentiles` to choose them (0-100, default 50, 90 and 99).
+    """
+    if any(not 0 <= q <= 100 for q in percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    stats = await current_aggregates()
+    return SalaryStatsResponse(by=by, **stats.salary(by, percentiles))
+
+# Field reports can be grouped by, and metric they measure
+ReportField = Literal["department", "role", "status", "employment_type", "city", "gender", "is_active"]
+ReportMetric = Literal["salary", "age", "tenure"]
+
+# Histogram of salary, age or tenure, optionally per group
+@app.get("/reports/histogram", response_model=HistogramReport)
+async def read_histogram_report(
+    current_user: User = Depends(get_current_user_from_token),
+    metric: ReportMetric = "salary",
+    by: Optional[ReportField] = None,
+    bin_width: Optional[float] = Query(None, gt=0),
+    as_of: Optional[date] = None,
+    department: Optional[str] = None,
+    role: Optional[RoleType] = None,
+    status_filter: Optional[StatusType] = Query(None, alias="status"),
+    employment_type: Optional[EmploymentType] = None,
+    is_active: Optional[int] = Query(None, ge=0, le=1),
+    city: Optional[str] = None
+):
+    """
+    Salary bands, age or tenure distribution of the employees matching the filters.
+    Age and tenure are in years at `as_of` (default today); tenure runs to the
+    end date for former employees. Default bin widths: salary 10000, age 5, tenure 1.
+    """
+    filters = {"department": department, "role": role, "status": status_filter,
+               "employment_type": employment_type, "is_active": is_active, "city": city}
+    columns = await current_columns()
+    try:
+        report = await run_in_threadpool(columns.histogram, metric, bin_width, by, filters, as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return HistogramReport(metric=metric, by=by, **report)
+
+# Count, sum, mean, min and max of salary, age or tenure, optionally per group
+@app.get("/reports/summary", response_model=MetricSummaryReport)
+async def read_summary_report(
+    current_user: User = Depends(get_current_user_from_token),
+    metric: ReportMetric = "salary",
+    by: Optional[ReportField] = None,
+    as_of: Optional[date] = None,
+    department: Optional[str] = None,
+    role: Optional[RoleType] = None,
+    status_filter: Optional[StatusType] = Query(None, alias="status"),
+    employment_type: Optional[EmploymentType] = None,
+    is_active: Optional[int] = Query(None, ge=0, le=1),
+    city: Optional[str] = None
+):
+    """Summary statistics of a metric over the employees matching the filters"""
+    filters = {"department": department, "role": role, "status": status_filter,
+               "employment_type": employment_type, "is_active": is_active, "city": city}
+    columns = await current_columns()
+    groups = await run_in_threadpool(columns.summary, metric, by, filters, as_of)
+    return MetricSummaryReport(metric=metric, by=by, groups=groups)
+
+# Password hashing pool metrics: queue depth, rejected logins, time spent
+# waiting for a thread and time spent in bcrypt. Login load is worth keeping
+# from anonymous callers, so only signed-in users get them (and they are
+# left out of the public /metrics registry).
+@app.get("/metrics/password-hashing")
+async def password_hashing_metrics(current_user: User = Depends(get_current_user_from_token)):
+    return hash_pool.stats()
+
+# Gauges read when /metrics is scraped: store size, index sizes and response
+# cache. Request counts, latencies and stage
+# timings are recorded as requests run (metrics.py).
+def search_index_stats():
+    index = search_index.index
+    return index.stats() if index is not None else {}
+
+REGISTRY.register(CallbackMetric("hr_employees", "Employees in the store", lambda: len(employees_db)))
+REGISTRY.register(CallbackMetric(
+    "hr_storage_writable", "1 while writes are accepted, 0 once the write-ahead log has failed",
+    lambda: int(persistence is None or persistence.failure is None)))
+REGISTRY.register(CallbackMetric(
+    "hr_store_index_keys", "Distinct keys per secondary index of the store", employees_db.index_stats, ("field",)))
+REGISTRY.register(CallbackMetric(
+    "hr_search_index_size", "Entries in the search index, by kind", search_index_stats, ("kind",)))
+REGISTRY.register(CallbackMetric(
+    "hr_response_cache_entries", "Serialized responses held by the response cache",
+    lambda: response_cache.stats()["entries"]))
+REGISTRY.register(CallbackMetric(
+    "hr_response_cache_bytes", "Bytes held by the response cache", lambda: response_cache.stats()["bytes"]))
+REGISTRY.register(CallbackMetric(
+    "hr_response_cache_requests_total", "Response cache lookups, by result",
+    lambda: {"hit": response_cache.hits, "miss": response_cache.misses}, ("result",), kind="counter"))
+
+# Prometheus scrape endpoint (text exposition format)
+@app.get("/metrics")
+async def read_metrics():
+    return Response(content=await call_store(REGISTRY.render), media_type=EXPOSITION_CONTENT_TYPE)
+
+# Reports of the slowest recent requests, with the stacks the profiler
+# sampled while they ran (empty unless HR_PROFILE_SLOW_MS is set). They show
+# request paths and code, so only signed-in users get them.
+@app.get("/metrics/slow-requests")
+async def slow_request_reports(current_user: User = Depends(get_current_user_from_token)):
+    return list(slow_request_profiler.reports) if slow_request_profiler is not None else []
+
 # Endpoint to get the current token (for debugging)
 @app.get("/current-token")
 async def get_current_token(request: Request):
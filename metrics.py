@@ -0,0 +1,301 @@
+import asyncio
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram buckets in seconds, 50 microseconds to 10 seconds
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Metrics in the Prometheus text exposition format
+# Every metric keeps one series per combination of label values. Recording
+# takes a lock per metric (requests run on the event loop and on threadpool
+# threads) and does no formatting; the text is only built when scraped.
+# Subclasses provide the sample lines.
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """The metric's sample lines, without HELP and TYPE"""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+class CounterMetric(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+# Cumulative buckets as Prometheus expects them: a value lands in every
+# bucket whose upper bound ("le") is at least the value
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Label values -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[tuple, Tuple[List[int], float]]:
+        """Label values -> (count per bucket including +Inf, sum), not cumulative"""
+        with self._lock:
+            return {key: (series[:-1], series[-1]) for key, series in self._series.items()}
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.snapshot().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+# A gauge or counter read when scraped: `read` returns the value, or a dict
+# of label values -> value for a labelled metric
+class CallbackMetric(Metric):
+    def __init__(self, name: str, documentation: str, read: Callable, labels: Sequence[str] = (),
+                 kind: str = "gauge"):
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self._read = read
+
+    def samples(self) -> List[str]:
+        values = self._read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f"{self.name}{_labels(self.labels, key if isinstance(key, tuple) else (key,))} {_number(value)}"
+            for key, value in values.items()
+        ]
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Every metric, in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Reading metric %s failed", metric.name)
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+EXPOSITION_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = REGISTRY.register(CounterMetric(
+    "hr_http_requests_total", "HTTP requests handled, by method, route and status", ("method", "route", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "hr_http_request_duration_seconds", "HTTP request latency in seconds, by method and route", ("method", "route")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "hr_stage_duration_seconds", "Time spent in each hot-path stage (auth, store access, serialization)", ("stage",)))
+
+# Hot-path stages
+# `with stage("auth.jwt_decode"):` times a block; @timed("store.find_employees")
+# times every call of a function (sync or async). Each costs two clock reads
+# and one histogram update.
+class stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.name)
+        return False
+
+def timed(name: str):
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, name)
+            return timed_async
+
+        @functools.wraps(func)
+        def timed_sync(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, name)
+        return timed_sync
+    return decorate
+
+# Sampling profiler for slow requests
+# While requests are in flight, a background thread records the stack of
+# every other busy thread each `interval` seconds. Threads idling in a lock,
+# a queue or the event loop's selector are skipped; one blocked in C code
+# elsewhere (the WAL writer waiting for entries) still shows in every sample
+# and is easy to discount. When a request takes longer than `threshold`, the
+# stacks sampled while it ran are counted into a report: the most frequent
+# show where the time went, in its own work and in whatever it waited behind.
+# The last `keep` reports are kept.
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+MAX_STACK_DEPTH = 40
+
+def _stack(frame) -> Tuple[str, ...]:
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}")
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+class SlowRequestProfiler:
+    def __init__(self, threshold: float, interval: float = 0.005, keep: int = 20, window: float = 60.0):
+        self.threshold = threshold
+        self.interval = interval
+        self.reports: deque = deque(maxlen=keep)
+        # (time, stack) samples covering the last `window` seconds at most
+        self._samples: deque = deque(maxlen=max(1, int(window / interval)))
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if not self._in_flight:
+                continue
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                self._samples.append((now, _stack(frame)))
+
+    def request_started(self) -> None:
+        self._in_flight += 1
+
+    def request_finished(self, method: str, path: str, route: str, status: int, started: float, finished: float) -> None:
+        self._in_flight -= 1
+        duration = finished - started
+        if duration < self.threshold:
+            return
+        stacks = Counter(stack for at, stack in list(self._samples) if started <= at <= finished)
+        report = {
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1e3, 1),
+            "finished_at": time.time(),
+            "samples": sum(stacks.values()),
+            "stacks": [{"count": count, "frames": list(stack)} for stack, count in stacks.most_common(5)],
+        }
+        self.reports.append(report)
+        logger.warning("Slow request: %s %s took %.0f ms (%d stack samples)", method, path,
+                       report["duration_ms"], report["samples"])
+
+# Pure ASGI middleware recording per-route request counts and latency
+# Add it last so it is outermost and times the other middleware too. Routes
+# are labelled by their path template (/employees/{employee_id}), so the
+# number of series stays fixed however many employees are requested.
+class MetricsMiddleware:
+    def __init__(self, app, profiler: Optional[SlowRequestProfiler] = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        if self.profiler is not None:
+            self.profiler.request_started()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finished = time.perf_counter()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            REQUESTS.inc(method, route_path, status)
+            REQUEST_SECONDS.observe(finished - started, method, route_path)
+            if self.profiler is not None:
+                self.profiler.request_finished(method, scope["path"], route_path, status, started, finished)
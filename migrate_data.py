@@ -0,0 +1,213 @@
+import argparse
+import codecs
+import json
+import logging
+import os
+import re
+import sys
+from typing import Iterator
+
+from generate_employees import generate_employees
+from models import Employee
+from persistence import LEGACY_SNAPSHOT_FILE, SNAPSHOT_FILE, WAL_FILE, write_snapshot
+from store import EmployeeStore
+
+logger = logging.getLogger(__name__)
+
+# Streaming loads read the file in blocks of this many bytes and log progress
+# every PROGRESS_EVERY employees
+READ_BLOCK_SIZE = 1 << 20
+PROGRESS_EVERY = 100_000
+
+# Load sample employees or generate new ones
+def load_employees(path="sample_employees.json"):
+    try:
+        # Try to load from sample_employees.json
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Generate new employees if file doesn't exist or is invalid
+        return generate_employees(100)
+
+# Function to convert existing employee data to new format
+def convert_employee_data(employees):
+    for employee in employees:
+        convert_employee(employee)
+    return employees
+
+# Converts one employee dict to the new format, in place
+def convert_employee(employee):
+    if "name" in employee and "first_name" not in employee:
+        # Split name into first_name and last_name
+        name_parts = employee["name"].split(" ", 1)
+        employee["first_name"] = name_parts[0]
+        employee["last_name"] = name_parts[1] if len(name_parts) > 1 else ""
+        del employee["name"]
+
+    # Convert address to separate fields
+    if "address" in employee:
+        address_parts = employee["address"].split(", ", 3)
+        employee["street"] = address_parts[0] if len(address_parts) > 0 else ""
+        employee["city"] = address_parts[1] if len(address_parts) > 1 else ""
+        state_zip = address_parts[2].split(" ", 1) if len(address_parts) > 2 else ["", ""]
+        employee["state"] = state_zip[0]
+        employee["country"] = "USA"  # Default country
+        del employee["address"]
+
+    # Convert is_active to 0/1
+    if "is_active" in employee and isinstance(employee["is_active"], bool):
+        employee["is_active"] = 1 if employee["is_active"] else 0
+    return employee
+
+# Streaming load
+# load_employees parses the whole file before anything is converted, so a
+# multi-GB file needs the parsed document and its converted copy in memory at
+# once. stream_employees reads the file a block at a time instead and hands
+# out one validated employee at a time, so the caller (a store being built)
+# only ever holds what it keeps. Both NDJSON (one employee per line) and a
+# JSON array of employees are read.
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = " \t\n\r,]"
+
+class _BlockReader:
+    # Decoded text of a binary file, one block at a time, counting the bytes
+    def __init__(self, f):
+        self._file = f
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.bytes_read = 0
+        self.eof = False
+
+    def read(self) -> str:
+        block = self._file.read(READ_BLOCK_SIZE)
+        self.bytes_read += len(block)
+        self.eof = not block
+        return self._decoder.decode(block, final=self.eof)
+
+def _iter_json_array(reader: _BlockReader, text: str) -> Iterator[dict]:
+    # Incremental parser for "[{...}, {...}, ...]": each element is decoded
+    # from the buffered text in place; when one runs past the end of the
+    # buffer, the next block is appended and the element decoded again
+    decoder = json.JSONDecoder()
+    position = _WHITESPACE.match(text).end() + 1  # Past the "["
+    count = 0
+    expect_value = True
+    while True:
+        position = _WHITESPACE.match(text, position).end()
+        if position == len(text):
+            if reader.eof:
+                raise ValueError("Unexpected end of file inside the employee array")
+            text, position = text[position:] + reader.read(), 0
+            continue
+        char = text[position]
+        if char == "]" and (not expect_value or count == 0):
+            rest = text[position + 1:]
+            while not (rest.strip() or reader.eof):
+                rest = reader.read()
+            if rest.strip():
+                raise ValueError("Unexpected data after the employee array")
+            return
+        if not expect_value:
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' after an employee, found {char!r}")
+            position += 1
+            expect_value = True
+            continue
+        try:
+            value, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            if reader.eof:
+                raise
+            end = len(text)
+        if not reader.eof and (end == len(text) or text[end] not in _DELIMITERS):
+            # Incomplete, or a number the block boundary may have cut short:
+            # read more and retry
+            text, position = text[position:] + reader.read(), 0
+            continue
+        yield value
+        count += 1
+        position = end
+        expect_value = False
+        if position > READ_BLOCK_SIZE:
+            text, position = text[position:], 0
+
+def _iter_ndjson(reader: _BlockReader, text: str) -> Iterator[dict]:
+    while True:
+        lines = text.split("\n")
+        text = lines.pop()  # Incomplete last line, if any
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        if reader.eof:
+            if text.strip():
+                yield json.loads(text)
+            return
+        text += reader.read()
+
+def iter_employee_file(path: str) -> Iterator[dict]:
+    """Yield the employee dicts of an NDJSON or JSON array file one at a time, logging progress"""
+    total = os.path.getsize(path)
+    with open(path, "rb") as f:
+        reader = _BlockReader(f)
+        text = reader.read()
+        while not text.strip() and not reader.eof:
+            text += reader.read()
+        start = _WHITESPACE.match(text).end()
+        records = _iter_json_array(reader, text) if text[start:start + 1] == "[" else _iter_ndjson(reader, text)
+        count = 0
+        for count, employee in enumerate(records, 1):
+            yield employee
+            if count % PROGRESS_EVERY == 0:
+                logger.info("Loading %s: %d employees (%.0f%%)", path, count,
+                            100 * reader.bytes_read / total if total else 100)
+        logger.info("Loaded %d employees from %s", count, path)
+
+def stream_employees(path="sample_employees.json", generate_if_missing=True) -> Iterator[Employee]:
+    """
+    Converted and validated employees of an employee file, one at a time
+
+    Like load_employees, a missing file gives 100 generated employees (unless
+    generate_if_missing is False). A record that isn't valid raises
+    ValueError naming it, rather than the file being replaced: by then the
+    records before it have been loaded.
+    """
+    if generate_if_missing and not os.path.exists(path):
+        yield from map(Employee.model_validate, convert_employee_data(generate_employees(100)))
+        return
+    number = 1
+    try:
+        for employee in iter_employee_file(path):
+            if not isinstance(employee, dict):
+                raise ValueError(f"expected a JSON object, found {type(employee).__name__}")
+            yield Employee.model_validate(convert_employee(employee))
+            number += 1
+    except ValueError as exc:  # Also JSONDecodeError and pydantic's ValidationError
+        raise ValueError(f"{path}: employee {number}: {exc}") from exc
+
+# Convert a legacy JSON employee file into a binary snapshot in data_dir, so the
+# service starts from the snapshot without parsing or validating JSON
+def migrate(source, data_dir):
+    """Write a snapshot of the employees in `source`; return how many were written"""
+    store = EmployeeStore(stream_employees(source, generate_if_missing=False))
+    os.makedirs(data_dir, exist_ok=True)
+    write_snapshot(os.path.join(data_dir, SNAPSHOT_FILE), 0, store.last_number, store.snapshot_rows())
+    return len(store)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert employee JSON into a storage snapshot")
+    parser.add_argument("--source", default="sample_employees.json", help="legacy employee JSON file")
+    parser.add_argument("--data-dir", default=os.environ.get("HR_DATA_DIR", "data"),
+                        help="data directory of the memory storage backend")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Never overwrite live data: existing state is only migrated by the service
+    for name in (SNAPSHOT_FILE, LEGACY_SNAPSHOT_FILE, WAL_FILE):
+        if os.path.exists(os.path.join(args.data_dir, name)):
+            parser.error(f"{args.data_dir} already contains {name}")
+
+    count = migrate(args.source, args.data_dir)
+    print(f"Wrote {count} employees to {os.path.join(args.data_dir, SNAPSHOT_FILE)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
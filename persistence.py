@@ -0,0 +1,492 @@
+import gc
+import json
+import logging
+import os
+import pickle
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from datetime import date
+from typing import Any, Callable, Iterable, List, Optional
+
+from models import Employee, EmploymentType, IdentificationType, RoleType, StatusType
+from store import EmployeeStore, FIRST_EMPLOYEE_NUMBER, construct_employee
+
+logger = logging.getLogger(__name__)
+
+# Files kept in the data directory
+SNAPSHOT_FILE = "employees.snapshot"          # Compacted state at some log sequence number
+LEGACY_SNAPSHOT_FILE = "employees.snapshot.ndjson"  # NDJSON snapshot from earlier versions
+WAL_FILE = "employees.wal"                    # Mutations after the snapshot
+ROTATED_WAL_FILE = "employees.wal.1"          # Log being folded into the next snapshot
+
+# Take a new snapshot (and start a fresh log) after this many logged changes
+SNAPSHOT_EVERY = 10_000
+
+# Most log entries written with a single fsync
+MAX_GROUP_COMMIT = 1024
+
+# Log lines are "<crc32 as 8 hex digits> <json>\n"; the checksum and the
+# trailing newline let recovery tell a complete entry from a torn one
+def encode_log_line(payload: str) -> bytes:
+    data = payload.encode()
+    return b"%08x %s\n" % (zlib.crc32(data), data)
+
+def replay_log(path: str, apply: Callable[[dict], None]) -> Optional[int]:
+    """
+    Call `apply` for every intact entry of a write-ahead log, in order
+
+    Reading stops at the first torn or corrupt line, which is what a crash in
+    the middle of an append leaves behind. Returns the length in bytes of the
+    intact prefix, or None if the file does not exist.
+    """
+    try:
+        log_file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    valid_length = 0
+    with log_file:
+        for line in log_file:
+            if not line.endswith(b"\n"):
+                break
+            checksum, _, data = line[:-1].partition(b" ")
+            try:
+                if int(checksum, 16) != zlib.crc32(data):
+                    break
+                entry = json.loads(data)
+            except ValueError:
+                break
+            apply(entry)
+            valid_length += len(line)
+    return valid_length
+
+def _fsync_directory(path: str) -> None:
+    # Makes renames and newly created files in `path` durable (POSIX only)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+# Snapshots are binary: SNAPSHOT_MAGIC followed by a pickle of a dict with the
+# header fields and the records stored column by column. Columns only hold
+# plain values (strings, numbers, None; dates as day ordinals, enums as their
+# values), which pickle reads back at C speed, and repeated values such as
+# enum strings are written once. Records were validated when they were first
+# written, so loading rebuilds the models without validating them again.
+# Snapshots are only ever read from the service's own data directory; like any
+# pickle they must not come from an untrusted source.
+SNAPSHOT_MAGIC = b"HRSNAP\x01\n"
+
+_DATE_COLUMNS = {"date_of_birth", "start_date", "end_date"}
+_ENUM_COLUMNS = {
+    "identification_type": IdentificationType,
+    "role": RoleType,
+    "status": StatusType,
+    "employment_type": EmploymentType,
+}
+
+def _encode_column(field: str, values: List[Any]) -> List[Any]:
+    if field in _DATE_COLUMNS:
+        return [value.toordinal() if value is not None else None for value in values]
+    if field in _ENUM_COLUMNS:
+        return [value.value for value in values]
+    return values
+
+def _decode_column(field: str, values: List[Any]) -> List[Any]:
+    if field in _DATE_COLUMNS:
+        from_ordinal = date.fromordinal
+        return [from_ordinal(value) if value is not None else None for value in values]
+    if field in _ENUM_COLUMNS:
+        members = {member.value: member for member in _ENUM_COLUMNS[field]}
+        return [members[value] for value in values]
+    return values
+
+def write_snapshot(path: str, seq: int, last_number: int, employees: Iterable[Employee]) -> None:
+    """Atomically replace the snapshot at `path` (write, fsync, rename)
+
+    `employees` can be any rows with the Employee fields as attributes, such
+    as a store's snapshot_rows(); the columns are read straight from them.
+    """
+    employees = list(employees)
+    columns = [
+        _encode_column(field, [getattr(employee, field) for employee in employees])
+        for field in Employee.model_fields
+    ]
+    write_snapshot_columns(path, seq, last_number, len(employees), columns)
+
+def write_snapshot_columns(path: str, seq: int, last_number: int, count: int, columns: List[List[Any]]) -> None:
+    """Like write_snapshot, from already encoded columns
+
+    `columns` holds one list per Employee field, in model order, with dates as
+    day ordinals and enums as their values. Writers that produce columns
+    directly (the bulk data generator) never need to build the models.
+    """
+    snapshot = {
+        "seq": seq,
+        "last_number": last_number,
+        "count": count,
+        "fields": list(Employee.model_fields),
+        "columns": columns,
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC)
+        pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temp_path, path)
+    _fsync_directory(os.path.dirname(path) or ".")
+
+def read_snapshot(path: str, store_class=EmployeeStore):
+    """Return (seq, store) from a snapshot file, or None if there is none"""
+    try:
+        snapshot_file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with snapshot_file:
+        if snapshot_file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an employee snapshot")
+        snapshot = pickle.load(snapshot_file)
+
+    fields = snapshot["fields"]
+    rows = zip(*(_decode_column(field, column) for field, column in zip(fields, snapshot["columns"])))
+    if fields == list(Employee.model_fields):
+        employees = (construct_employee(dict(zip(fields, row))) for row in rows)
+    else:
+        # Written by a different version of the model: validate to fill defaults
+        employees = (Employee.model_validate(dict(zip(fields, row))) for row in rows)
+    # Loading allocates millions of objects that all stay alive; collecting
+    # garbage in the middle of it would only walk them over and over
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        store = store_class(employees, last_number=snapshot["last_number"])
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return snapshot["seq"], store
+
+# Snapshots written by earlier versions were NDJSON: a header line, then one
+# employee per line. They are still read, and replaced on first start.
+def read_legacy_snapshot(path: str, store_class=EmployeeStore):
+    """Return (seq, store) from an NDJSON snapshot file, or None if there is none"""
+    try:
+        snapshot_file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with snapshot_file:
+        header = json.loads(snapshot_file.readline())
+        store = store_class(
+            (json.loads(line) for line in snapshot_file),
+            last_number=header.get("last_number", FIRST_EMPLOYEE_NUMBER),
+        )
+    return header["seq"], store
+
+# Raised for log entries refused because an earlier flush failed
+class WriteAheadLogFailed(Exception):
+    pass
+
+# Append-only write-ahead log with group commit
+# append() only assigns a sequence number and queues the entry; a background
+# thread writes whatever has queued up since its last flush and covers the
+# whole batch with one fsync. Each append returns a Future that resolves once
+# the entry is durable, so async callers can wait without blocking the loop.
+#
+# A failed flush poisons the log: the change it carried is already applied in
+# memory, so later entries written after it would describe a state that
+# recovery can never rebuild. From then on every entry (and rotation) fails
+# with WriteAheadLogFailed, until the service restarts and recovers from disk.
+class WriteAheadLog:
+    def __init__(self, path: str, rotated_path: str, max_batch: int = MAX_GROUP_COMMIT, commit_delay: float = 0.0):
+        self.path = path
+        self.rotated_path = rotated_path
+        self._max_batch = max_batch
+        # Optional pause before each flush to let more entries join the batch
+        self._commit_delay = commit_delay
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._last_future: Future = Future()
+        self._last_future.set_result(0)
+        self._flushed_seq = 0
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+        # The error that poisoned the log, if a flush has failed
+        self.failure: Optional[BaseException] = None
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last appended entry"""
+        return self._seq
+
+    def open(self, seq: int) -> None:
+        """Start appending after sequence number `seq`"""
+        self._seq = self._flushed_seq = seq
+        self._file = open(self.path, "ab")
+        self._thread = threading.Thread(target=self._run, name="employee-wal", daemon=True)
+        self._thread.start()
+
+    def append(self, operation: str, payload) -> Future:
+        """Queue a log entry; the returned Future resolves with its seq once it is on disk"""
+        future: Future = Future()
+        # Sequence numbers are assigned in the same order entries are queued
+        with self._lock:
+            if self.failure is not None:
+                future.set_exception(self._refused())
+                self._last_future = future
+                return future
+            self._seq += 1
+            self._queue.put((self._seq, operation, payload, future))
+            self._last_future = future
+        return future
+
+    def sync(self) -> Future:
+        """Future that resolves once every entry appended so far is durable"""
+        return self._last_future
+
+    def rotate(self) -> Future:
+        """
+        Move the current log aside and start a new one
+
+        The Future resolves with the last sequence number in the rotated log;
+        every later entry goes to the new log.
+        """
+        future: Future = Future()
+        self._queue.put(("rotate", future))
+        return future
+
+    def close(self) -> None:
+        """Flush pending entries and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        try:
+            self._file.close()
+        except OSError:
+            # Closing retries the buffered write that already failed
+            if self.failure is None:
+                raise
+
+    # Writer thread
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            if self._commit_delay:
+                time.sleep(self._commit_delay)
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            pending = []
+            for item in batch:
+                if item is not None and len(item) == 4:
+                    pending.append(item)
+                    continue
+                # Control items apply after everything queued before them
+                self._flush(pending)
+                pending = []
+                if item is None:
+                    return
+                self._rotate(item[1])
+            self._flush(pending)
+
+    def _refused(self) -> WriteAheadLogFailed:
+        return WriteAheadLogFailed(f"The write-ahead log failed and accepts no more entries: {self.failure}")
+
+    def _flush(self, entries) -> None:
+        if not entries:
+            return
+        if self.failure is not None:
+            # Queued behind the entry whose flush failed
+            for _, _, _, future in entries:
+                future.set_exception(self._refused())
+            return
+        lines = []
+        for seq, operation, payload, _ in entries:
+            if operation == "put":
+                body = '{"seq":%d,"op":"put","employee":%s}' % (seq, payload.model_dump_json())
+            else:
+                body = json.dumps({"seq": seq, "op": operation, "employee_id": payload})
+            lines.append(encode_log_line(body))
+        try:
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as exc:
+            logger.exception("Write-ahead log flush failed; refusing further entries until restart")
+            with self._lock:
+                self.failure = exc
+            for _, _, _, future in entries:
+                future.set_exception(exc)
+            return
+        self._flushed_seq = entries[-1][0]
+        for seq, _, _, future in entries:
+            future.set_result(seq)
+
+    def _rotate(self, future: Future) -> None:
+        if self.failure is not None:
+            # A snapshot now would make the change whose entry failed durable
+            future.set_exception(self._refused())
+            return
+        try:
+            self._file.close()
+            if os.path.exists(self.rotated_path):
+                # A previous snapshot never completed: keep its entries by
+                # appending the current log instead of overwriting them
+                with open(self.rotated_path, "ab") as rotated, open(self.path, "rb") as current:
+                    rotated.write(current.read())
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+            self._file = open(self.path, "ab")
+            _fsync_directory(os.path.dirname(self.path) or ".")
+        except OSError as exc:
+            logger.exception("Write-ahead log rotation failed")
+            if self._file.closed:
+                self._file = open(self.path, "ab")
+            future.set_exception(exc)
+            return
+        # Everything queued before the rotate request has been flushed
+        future.set_result(self._flushed_seq)
+
+
+# Durable employee storage
+# The store is rebuilt on startup from the latest snapshot plus the entries of
+# the write-ahead log that came after it. While running, every change is
+# appended to the log; after SNAPSHOT_EVERY changes a background thread rotates
+# the log, writes a fresh snapshot and drops the rotated log.
+class EmployeePersistence:
+    def __init__(self, data_dir: str, snapshot_every: int = SNAPSHOT_EVERY, commit_delay: float = 0.0,
+                 store_class=EmployeeStore):
+        self.data_dir = data_dir
+        self.store_class = store_class  # EmployeeStore or CompactEmployeeStore
+        self.snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE)
+        self.legacy_snapshot_path = os.path.join(data_dir, LEGACY_SNAPSHOT_FILE)
+        self.snapshot_every = snapshot_every
+        self._wal = WriteAheadLog(
+            os.path.join(data_dir, WAL_FILE),
+            os.path.join(data_dir, ROTATED_WAL_FILE),
+            commit_delay=commit_delay,
+        )
+        self._store: Optional[EmployeeStore] = None
+        self._changes_since_snapshot = 0
+        self._compact_lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        self._stopping = False
+        self._compactor: Optional[threading.Thread] = None
+
+    def open(self, seed: Callable[[], list]) -> EmployeeStore:
+        """
+        Recover the store from disk
+
+        `seed` provides the initial employees when the data directory has no
+        snapshot yet (first start); they are snapshotted right away. Run
+        migrate_data.py beforehand to convert legacy data offline instead.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        loaded = read_snapshot(self.snapshot_path, self.store_class)
+        # Anything other than a current snapshot is rewritten as one right away
+        needs_snapshot = loaded is None
+        if loaded is None:
+            loaded = read_legacy_snapshot(self.legacy_snapshot_path, self.store_class)
+        if loaded is None:
+            seq, store = 0, self.store_class(seed())
+        else:
+            seq, store = loaded
+        snapshot_seq = seq
+
+        def apply(entry: dict) -> None:
+            nonlocal seq
+            if entry["seq"] <= seq:
+                return  # Already part of the snapshot
+            if entry["op"] == "put":
+                store.put(entry["employee"])
+            elif entry["op"] == "delete":
+                store.delete(entry["employee_id"])
+            seq = entry["seq"]
+
+        # The rotated log only survives if the last snapshot never finished
+        for path in (self._wal.rotated_path, self._wal.path):
+            valid_length = replay_log(path, apply)
+            if valid_length is not None and valid_length < os.path.getsize(path):
+                logger.warning("Truncating torn tail of %s at byte %d", path, valid_length)
+                os.truncate(path, valid_length)
+        logger.info("Recovered %d employees (snapshot seq %d, log seq %d)", len(store), snapshot_seq, seq)
+
+        self._store = store
+        self._wal.open(seq)
+        store.subscribe(self._on_change)
+        if needs_snapshot:
+            write_snapshot(self.snapshot_path, seq, store.last_number, store.snapshot_rows())
+            if os.path.exists(self.legacy_snapshot_path):
+                os.remove(self.legacy_snapshot_path)
+
+        self._compactor = threading.Thread(target=self._compact_loop, name="employee-snapshot", daemon=True)
+        self._compactor.start()
+        return store
+
+    def sync(self) -> Future:
+        """Future that resolves once every change made so far is durable"""
+        return self._wal.sync()
+
+    @property
+    def failure(self) -> Optional[BaseException]:
+        """The error that poisoned the write-ahead log, or None while writes are durable"""
+        return self._wal.failure
+
+    def compact(self) -> None:
+        """Write a snapshot of the current state and drop the log it covers"""
+        with self._compact_lock:
+            seq = self._wal.rotate().result()
+            # Taken after the rotation, so the snapshot holds every change up
+            # to `seq` (and possibly some later ones, which replay on top of it
+            # harmlessly because log entries carry whole records)
+            write_snapshot(self.snapshot_path, seq, self._store.last_number, self._store.snapshot_rows())
+            os.remove(self._wal.rotated_path)
+            _fsync_directory(self.data_dir)
+            self._changes_since_snapshot = 0
+
+    def close(self, compact: bool = True) -> None:
+        """Flush the log, optionally snapshot, and stop the background threads"""
+        self._stopping = True
+        self._compact_requested.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        if compact and self._store is not None and self.failure is None:
+            self.compact()
+        self._wal.close()
+
+    def _on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        if operation == "delete":
+            self._wal.append("delete", old.employee_id)
+        else:
+            self._wal.append("put", new)
+        self._changes_since_snapshot += 1
+        if self._changes_since_snapshot >= self.snapshot_every:
+            self._compact_requested.set()
+
+    def _compact_loop(self) -> None:
+        while True:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            if self._stopping:
+                return
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("Snapshot failed; the write-ahead log is kept")
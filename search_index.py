@@ -0,0 +1,323 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models import Employee
+from store import EMPLOYEE_ID_PREFIX, parse_employee_number
+
+# Most employees a multi-word search examines, and ID prefix matches per word
+MAX_CANDIDATES = 2000
+# Fuzzy (trigram) matching: minimum similarity, and most terms it expands to
+FUZZY_THRESHOLD = 0.3
+FUZZY_MAX_TERMS = 20
+
+# Match kinds, best first
+EXACT, PREFIX, FUZZY = 0, 1, 2
+
+# (length, ID) orders EMP<number> IDs numerically, since numbers have no leading zeros
+def _id_key(employee_id: str) -> Tuple[int, str]:
+    return (len(employee_id), employee_id)
+
+def _name_terms(*names: str) -> Tuple[str, ...]:
+    return tuple({name.lower() for name in names if name})
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+# Name and employee ID search index
+# First and last names repeat a lot, so the index works on distinct name terms
+# (lowercased): a sorted list of them for prefix matching, a posting list of
+# employee IDs per term kept in ID order, and a trigram index over the terms
+# for typo-tolerant matching. Employee IDs are all distinct, so instead of
+# being terms they are kept as a sorted list of employee numbers: the IDs
+# starting with "EMP12" are the numbers in [12, 13), [120, 130), ..., each a
+# binary search away. New IDs are allocated in increasing order, so adding an
+# employee appends to every list it touches.
+#
+# Subscribed to the store, the index follows every write; writes that leave
+# the names alone (department moves, resignations) cost nothing.
+class SearchIndex:
+    def __init__(self, employees: Iterable[Employee] = ()):
+        self._terms: List[str] = []                   # Sorted distinct name terms
+        self._postings: Dict[str, List[str]] = {}     # Term -> employee IDs in ID order
+        self._trigrams: Dict[str, Set[str]] = {}      # Trigram -> terms
+        self._names: Dict[str, Tuple[str, ...]] = {}  # Employee ID -> its terms
+        self._numbers: List[int] = []                 # Sorted employee numbers
+        self._other_ids: List[str] = []               # Sorted IDs that are not EMP<number>
+        self._lock = threading.Lock()
+        # Bulk build: append everything, then sort each list once
+        for employee in employees:
+            employee_id = employee.employee_id
+            terms = self._names[employee_id] = _name_terms(employee.first_name, employee.last_name)
+            for term in terms:
+                ids = self._postings.get(term)
+                if ids is None:
+                    ids = self._postings[term] = []
+                ids.append(employee_id)
+            number = parse_employee_number(employee_id)
+            if number is None:
+                self._other_ids.append(employee_id)
+            else:
+                self._numbers.append(number)
+        for ids in self._postings.values():
+            ids.sort(key=_id_key)
+        self._terms = sorted(self._postings)
+        for term in self._terms:
+            for trigram in _trigrams(term):
+                self._trigrams.setdefault(trigram, set()).add(term)
+        self._numbers.sort()
+        self._other_ids.sort()
+
+    def stats(self) -> Dict[str, int]:
+        """Sizes of the index: employees, distinct name terms and trigrams"""
+        return {"employees": len(self._names), "terms": len(self._postings), "trigrams": len(self._trigrams)}
+
+    # Maintenance
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        with self._lock:
+            if old is not None:
+                terms = _name_terms(old.first_name, old.last_name)
+                if new is not None and terms == _name_terms(new.first_name, new.last_name):
+                    return
+                self._remove_terms(old.employee_id, terms)
+                if new is None:
+                    self._remove_id(old.employee_id)
+            elif new is not None:
+                self._add_id(new.employee_id)
+            if new is not None:
+                self._add_terms(new.employee_id, _name_terms(new.first_name, new.last_name))
+
+    def _add_id(self, employee_id: str) -> None:
+        number = parse_employee_number(employee_id)
+        if number is None:
+            insort(self._other_ids, employee_id)
+        elif not self._numbers or number > self._numbers[-1]:
+            self._numbers.append(number)
+        else:
+            position = bisect_left(self._numbers, number)
+            if position == len(self._numbers) or self._numbers[position] != number:
+                self._numbers.insert(position, number)
+
+    def _remove_id(self, employee_id: str) -> None:
+        number = parse_employee_number(employee_id)
+        ids = self._other_ids if number is None else self._numbers
+        key = employee_id if number is None else number
+        position = bisect_left(ids, key)
+        if position < len(ids) and ids[position] == key:
+            del ids[position]
+
+    def _add_terms(self, employee_id: str, terms: Tuple[str, ...]) -> None:
+        self._names[employee_id] = terms
+        for term in terms:
+            ids = self._postings.get(term)
+            if ids is None:
+                ids = self._postings[term] = []
+                insort(self._terms, term)
+                for trigram in _trigrams(term):
+                    self._trigrams.setdefault(trigram, set()).add(term)
+            if not ids or _id_key(employee_id) > _id_key(ids[-1]):
+                ids.append(employee_id)
+            else:
+                insort(ids, employee_id, key=_id_key)
+
+    def _remove_terms(self, employee_id: str, terms: Tuple[str, ...]) -> None:
+        self._names.pop(employee_id, None)
+        for term in terms:
+            ids = self._postings.get(term)
+            if ids is None:
+                continue
+            position = bisect_left(ids, _id_key(employee_id), key=_id_key)
+            if position < len(ids) and ids[position] == employee_id:
+                del ids[position]
+            if not ids:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+                for trigram in _trigrams(term):
+                    terms_with_trigram = self._trigrams[trigram]
+                    terms_with_trigram.discard(term)
+                    if not terms_with_trigram:
+                        del self._trigrams[trigram]
+
+    # Queries
+    def _name_matches(self, token: str, fuzzy: bool) -> Dict[str, tuple]:
+        """Name terms matching one token, with their rank"""
+        matches = {}
+        position = bisect_left(self._terms, token)
+        for term in islice(self._terms, position, None):
+            if not term.startswith(token):
+                break
+            matches[term] = (EXACT, 0) if term == token else (PREFIX, len(term))
+        # Typos are only looked for when the token matches no name as it is
+        if fuzzy and not matches and len(token) >= 3:
+            for similarity, term in self._similar_terms(token):
+                matches[term] = (FUZZY, -similarity)
+        return matches
+
+    def _similar_terms(self, token: str) -> List[Tuple[float, str]]:
+        token_trigrams = _trigrams(token)
+        shared: Dict[str, int] = {}
+        for trigram in token_trigrams:
+            for term in self._trigrams.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        scored = []
+        for term, count in shared.items():
+            # Jaccard similarity of the two trigram sets (a term of length n has n + 1)
+            similarity = count / (len(token_trigrams) + len(term) + 1 - count)
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((similarity, term))
+        return heapq.nlargest(FUZZY_MAX_TERMS, scored)
+
+    def _match_token(self, token: str, fuzzy: bool) -> "_TokenMatch":
+        match = _TokenMatch(self._name_matches(token, fuzzy))
+        for term, rank in match.term_ranks.items():
+            match.add(rank, self._postings[term])
+        # Employee IDs: "emp12" or just "12" (numbers have no leading zeros)
+        upper = token.upper()
+        digits = upper[len(EMPLOYEE_ID_PREFIX):] if upper.startswith(EMPLOYEE_ID_PREFIX) else upper
+        if digits.isdigit() and not digits.startswith("0"):
+            match.id_prefix = EMPLOYEE_ID_PREFIX + digits
+            match.exact_id = upper if upper.startswith(EMPLOYEE_ID_PREFIX) else None
+            low = high = int(digits)
+            last = self._numbers[-1] if self._numbers else -1
+            found = 0
+            while low <= last and found < MAX_CANDIDATES:
+                start = bisect_left(self._numbers, low)
+                end = min(bisect_left(self._numbers, high + 1), start + MAX_CANDIDATES - found)
+                if end > start:
+                    # IDs of one range have the same length, so the same rank
+                    ids = [f"{EMPLOYEE_ID_PREFIX}{number}" for number in self._numbers[start:end]]
+                    match.add(match.id_rank(ids[0]), ids)
+                    found += end - start
+                low, high = low * 10, high * 10 + 9
+        position = bisect_left(self._other_ids, upper)
+        for employee_id in islice(self._other_ids, position, position + MAX_CANDIDATES):
+            if not employee_id.startswith(upper):
+                break
+            match.other_ids[employee_id] = (EXACT, 0) if employee_id == upper else (PREFIX, len(employee_id))
+        by_rank: Dict[tuple, List[str]] = {}
+        for employee_id, rank in match.other_ids.items():
+            by_rank.setdefault(rank, []).append(employee_id)
+        for rank, ids in by_rank.items():
+            match.add(rank, sorted(ids, key=_id_key))
+        return match
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = True) -> List[Tuple[str, tuple]]:
+        """
+        Employees matching `query`, best first, as (employee_id, rank)
+
+        Every whitespace-separated token must match one of the employee's
+        names (exactly, as a prefix, or with fuzzy=True approximately) or be
+        a prefix of the employee ID. Exact matches rank before prefix matches
+        (shorter first) and those before fuzzy ones (closest first); with
+        several tokens an employee ranks by its worst one. Ties go to the
+        lower employee ID.
+        """
+        tokens = query.lower().split()
+        if not tokens or limit <= 0:
+            return []
+        with self._lock:
+            matches = [self._match_token(token, fuzzy) for token in tokens]
+            if len(matches) == 1:
+                return [(employee_id, rank) for rank, employee_id in islice(matches[0].ranked(), limit)]
+            return self._intersect(matches, limit)
+
+    def _intersect(self, matches: List["_TokenMatch"], limit: int) -> List[Tuple[str, tuple]]:
+        # Walk the most selective token's matches one rank group at a time,
+        # best first, keeping the employees every other token matches too.
+        # Once `limit` results rank better than the group being walked,
+        # nothing later can displace them. At most MAX_CANDIDATES employees
+        # are examined.
+        matches.sort(key=lambda match: match.size)
+        driver, others = matches[0], matches[1:]
+        results = []
+        scanned = 0
+        seen = set()
+        for rank in sorted(driver.groups):
+            if len(results) >= limit and heapq.nsmallest(limit, results)[-1][0] < rank:
+                break
+            lists = driver.groups[rank]
+            ids = chain.from_iterable(lists)
+            remaining = MAX_CANDIDATES - scanned
+            if sum(map(len, lists)) > remaining:
+                # Keep the lowest IDs (each list is in ID order already)
+                ids = lists[0][:remaining] if len(lists) == 1 else islice(heapq.merge(*lists, key=_id_key), remaining)
+            candidates = set(ids)
+            candidates -= seen
+            seen |= candidates
+            scanned += len(candidates)
+            ranks: Dict[str, tuple] = {}
+            for other in others:
+                ranks = other.narrow(candidates, ranks, rank, self._names)
+                candidates = set(ranks)
+                if not candidates:
+                    break
+            results.extend((worst, len(employee_id), employee_id) for employee_id, worst in ranks.items())
+            if scanned >= MAX_CANDIDATES:
+                break
+        return [(employee_id, rank) for rank, _, employee_id in heapq.nsmallest(limit, results)]
+
+# What one query token matches: ID lists grouped by rank, plus what is needed
+# to rank any given employee against the token
+class _TokenMatch:
+    __slots__ = ("term_ranks", "groups", "size", "id_prefix", "exact_id", "other_ids")
+
+    def __init__(self, term_ranks: Dict[str, tuple]):
+        self.term_ranks = term_ranks
+        self.groups: Dict[tuple, List[List[str]]] = {}  # Rank -> ID lists, each in ID order
+        self.size = 0
+        self.id_prefix: Optional[str] = None
+        self.exact_id: Optional[str] = None
+        self.other_ids: Dict[str, tuple] = {}
+
+    def add(self, rank: tuple, ids: List[str]) -> None:
+        self.groups.setdefault(rank, []).append(ids)
+        self.size += len(ids)
+
+    def id_rank(self, employee_id: str) -> Optional[tuple]:
+        if self.id_prefix is not None and employee_id.startswith(self.id_prefix):
+            return (EXACT, 0) if employee_id == self.exact_id else (PREFIX, len(employee_id))
+        return self.other_ids.get(employee_id)
+
+    def narrow(self, candidates: Set[str], ranks: Dict[str, tuple], base: tuple,
+               names: Dict[str, Tuple[str, ...]]) -> Dict[str, tuple]:
+        """
+        The candidates this token matches too, ranked by the worse of their
+        rank so far (from `ranks`, else `base`) and their rank for this token
+        """
+        narrowed = {}
+        if self.size > 20 * len(candidates):
+            # Few candidates: look each one's names up
+            for employee_id in candidates:
+                own = self.rank_of(employee_id, names.get(employee_id, ()))
+                if own is not None:
+                    narrowed[employee_id] = max(ranks.get(employee_id, base), own)
+            return narrowed
+        # Otherwise intersect with this token's ID lists (set operations in C);
+        # better ranks come last and overwrite
+        for own in sorted(self.groups, reverse=True):
+            for ids in self.groups[own]:
+                for employee_id in candidates.intersection(ids):
+                    narrowed[employee_id] = max(ranks.get(employee_id, base), own)
+        return narrowed
+
+    def rank_of(self, employee_id: str, names: Tuple[str, ...]) -> Optional[tuple]:
+        best = self.id_rank(employee_id)
+        for term in names:
+            rank = self.term_ranks.get(term)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+    def ranked(self):
+        """(rank, employee_id) best first, ties in ID order, each employee once"""
+        seen = set()
+        for rank in sorted(self.groups):
+            lists = self.groups[rank]
+            ids = lists[0] if len(lists) == 1 else heapq.merge(*lists, key=_id_key)
+            for employee_id in ids:
+                if employee_id not in seen:
+                    seen.add(employee_id)
+                    yield rank, employee_id
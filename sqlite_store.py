@@ -0,0 +1,504 @@
+import asyncio
+import queue
+import secrets
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from enum import Enum
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from change_feed import CHANGE_FEED_CAPACITY, ChangeEvent, ChangeFeed
+from models import Employee, EmploymentType, IdentificationType, RoleType, StatusType
+from store import (
+    BaseEmployeeStore, EMPLOYEE_ID_PREFIX, FIRST_EMPLOYEE_NUMBER, INDEXED_FIELDS,
+    VersionConflict, employee_sort_key, index_key, validate_employee,
+)
+
+# Connections kept open per process
+DEFAULT_POOL_SIZE = 4
+
+# Rows fetched per round trip when streaming the whole table
+FETCH_BATCH_SIZE = 500
+
+# Rows inserted per executemany when seeding an empty database
+SEED_BATCH_SIZE = 10_000
+
+# Employee columns, in model order
+EMPLOYEE_COLUMNS = tuple(Employee.model_fields)
+
+# Table layout mirrors the Employee model in models.py. sort_group/id_number
+# order EMP<number> IDs numerically (same order as the in-memory store) and back
+# keyset pagination; every filterable field gets its own index.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    employee_id TEXT PRIMARY KEY,
+    sort_group INTEGER NOT NULL,          -- 0 for EMP<number> IDs, 1 for anything else
+    id_number INTEGER NOT NULL,           -- numeric part of EMP<number> IDs, else 0
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    date_of_birth TEXT NOT NULL,          -- ISO date
+    gender TEXT NOT NULL,
+    identification_no TEXT NOT NULL,
+    identification_type TEXT NOT NULL,
+    street TEXT NOT NULL,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    country TEXT NOT NULL,
+    current_work_location TEXT NOT NULL,
+    role TEXT NOT NULL,
+    department TEXT NOT NULL,
+    salary REAL NOT NULL,
+    system_assigned INTEGER NOT NULL,
+    system_asset_id TEXT,
+    is_active INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    start_date TEXT NOT NULL,             -- ISO date
+    end_date TEXT,                        -- ISO date
+    employment_type TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1    -- bumped by every update
+);
+CREATE UNIQUE INDEX IF NOT EXISTS employees_order ON employees (sort_group, id_number, employee_id);
+""" + "".join(
+    f"CREATE INDEX IF NOT EXISTS employees_{field} ON employees ({field});\n" for field in INDEXED_FIELDS
+) + """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- never reused, even once pruned
+    op TEXT NOT NULL,                       -- "create", "update" or "delete"
+    employee_id TEXT NOT NULL,
+    employee TEXT,                          -- record after the change as JSON; NULL for deletes
+    timestamp TEXT NOT NULL
+);
+"""
+
+# Statements are constant strings so each connection's statement cache keeps
+# them prepared
+_SELECT = f"SELECT {', '.join(EMPLOYEE_COLUMNS)} FROM employees"
+_ORDER = " ORDER BY sort_group, id_number, employee_id"
+SELECT_ONE = _SELECT + " WHERE employee_id = ?"
+SELECT_VERSIONED = f"SELECT version, {', '.join(EMPLOYEE_COLUMNS)} FROM employees WHERE employee_id = ?"
+SELECT_ALL = _SELECT + _ORDER
+INSERT = (
+    f"INSERT INTO employees (sort_group, id_number, {', '.join(EMPLOYEE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(EMPLOYEE_COLUMNS) + 2))})"
+)
+UPDATE = (
+    f"UPDATE employees SET {', '.join(f'{column} = ?' for column in EMPLOYEE_COLUMNS[1:])}, "
+    "version = version + 1 WHERE employee_id = ?"
+)
+DELETE = "DELETE FROM employees WHERE employee_id = ?"
+COUNT = "SELECT COUNT(*) FROM employees"
+GET_LAST_NUMBER = "SELECT value FROM meta WHERE key = 'last_number'"
+BUMP_LAST_NUMBER = "UPDATE meta SET value = value + ? WHERE key = 'last_number'"
+INIT_LAST_NUMBER = "INSERT INTO meta (key, value) VALUES ('last_number', ?)"
+INSERT_CHANGE = "INSERT INTO changes (op, employee_id, employee, timestamp) VALUES (?, ?, ?, ?)"
+LAST_CHANGE_SEQ = "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+PRUNE_CHANGES = f"DELETE FROM changes WHERE seq <= ({LAST_CHANGE_SEQ}) - ?"
+CHANGE_RANGE = f"SELECT (SELECT MIN(seq) FROM changes), ({LAST_CHANGE_SEQ})"
+SELECT_CHANGES = "SELECT seq, op, employee_id, employee, timestamp FROM changes WHERE seq > ? ORDER BY seq LIMIT ?"
+GET_DATA_VERSION = "SELECT value FROM meta WHERE key = 'data_version'"
+BUMP_DATA_VERSION = (
+    "INSERT INTO meta (key, value) VALUES ('data_version', 1) "
+    "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+)
+GET_CHANGE_EPOCH = "SELECT value FROM meta WHERE key = 'change_epoch'"
+INIT_CHANGE_EPOCH = "INSERT OR IGNORE INTO meta (key, value) VALUES ('change_epoch', ?)"
+TABLE_COLUMNS = "SELECT name FROM pragma_table_info('employees')"
+ADD_VERSION_COLUMN = "ALTER TABLE employees ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+
+# Column values are stored as plain SQLite types and turned back into model
+# types on read; rows were validated on write, so no re-validation is needed
+_FROM_COLUMN: Dict[str, Callable[[Any], Any]] = {
+    "date_of_birth": date.fromisoformat,
+    "start_date": date.fromisoformat,
+    "end_date": date.fromisoformat,
+    "identification_type": IdentificationType,
+    "role": RoleType,
+    "status": StatusType,
+    "employment_type": EmploymentType,
+    "system_assigned": bool,
+}
+
+def _to_column(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _to_row(employee: Employee) -> tuple:
+    group, number, _ = employee_sort_key(employee.employee_id)
+    return (group, number or 0) + tuple(_to_column(getattr(employee, column)) for column in EMPLOYEE_COLUMNS)
+
+def _from_row(row: tuple) -> Employee:
+    values = dict(zip(EMPLOYEE_COLUMNS, row))
+    for column, convert in _FROM_COLUMN.items():
+        if values[column] is not None:
+            values[column] = convert(values[column])
+    return Employee.model_construct(**values)
+
+def _where(filters: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any]]:
+    # Only INDEXED_FIELDS may appear in SQL, so filter names can't inject anything
+    clauses, params = [], []
+    for field, value in (filters or {}).items():
+        if value is None:
+            continue
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Cannot filter on non-indexed fields: {field}")
+        clauses.append(f"{field} = ?")
+        params.append(index_key(value))
+    return clauses, params
+
+# Fixed-size pool of SQLite connections shared by the worker threads
+# Connections are opened in WAL mode, so readers never wait for the writer and
+# several processes can share the same database file.
+class ConnectionPool:
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE):
+        self.path = path
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self.connect())
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection with the service's settings"""
+        # isolation_level=None: transactions are started explicitly
+        connection = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False, cached_statements=256
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.execute("PRAGMA busy_timeout=30000")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, waiting if they are all in use"""
+        connection = self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# The write transaction holds the database's write lock, so the version read
+# in it is still current when the write lands
+def _check_version(employee_id: str, version: int, expected_version: Optional[int]) -> None:
+    if expected_version is not None and version != expected_version:
+        raise VersionConflict(employee_id, expected_version, version)
+
+# SQLite-backed employee store
+# Same interface as the in-memory EmployeeStore, but the data lives in one
+# database file, so several uvicorn workers (or hosts sharing a volume) see the
+# same employees. Calls block on disk I/O; the API runs them in its threadpool.
+# ID allocation happens inside the write transaction from a counter in the
+# meta table, so it is monotonic across processes as well.
+class SQLiteEmployeeStore(BaseEmployeeStore):
+    blocking = True
+
+    def __init__(self, path: str, seed: Optional[Callable[[], Iterable[Union[Employee, dict]]]] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE):
+        super().__init__()
+        self._pool = ConnectionPool(path, pool_size)
+        self._write_lock = threading.Lock()
+        with self._pool.connection() as connection:
+            connection.executescript(SCHEMA)
+        self._migrate()
+        self._seed(seed)
+
+    def _migrate(self) -> None:
+        # Databases created before records had versions get the column, with
+        # every existing row at version 1
+        with self._transaction() as connection:
+            columns = {row[0] for row in connection.execute(TABLE_COLUMNS)}
+            if "version" not in columns:
+                connection.execute(ADD_VERSION_COLUMN)
+
+    def _seed(self, seed) -> None:
+        # The first process to get the write lock fills an empty database;
+        # the others see the counter row and skip it
+        with self._transaction() as connection:
+            if connection.execute(GET_LAST_NUMBER).fetchone() is not None:
+                return
+            # Inserted in batches as the seed streams in, so a large seed file
+            # is never held in memory at once
+            last_number = FIRST_EMPLOYEE_NUMBER
+            employees = iter(seed() if seed else ())
+            while True:
+                batch = [validate_employee(employee) for employee in islice(employees, SEED_BATCH_SIZE)]
+                if not batch:
+                    break
+                connection.executemany(INSERT, map(_to_row, batch))
+                last_number = max(last_number, *(employee_sort_key(employee.employee_id)[1] or 0 for employee in batch))
+            connection.execute(INIT_LAST_NUMBER, (last_number,))
+            connection.execute(BUMP_DATA_VERSION)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write
+        # sequences can't interleave with other writers
+        with self._pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    @contextmanager
+    def _write(self) -> Iterator[Tuple[sqlite3.Connection, List[tuple]]]:
+        # A write transaction plus its change notifications, queued by the
+        # caller as (operation, old, new) and sent after COMMIT. Writes from
+        # this process go one at a time (SQLite has a single writer anyway), so
+        # listeners see them in commit order even when threads race.
+        # The changes are also appended to the changes table in the same
+        # transaction (that is the change feed every process reads), and the
+        # data version is bumped.
+        with self._write_lock:
+            notices: List[tuple] = []
+            with self._transaction() as connection:
+                yield connection, notices
+                if notices:
+                    timestamp = datetime.now().isoformat()
+                    connection.executemany(INSERT_CHANGE, (
+                        (operation, (new or old).employee_id, new.model_dump_json() if new is not None else None, timestamp)
+                        for operation, old, new in notices
+                    ))
+                    connection.execute(PRUNE_CHANGES, (CHANGE_FEED_CAPACITY,))
+                    connection.execute(BUMP_DATA_VERSION)
+            for notice in notices:
+                self._notify(*notice)
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def __len__(self) -> int:
+        with self._pool.connection() as connection:
+            return connection.execute(COUNT).fetchone()[0]
+
+    @property
+    def last_number(self) -> int:
+        with self._pool.connection() as connection:
+            return connection.execute(GET_LAST_NUMBER).fetchone()[0]
+
+    def data_version(self) -> int:
+        """Counter bumped by every committed write, from any process"""
+        # Kept in the meta table: PRAGMA data_version is per connection and
+        # misses the connection's own commits, so pooled connections disagree
+        with self._pool.connection() as connection:
+            row = connection.execute(GET_DATA_VERSION).fetchone()
+        return row[0] if row is not None else 0
+
+    # Reads
+    def _select(self, sql: str, params: Iterable[Any] = ()) -> List[Employee]:
+        with self._pool.connection() as connection:
+            return [_from_row(row) for row in connection.execute(sql, tuple(params))]
+
+    def get(self, employee_id: str) -> Optional[Employee]:
+        with self._pool.connection() as connection:
+            row = connection.execute(SELECT_ONE, (employee_id,)).fetchone()
+        return _from_row(row) if row is not None else None
+
+    def get_versioned(self, employee_id: str) -> Optional[Tuple[Employee, int]]:
+        with self._pool.connection() as connection:
+            row = connection.execute(SELECT_VERSIONED, (employee_id,)).fetchone()
+        return (_from_row(row[1:]), row[0]) if row is not None else None
+
+    def list(self, skip: int = 0, limit: int = 100) -> List[Employee]:
+        return self._select(SELECT_ALL + " LIMIT ? OFFSET ?", (limit, skip))
+
+    def find(self, filters: Dict[str, Any], skip: int = 0, limit: int = 100) -> List[Employee]:
+        clauses, params = _where(filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._select(_SELECT + where + _ORDER + " LIMIT ? OFFSET ?", params + [limit, skip])
+
+    def page(
+        self,
+        after: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Employee], Optional[str]]:
+        clauses, params = _where(filters)
+        if after is not None:
+            group, number, employee_id = employee_sort_key(after)
+            clauses.insert(0, "(sort_group, id_number, employee_id) > (?, ?, ?)")
+            params[:0] = [group, number or 0, employee_id]
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        items = self._select(_SELECT + where + _ORDER + " LIMIT ?", params + [limit + 1])
+        if len(items) > limit:
+            items = items[:limit]
+            return items, items[-1].employee_id
+        return items, None
+
+    def snapshot(self) -> Iterator[Employee]:
+        """
+        Stream every employee, in employee ID order, from one read transaction
+
+        WAL mode gives the transaction a consistent view while writers carry on,
+        and rows are fetched in batches, so memory stays flat. Uses its own
+        connection so long exports don't hold one of the pool's.
+        """
+        connection = self._pool.connect()
+        try:
+            connection.execute("BEGIN")
+            cursor = connection.execute(SELECT_ALL)
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _from_row(row)
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    # Writes
+    def _allocate(self, connection: sqlite3.Connection, count: int) -> List[str]:
+        connection.execute(BUMP_LAST_NUMBER, (count,))
+        last_number = connection.execute(GET_LAST_NUMBER).fetchone()[0]
+        return [f"{EMPLOYEE_ID_PREFIX}{number}" for number in range(last_number - count + 1, last_number + 1)]
+
+    def create(self, employee: Union[Employee, dict]) -> Employee:
+        return self.create_many([employee])[0]
+
+    def create_many(self, employees: List[Union[Employee, dict]]) -> List[Employee]:
+        validated = [validate_employee(employee) for employee in employees]
+        with self._write() as (connection, notices):
+            employee_ids = self._allocate(connection, len(validated))
+            new_employees = [
+                employee.model_copy(update={"employee_id": employee_id})
+                for employee, employee_id in zip(validated, employee_ids)
+            ]
+            connection.executemany(INSERT, map(_to_row, new_employees))
+            notices.extend(("create", None, employee) for employee in new_employees)
+        return new_employees
+
+    def update(self, employee_id: str, changes: dict, expected_version: Optional[int] = None) -> Optional[Employee]:
+        with self._write() as (connection, notices):
+            row = connection.execute(SELECT_VERSIONED, (employee_id,)).fetchone()
+            if row is None:
+                return None
+            _check_version(employee_id, row[0], expected_version)
+            employee = _from_row(row[1:])
+            updated_employee = Employee.model_validate({**employee.model_dump(), **changes, "employee_id": employee_id})
+            connection.execute(UPDATE, _to_row(updated_employee)[3:] + (employee_id,))
+            notices.append(("update", employee, updated_employee))
+        return updated_employee
+
+    def update_many(self, changes: Dict[str, dict]) -> Tuple[List[Tuple[Employee, Employee]], Dict[str, str]]:
+        updated: List[Tuple[Employee, Employee]] = []
+        errors: Dict[str, str] = {}
+        with self._write() as (connection, notices):
+            for employee_id, employee_changes in changes.items():
+                row = connection.execute(SELECT_ONE, (employee_id,)).fetchone()
+                if row is None:
+                    errors[employee_id] = "Employee not found"
+                    continue
+                employee = _from_row(row)
+                try:
+                    new_employee = Employee.model_validate(
+                        {**employee.model_dump(), **employee_changes, "employee_id": employee_id}
+                    )
+                except ValidationError as exc:
+                    errors[employee_id] = "; ".join(error["msg"] for error in exc.errors())
+                    continue
+                updated.append((employee, new_employee))
+            connection.executemany(UPDATE, (_to_row(new)[3:] + (new.employee_id,) for _, new in updated))
+            notices.extend(("update", old, new) for old, new in updated)
+        return updated, errors
+
+    def delete(self, employee_id: str, expected_version: Optional[int] = None) -> bool:
+        with self._write() as (connection, notices):
+            row = connection.execute(SELECT_VERSIONED, (employee_id,)).fetchone()
+            if row is None:
+                return False
+            _check_version(employee_id, row[0], expected_version)
+            connection.execute(DELETE, (employee_id,))
+            notices.append(("delete", _from_row(row[1:]), None))
+        return True
+
+# Change feed backed by the changes table
+# Every process's writes land in the same table, numbered by SQLite in commit
+# order, so consumers see all of them whichever worker they talk to, and the
+# epoch (kept in the meta table) holds across workers and restarts. The last
+# CHANGE_FEED_CAPACITY events are kept. Reads block on the database: call
+# them off the event loop. A long-poll wakes at once for writes made by this
+# process and checks for other processes' writes every POLL_INTERVAL seconds.
+class SQLiteChangeFeed(ChangeFeed):
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, store: SQLiteEmployeeStore, capacity: int = CHANGE_FEED_CAPACITY):
+        super().__init__(capacity)
+        self._pool = store._pool
+        with store._transaction() as connection:
+            connection.execute(INIT_CHANGE_EPOCH, (secrets.randbits(31),))
+            self.epoch = "%08x" % connection.execute(GET_CHANGE_EPOCH).fetchone()[0]
+
+    def _range(self) -> Tuple[int, int]:
+        # (first kept seq, last seq); first is last + 1 when none are kept
+        with self._pool.connection() as connection:
+            first_seq, last_seq = connection.execute(CHANGE_RANGE).fetchone()
+        last_seq = last_seq or 0
+        return (first_seq if first_seq is not None else last_seq + 1), last_seq
+
+    @property
+    def last_seq(self) -> int:
+        return self._range()[1]
+
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        # The event is already in the table; only wake this process's waiters
+        self._wake_waiters()
+
+    def is_current(self, epoch: Optional[str], since: int) -> bool:
+        if epoch is not None and epoch != self.epoch:
+            return False
+        first_seq, last_seq = self._range()
+        return first_seq - 1 <= since <= last_seq
+
+    def since(self, since: int, limit: int = 1000) -> List[ChangeEvent]:
+        with self._pool.connection() as connection:
+            rows = connection.execute(SELECT_CHANGES, (since, limit)).fetchall()
+        return [
+            ChangeEvent.model_construct(
+                seq=seq, op=op, employee_id=employee_id, timestamp=timestamp,
+                employee=Employee.model_validate_json(employee) if employee is not None else None,
+            )
+            for seq, op, employee_id, employee, timestamp in rows
+        ]
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            waiter = loop.create_future()
+            with self._lock:
+                self._waiters.append((loop, waiter))
+            try:
+                # Registered before checking, so a local write in between still wakes it
+                if await asyncio.to_thread(lambda: self.last_seq) > since:
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(waiter, min(self.POLL_INTERVAL, remaining))
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
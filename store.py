@@ -0,0 +1,761 @@
+import heapq
+import sys
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+from contextlib import ExitStack
+from enum import Enum
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import ValidationError
+
+from models import Employee
+
+# Employee IDs look like EMP1001; numbering starts after FIRST_EMPLOYEE_NUMBER
+EMPLOYEE_ID_PREFIX = "EMP"
+FIRST_EMPLOYEE_NUMBER = 1000
+
+# Returns the numeric part of an employee ID, or None if it isn't EMP<number>
+def parse_employee_number(employee_id: str) -> Optional[int]:
+    if not employee_id.startswith(EMPLOYEE_ID_PREFIX):
+        return None
+    try:
+        return int(employee_id[len(EMPLOYEE_ID_PREFIX):])
+    except ValueError:
+        return None
+
+# Monotonic employee ID allocator
+# Seeded once with the highest number in use; afterwards each allocation is a
+# counter increment under a lock, so concurrent creates never get the same ID
+# and IDs of deleted employees are never handed out again.
+class IdAllocator:
+    def __init__(self, last_number: int = FIRST_EMPLOYEE_NUMBER):
+        self._last_number = last_number
+        self._lock = threading.Lock()
+
+    @property
+    def last_number(self) -> int:
+        return self._last_number
+
+    def observe(self, employee_id: str) -> None:
+        """Move the high-water mark past an ID that is already in use"""
+        number = parse_employee_number(employee_id)
+        if number is not None and number > self._last_number:
+            with self._lock:
+                if number > self._last_number:
+                    self._last_number = number
+
+    def allocate(self) -> str:
+        """Return the next unused employee ID"""
+        with self._lock:
+            self._last_number += 1
+            return f"{EMPLOYEE_ID_PREFIX}{self._last_number}"
+
+    def allocate_many(self, count: int) -> List[str]:
+        """Reserve `count` consecutive employee IDs in one step"""
+        with self._lock:
+            first = self._last_number + 1
+            self._last_number += count
+        return [f"{EMPLOYEE_ID_PREFIX}{number}" for number in range(first, first + count)]
+
+# Fields that get a secondary (inverted) index: value -> set of employee_ids
+INDEXED_FIELDS = ("department", "role", "status", "employment_type", "is_active", "city")
+
+# Index keys use plain values so RoleType.developer and "Developer" match
+# (str enums hash by member name, not by value)
+def index_key(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+# Sort key that orders employee IDs by their number (EMP999 before EMP1000);
+# the ID itself is the last element so a key can be mapped back to its record
+def employee_sort_key(employee_id: str):
+    number = parse_employee_number(employee_id)
+    return (0, number, employee_id) if number is not None else (1, 0, employee_id)
+
+# Records are validated into the Employee model exactly once, on write
+def validate_employee(employee: Union[Employee, dict]) -> Employee:
+    return employee if isinstance(employee, Employee) else Employee.model_validate(employee)
+
+EMPLOYEE_FIELDS = tuple(Employee.model_fields)
+
+# Builds an Employee from already-valid values for every field without
+# validating them; the same result as Employee.model_construct(**values),
+# minus its per-field default handling
+def construct_employee(values: dict) -> Employee:
+    employee = _new_employee(Employee)
+    _set_attribute(employee, "__dict__", values)
+    _set_attribute(employee, "__pydantic_fields_set__", set(values))
+    _set_attribute(employee, "__pydantic_extra__", None)
+    _set_attribute(employee, "__pydantic_private__", None)
+    return employee
+
+_new_employee = Employee.__new__
+_set_attribute = object.__setattr__
+
+# Compact form of an employee for CompactEmployeeStore
+# A model carries an instance dict plus a fields-set per record; a slotted
+# record holds just the field values. String fields with few distinct values
+# are interned so all records share one copy of each (role, status and the
+# other enum fields already share their enum members).
+INTERNED_FIELDS = ("gender", "city", "state", "country", "current_work_location", "department")
+
+class EmployeeRecord:
+    __slots__ = EMPLOYEE_FIELDS
+
+_record_values = attrgetter(*EMPLOYEE_FIELDS)
+_new_record = EmployeeRecord.__new__
+
+def pack_employee(employee: Employee) -> EmployeeRecord:
+    record = _new_record(EmployeeRecord)
+    values = employee.__dict__
+    for field in EMPLOYEE_FIELDS:
+        setattr(record, field, values[field])
+    for field in INTERNED_FIELDS:
+        setattr(record, field, sys.intern(values[field]))
+    return record
+
+def unpack_employee(record: EmployeeRecord) -> Employee:
+    return construct_employee(dict(zip(EMPLOYEE_FIELDS, _record_values(record))))
+
+# employee_id -> Employee mapping that stores EmployeeRecords: models are
+# packed when stored and rebuilt (without validation) when read
+class CompactRecords(MutableMapping):
+    def __init__(self):
+        self._data: Dict[str, EmployeeRecord] = {}
+
+    def __getitem__(self, employee_id: str) -> Employee:
+        return unpack_employee(self._data[employee_id])
+
+    def get(self, employee_id: str, default=None):
+        record = self._data.get(employee_id)
+        return default if record is None else unpack_employee(record)
+
+    def __setitem__(self, employee_id: str, employee: Employee) -> None:
+        self._data[employee_id] = pack_employee(employee)
+
+    def __delitem__(self, employee_id: str) -> None:
+        del self._data[employee_id]
+
+    def __contains__(self, employee_id) -> bool:
+        return employee_id in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def record(self, employee_id: str) -> Optional[EmployeeRecord]:
+        """The packed record itself, or None"""
+        return self._data.get(employee_id)
+
+# Point-in-time list of packed records that reads as a sequence of Employees
+# Each model is rebuilt when its item is read, so a pass over the snapshot
+# never holds more than one of them. Records are replaced, never modified, on
+# write, so the snapshot stays consistent.
+class CompactSnapshot(Sequence):
+    __slots__ = ("_records",)
+
+    def __init__(self, records: List[EmployeeRecord]):
+        self._records = records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CompactSnapshot(self._records[index])
+        return unpack_employee(self._records[index])
+
+    def __iter__(self) -> Iterator[Employee]:
+        return map(unpack_employee, self._records)
+
+# Signature of change listeners: (operation, old record, new record), where the
+# operation is "create" (old is None), "update" or "delete" (new is None)
+ChangeListener = Callable[[str, Optional[Employee], Optional[Employee]], None]
+
+# Deleted IDs are left in the ordering as tombstones and swept out in one pass
+# once they make up more than half of it
+_COMPACT_MIN_TOMBSTONES = 1024
+
+_LOAD_BATCH_SIZE = 10_000
+
+# Filtered queries walk the ID ordering testing index membership, and give up
+# for a sort of the matching IDs once the walk has visited this many keys per
+# ID in the smallest posting set (a membership test is a few times cheaper
+# than computing a sort key)
+_WALK_KEYS_PER_MATCH = 4
+_NO_IDS: Set[str] = frozenset()
+
+# Number of locks writers to individual records are spread over
+LOCK_STRIPES = 64
+
+# Raised by a compare-and-set write when the record has changed since the
+# caller read it, i.e. its version is no longer the expected one
+class VersionConflict(Exception):
+    def __init__(self, employee_id: str, expected: int, actual: int):
+        super().__init__(f"Employee {employee_id} is at version {actual}, not {expected}")
+        self.employee_id = employee_id
+        self.expected = expected
+        self.actual = actual
+
+# Storage interface shared by the in-memory and SQLite backends
+# Every backend hands out validated Employee models and notifies subscribed
+# listeners after each committed write, in write order. Each record carries a
+# version, 1 when it is created and bumped by every update; writes given an
+# `expected_version` are compare-and-set and raise VersionConflict instead of
+# applying when the record has moved on.
+class BaseEmployeeStore(ABC):
+    # True when calls do blocking I/O and should run off the event loop
+    blocking = False
+
+    def __init__(self):
+        self._listeners: List[ChangeListener] = []
+
+    # Change notification
+    def subscribe(self, listener: ChangeListener) -> None:
+        """Call `listener(operation, old, new)` after every write"""
+        self._listeners.append(listener)
+
+    def _notify(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        for listener in self._listeners:
+            listener(operation, old, new)
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    def __iter__(self) -> Iterator[Employee]:
+        return iter(self.snapshot())
+
+    @property
+    @abstractmethod
+    def last_number(self) -> int:
+        """Highest employee number ever allocated or loaded"""
+
+    @abstractmethod
+    def get(self, employee_id: str) -> Optional[Employee]: ...
+
+    @abstractmethod
+    def get_versioned(self, employee_id: str) -> Optional[Tuple[Employee, int]]: ...
+
+    def version(self, employee_id: str) -> int:
+        """Current version of a record; 0 if it does not exist"""
+        current = self.get_versioned(employee_id)
+        return current[1] if current is not None else 0
+
+    def index_stats(self) -> Dict[str, int]:
+        """Distinct keys per secondary index kept in this process (none by default)"""
+        return {}
+
+    @abstractmethod
+    def list(self, skip: int = 0, limit: int = 100) -> List[Employee]: ...
+
+    @abstractmethod
+    def find(self, filters: Dict[str, Any], skip: int = 0, limit: int = 100) -> List[Employee]: ...
+
+    @abstractmethod
+    def page(
+        self,
+        after: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Employee], Optional[str]]: ...
+
+    @abstractmethod
+    def snapshot(self) -> Iterable[Employee]: ...
+
+    def snapshot_rows(self) -> Sequence[Any]:
+        """
+        Point-in-time rows in employee ID order, for consumers that only read
+        fields as attributes (report columns, persistence snapshots): the
+        models themselves, or whatever cheaper form the store holds them in
+        """
+        return list(self.snapshot())
+
+    @abstractmethod
+    def create(self, employee: Union[Employee, dict]) -> Employee: ...
+
+    @abstractmethod
+    def create_many(self, employees: List[Union[Employee, dict]]) -> List[Employee]: ...
+
+    @abstractmethod
+    def update(self, employee_id: str, changes: dict, expected_version: Optional[int] = None) -> Optional[Employee]: ...
+
+    @abstractmethod
+    def update_many(self, changes: Dict[str, dict]) -> Tuple[List[Tuple[Employee, Employee]], Dict[str, str]]: ...
+
+    @abstractmethod
+    def delete(self, employee_id: str, expected_version: Optional[int] = None) -> bool: ...
+
+# In-memory employee store
+# Keeps records in a dict keyed by employee_id so lookups, updates and deletes
+# are O(1) instead of a scan over a list. A sorted list of ID keys gives every
+# listing its order: seeking to a cursor is a binary search, so a keyset page
+# costs O(limit) at any depth. Secondary indexes on INDEXED_FIELDS are kept in
+# step with every write; filtered queries walk the ordering and test index
+# membership, so they stop as soon as they have a page.
+#
+# Records are validated into Employee models once, when they are written, and
+# stored in that form; reads hand them out as-is without re-validating.
+#
+# Components that derive state from the store (persistence, for one) subscribe
+# to changes; listeners run synchronously after each write, in write order.
+#
+# The store is safe to use from several threads. Reads take no locks: records
+# are immutable and swapped in whole. A write to a record holds that record's
+# lock (one of LOCK_STRIPES, picked by ID) while it reads, checks and
+# validates, so writers to different employees proceed side by side; only the
+# final publish step (records, indexes, listeners, which must see writes in
+# one order) shares a lock, and it does no validation.
+class EmployeeStore(BaseEmployeeStore):
+    # Mapping type holding the records (employee_id -> Employee)
+    record_map: Callable[[], Dict[str, Employee]] = dict
+
+    def __init__(self, employees: Iterable[Union[Employee, dict]] = (), last_number: int = FIRST_EMPLOYEE_NUMBER):
+        super().__init__()
+        self._records: Dict[str, Employee] = self.record_map()
+        # Versions of records updated since they were loaded or created; the
+        # rest are at version 1. Negative while a write is being published.
+        self._versions: Dict[str, int] = {}
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._publish_lock = threading.Lock()
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        # `last_number` lets a persisted store restore its high-water mark, so
+        # IDs of employees deleted before a restart are not reused either
+        self._ids = IdAllocator(last_number)
+        # Indexed in batches, so loading never holds every model at once
+        batch: List[Employee] = []
+        for employee in employees:
+            employee = validate_employee(employee)
+            self._records[employee.employee_id] = employee
+            self._ids.observe(employee.employee_id)
+            batch.append(employee)
+            if len(batch) >= _LOAD_BATCH_SIZE:
+                self._index_add_many(batch)
+                batch = []
+        self._index_add_many(batch)
+        self._order: List[tuple] = sorted(employee_sort_key(employee_id) for employee_id in self._records)
+        self._tombstones = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Employee]:
+        return iter(self._records.values())
+
+    @property
+    def last_number(self) -> int:
+        return self._ids.last_number
+
+    def __contains__(self, employee_id: str) -> bool:
+        return employee_id in self._records
+
+    def index_stats(self) -> Dict[str, int]:
+        return {field: len(index) for field, index in self._indexes.items()}
+
+    # Index maintenance
+    def _index_add(self, employee: Employee, fields: Iterable[str] = INDEXED_FIELDS) -> None:
+        employee_id = employee.employee_id
+        for field in fields:
+            self._indexes[field].setdefault(index_key(getattr(employee, field)), set()).add(employee_id)
+
+    def _index_remove(self, employee: Employee, fields: Iterable[str] = INDEXED_FIELDS) -> None:
+        employee_id = employee.employee_id
+        for field in fields:
+            index = self._indexes[field]
+            key = index_key(getattr(employee, field))
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(employee_id)
+                if not ids:
+                    del index[key]
+
+    def _index_add_many(self, employees: List[Employee], fields: Iterable[str] = INDEXED_FIELDS) -> None:
+        # Group IDs by value first so each posting set is updated once per batch
+        for field in fields:
+            groups: Dict[Any, List[str]] = {}
+            for employee in employees:
+                groups.setdefault(index_key(getattr(employee, field)), []).append(employee.employee_id)
+            index = self._indexes[field]
+            for key, ids in groups.items():
+                index.setdefault(key, set()).update(ids)
+
+    def _index_remove_many(self, employees: List[Employee], fields: Iterable[str] = INDEXED_FIELDS) -> None:
+        for field in fields:
+            groups: Dict[Any, List[str]] = {}
+            for employee in employees:
+                groups.setdefault(index_key(getattr(employee, field)), []).append(employee.employee_id)
+            index = self._indexes[field]
+            for key, ids in groups.items():
+                posting = index.get(key)
+                if posting is not None:
+                    posting.difference_update(ids)
+                    if not posting:
+                        del index[key]
+
+    def _insert(self, employee: Employee) -> Employee:
+        self._records[employee.employee_id] = employee
+        self._index_add(employee)
+        return employee
+
+    # Write concurrency
+    def _record_lock(self, employee_id: str) -> threading.Lock:
+        return self._stripes[hash(employee_id) % LOCK_STRIPES]
+
+    def _check_version(self, employee_id: str, expected_version: Optional[int]) -> None:
+        # Called holding the record's lock, so the version can't move meanwhile
+        if expected_version is not None:
+            actual = self._versions.get(employee_id, 1)
+            if actual != expected_version:
+                raise VersionConflict(employee_id, expected_version, actual)
+
+    def _publish(self, employee_id: str, employee: Optional[Employee]) -> None:
+        # Swap in a new record (None removes it) and bump its version; with
+        # the publish lock held. The version reads negative in between, so a
+        # lock-free get_versioned() that overlaps retries.
+        version = self._versions.get(employee_id, 1)
+        self._versions[employee_id] = -version
+        if employee is None:
+            del self._records[employee_id]
+            del self._versions[employee_id]
+        else:
+            self._records[employee_id] = employee
+            self._versions[employee_id] = version + 1
+
+    # Ordering maintenance
+    def _order_add(self, employee_id: str) -> None:
+        key = employee_sort_key(employee_id)
+        # Allocated IDs only grow, so the common case is an append
+        if not self._order or key > self._order[-1]:
+            self._order.append(key)
+            return
+        position = bisect_left(self._order, key)
+        if position < len(self._order) and self._order[position] == key:
+            # The ID's tombstone is still in the list and becomes live again
+            self._tombstones -= 1
+        else:
+            self._order.insert(position, key)
+
+    def _order_remove(self) -> None:
+        self._tombstones += 1
+        if self._tombstones > _COMPACT_MIN_TOMBSTONES and self._tombstones * 2 > len(self._order):
+            self._order = [key for key in self._order if key[2] in self._records]
+            self._tombstones = 0
+
+    def get(self, employee_id: str) -> Optional[Employee]:
+        """Return the employee with the given ID, or None"""
+        return self._records.get(employee_id)
+
+    def get_versioned(self, employee_id: str) -> Optional[Tuple[Employee, int]]:
+        """
+        Return the employee and its version, or None
+
+        Lock-free, seqlock style: a version read before and after the record
+        that is positive and unchanged means no write overlapped the read.
+        """
+        versions = self._versions
+        while True:
+            version = versions.get(employee_id, 1)
+            employee = self._records.get(employee_id)
+            if version > 0 and versions.get(employee_id, 1) == version:
+                return (employee, version) if employee is not None else None
+
+    def version(self, employee_id: str) -> int:
+        if employee_id not in self._records:
+            return 0
+        return abs(self._versions.get(employee_id, 1))
+
+    def list(self, skip: int = 0, limit: int = 100) -> List[Employee]:
+        """Return up to `limit` employees in employee ID order, starting at `skip`"""
+        return self._ordered(None, count=skip + limit)[skip:]
+
+    def _postings(self, filters: Optional[Dict[str, Any]]) -> Optional[List[Set[str]]]:
+        # Posting sets of the active filters, smallest first, or None when
+        # there is nothing to filter on
+        active = {field: index_key(value) for field, value in (filters or {}).items() if value is not None}
+        unknown = set(active) - set(INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter on non-indexed fields: {', '.join(sorted(unknown))}")
+        if not active:
+            return None
+        return sorted((self._indexes[field].get(value, _NO_IDS) for field, value in active.items()), key=len)
+
+    def _ordered(self, postings: Optional[List[Set[str]]], after_key: Optional[tuple] = None,
+                 count: int = 100) -> List[Employee]:
+        """
+        Up to `count` employees in every posting set (every employee when
+        postings is None), in employee ID order after `after_key`
+
+        Walks the ID ordering from `after_key`, testing index membership, so
+        the cost is about count * employees / matches and nothing is sorted.
+        When the matches are too sparse for that (a walk longer than
+        _WALK_KEYS_PER_MATCH keys per ID of the smallest posting set), the
+        matching IDs are collected and the first `count` picked out instead,
+        which costs O(smallest posting set).
+        """
+        order = self._order
+        records = self._records
+        position = 0 if after_key is None else bisect_right(order, after_key)
+        if postings is None:
+            # Every live record matches; tombstones read as None
+            employees = map(records.get, (key[2] for key in islice(order, position, None)))
+            return list(islice(filter(None, employees), count))
+
+        end = min(len(order), position + _WALK_KEYS_PER_MATCH * len(postings[0]))
+        found: List[Employee] = []
+        while position < end and len(found) < count:
+            employee_id = order[position][2]
+            position += 1
+            if not all(employee_id in ids for ids in postings):
+                continue
+            # Skips tombstones, and records deleted while the indexes were read
+            employee = records.get(employee_id)
+            if employee is not None:
+                found.append(employee)
+        if len(found) >= count or position >= len(order):
+            return found
+
+        # The posting sets change under concurrent writes: copy the one that
+        # is iterated (in one step) and only test membership in the others
+        smallest, others = postings[0], postings[1:]
+        keys = [employee_sort_key(employee_id) for employee_id in set(smallest)
+                if all(employee_id in ids for ids in others)]
+        if after_key is not None:
+            keys = [key for key in keys if key > after_key]
+        return [employee for employee in map(records.get, (key[2] for key in heapq.nsmallest(count, keys)))
+                if employee is not None]
+
+    def find(self, filters: Dict[str, Any], skip: int = 0, limit: int = 100) -> List[Employee]:
+        """
+        Return employees matching every filter (field -> value), ordered by ID
+
+        Filters with a None value are ignored. Only INDEXED_FIELDS can be used.
+        Without filters this is the same as list().
+        """
+        return self._ordered(self._postings(filters), count=skip + limit)[skip:]
+
+    def page(
+        self,
+        after: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Employee], Optional[str]]:
+        """
+        Keyset pagination in employee ID order
+
+        Returns up to `limit` employees whose ID sorts after `after` (from the
+        start when None), plus the ID to resume from, or None on the last page.
+        Because the position is an ID rather than an offset, deletes and
+        inserts between calls never make a page skip or repeat employees.
+        """
+        after_key = employee_sort_key(after) if after is not None else None
+        # One extra employee tells whether there is a next page; the ordering
+        # is walked from the cursor, so a page costs the same at any depth
+        items = self._ordered(self._postings(filters), after_key, count=limit + 1)
+        if len(items) > limit:
+            items = items[:limit]
+            return items, items[-1].employee_id
+        return items, None
+
+    def snapshot(self) -> List[Employee]:
+        """
+        Point-in-time view of every employee, in employee ID order
+
+        Only references are copied. Records are never modified in place (an
+        update swaps in a new model), so the snapshot stays consistent while
+        later writes replace or remove records.
+        """
+        records = self._records
+        return [employee for employee in map(records.get, (key[2] for key in self._order)) if employee is not None]
+
+    def snapshot_rows(self) -> List[Employee]:
+        return self.snapshot()
+
+    def subscribe_with_snapshot(self, listener: ChangeListener) -> List[Employee]:
+        """
+        subscribe() and snapshot() in one step
+
+        No write can land between the two, so `listener` is called for
+        exactly the writes the returned snapshot doesn't include; a component
+        built from the snapshot off to the side stays exact.
+        """
+        with self._publish_lock:
+            self.subscribe(listener)
+            return self.snapshot()
+
+    def add(self, employee: Union[Employee, dict]) -> Employee:
+        """Insert a new employee record (the record must carry its employee_id)"""
+        employee = validate_employee(employee)
+        employee_id = employee.employee_id
+        with self._record_lock(employee_id), self._publish_lock:
+            if employee_id in self._records:
+                raise KeyError(f"Employee {employee_id} already exists")
+            self._ids.observe(employee_id)
+            self._order_add(employee_id)
+            self._insert(employee)
+            self._notify("create", None, employee)
+        return employee
+
+    def put(self, employee: Union[Employee, dict]) -> Employee:
+        """Insert or replace a record under its own employee_id (used to replay logs)"""
+        employee = validate_employee(employee)
+        employee_id = employee.employee_id
+        with self._record_lock(employee_id), self._publish_lock:
+            old = self._records.get(employee_id)
+            if old is None:
+                self._ids.observe(employee_id)
+                self._order_add(employee_id)
+                self._insert(employee)
+                self._notify("create", None, employee)
+            else:
+                self._publish(employee_id, employee)
+                self._index_remove(old)
+                self._index_add(employee)
+                self._notify("update", old, employee)
+        return employee
+
+    def create(self, employee: Union[Employee, dict]) -> Employee:
+        """Insert a copy of `employee` under a newly allocated employee_id"""
+        employee_id = self._ids.allocate()
+        if isinstance(employee, Employee):
+            new_employee = employee.model_copy(update={"employee_id": employee_id})
+        else:
+            new_employee = Employee.model_validate({**employee, "employee_id": employee_id})
+        # A freshly allocated ID can't be contended, so no record lock
+        with self._publish_lock:
+            self._order_add(employee_id)
+            self._insert(new_employee)
+            self._notify("create", None, new_employee)
+        return new_employee
+
+    def create_many(self, employees: List[Union[Employee, dict]]) -> List[Employee]:
+        """
+        Insert a batch of employees under newly allocated, consecutive IDs
+
+        All records are validated before any is stored, IDs are reserved in
+        one step and the secondary indexes are updated once for the batch.
+        """
+        validated = [validate_employee(employee) for employee in employees]
+        employee_ids = self._ids.allocate_many(len(validated))
+        new_employees = [
+            employee.model_copy(update={"employee_id": employee_id})
+            for employee, employee_id in zip(validated, employee_ids)
+        ]
+        with self._publish_lock:
+            for employee in new_employees:
+                self._records[employee.employee_id] = employee
+                self._order_add(employee.employee_id)
+            self._index_add_many(new_employees)
+            for employee in new_employees:
+                self._notify("create", None, employee)
+        return new_employees
+
+    def update_many(self, changes: Dict[str, dict]) -> Tuple[List[Tuple[Employee, Employee]], Dict[str, str]]:
+        """
+        Apply per-employee changes (employee_id -> changes) as one batch
+
+        Returns the (old, new) record pairs that were updated, and an error
+        message for each employee_id that was missing or failed validation.
+        Those are skipped; the rest of the batch is still applied. Indexes are
+        updated in one pass at the end.
+        """
+        updated: List[Tuple[Employee, Employee]] = []
+        errors: Dict[str, str] = {}
+        with ExitStack() as stack:
+            # Take the batch's record locks in one global order, so two
+            # overlapping batches can't deadlock
+            for stripe in sorted({hash(employee_id) % LOCK_STRIPES for employee_id in changes}):
+                stack.enter_context(self._stripes[stripe])
+            for employee_id, employee_changes in changes.items():
+                employee = self._records.get(employee_id)
+                if employee is None:
+                    errors[employee_id] = "Employee not found"
+                    continue
+                try:
+                    new_employee = Employee.model_validate(
+                        {**employee.model_dump(), **employee_changes, "employee_id": employee_id}
+                    )
+                except ValidationError as exc:
+                    errors[employee_id] = "; ".join(error["msg"] for error in exc.errors())
+                    continue
+                updated.append((employee, new_employee))
+
+            changed_fields = {field for employee_changes in changes.values() for field in employee_changes}
+            fields = [field for field in INDEXED_FIELDS if field in changed_fields]
+            with self._publish_lock:
+                for _, new in updated:
+                    self._publish(new.employee_id, new)
+                if updated and fields:
+                    self._index_remove_many([old for old, _ in updated], fields)
+                    self._index_add_many([new for _, new in updated], fields)
+                for old, new in updated:
+                    self._notify("update", old, new)
+        return updated, errors
+
+    def update(self, employee_id: str, changes: dict, expected_version: Optional[int] = None) -> Optional[Employee]:
+        """
+        Merge `changes` into an employee record; returns None if not found
+
+        The merged record is validated before it replaces the old one, so an
+        invalid change raises pydantic.ValidationError and leaves it untouched.
+        With `expected_version`, raises VersionConflict unless the record is
+        still at that version.
+        """
+        with self._record_lock(employee_id):
+            employee = self._records.get(employee_id)
+            if employee is None:
+                return None
+            self._check_version(employee_id, expected_version)
+            # Replace rather than mutate so references handed out earlier stay unchanged
+            updated_employee = Employee.model_validate({**employee.model_dump(), **changes, "employee_id": employee_id})
+
+            # Re-index only the fields whose value actually changed
+            changed = [
+                field for field in INDEXED_FIELDS
+                if field in changes and index_key(getattr(employee, field)) != index_key(getattr(updated_employee, field))
+            ]
+            with self._publish_lock:
+                self._publish(employee_id, updated_employee)
+                if changed:
+                    self._index_remove(employee, changed)
+                    self._index_add(updated_employee, changed)
+                self._notify("update", employee, updated_employee)
+        return updated_employee
+
+    def delete(self, employee_id: str, expected_version: Optional[int] = None) -> bool:
+        """Remove an employee; returns False if not found (VersionConflict as for update)"""
+        with self._record_lock(employee_id):
+            employee = self._records.get(employee_id)
+            if employee is None:
+                return False
+            self._check_version(employee_id, expected_version)
+            with self._publish_lock:
+                self._publish(employee_id, None)
+                self._index_remove(employee)
+                self._order_remove()
+                self._notify("delete", employee, None)
+        return True
+
+# In-memory store that keeps employees as compact, slotted records with shared
+# strings instead of models, for a much smaller footprint per employee. Every
+# read rebuilds the Employee model(s) it returns, which costs a few
+# microseconds per record, so it suits memory-bound deployments with many rows.
+class CompactEmployeeStore(EmployeeStore):
+    record_map = CompactRecords
+
+    def snapshot_rows(self) -> List[EmployeeRecord]:
+        """
+        Point-in-time list of the packed records, in employee ID order
+
+        They have every Employee field as an attribute, so columns can be
+        read straight from them without rebuilding a model per record.
+        """
+        record = self._records.record
+        return [row for row in map(record, (key[2] for key in self._order)) if row is not None]
+
+    def snapshot(self) -> CompactSnapshot:
+        """Like EmployeeStore.snapshot, rebuilding each model only when it is read"""
+        return CompactSnapshot(self.snapshot_rows())
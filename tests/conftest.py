@@ -0,0 +1,40 @@
+"""
+Fixtures for tests that go through the API (main.py)
+
+main.py configures itself from the environment when imported, so it is
+imported once per test session, on the memory backend and a fresh data
+directory. Tests share that app: they create the employees they change
+rather than relying on the seed data staying as it was.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("HR_STORAGE_BACKEND", "memory")
+        patch.setenv("HR_DATA_DIR", str(tmp_path_factory.mktemp("data")))
+        import main
+    yield main
+    main.close_storage()
+
+@pytest.fixture(scope="session")
+def access_token(app_module):
+    response = TestClient(app_module.app).post("/login", data={"username": "admin", "password": "adminpassword"})
+    return response.json()["access_token"]
+
+@pytest.fixture
+def client(app_module, access_token):
+    """A client signed in with a Bearer header (no cookie)"""
+    return TestClient(app_module.app, headers={"Authorization": f"Bearer {access_token}"})
+
+@pytest.fixture
+def new_employee(app_module, client):
+    """Creates an employee through the API and returns it as JSON"""
+    template = next(iter(app_module.employees_db.snapshot())).model_dump(mode="json")
+
+    def create(**changes):
+        response = client.post("/employees/", json={**template, **changes})
+        assert response.status_code == 200, response.text
+        return response.json()["details"]
+    return create
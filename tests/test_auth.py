@@ -0,0 +1,105 @@
+"""
+Caching of verified tokens and their users (auth.py)
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from jose import jwt
+
+import auth
+
+@pytest.fixture
+def user(monkeypatch):
+    """A user of its own in fake_users_db, with empty caches around the test"""
+    monkeypatch.setitem(auth.fake_users_db, "tester", {
+        "username": "tester",
+        "full_name": "Test User",
+        "email": "tester@example.com",
+        "hashed_password": "not used",
+        "disabled": False,
+    })
+    auth.invalidate_user("tester")
+    yield "tester"
+    auth.invalidate_user("tester")
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Counts JWT decodes, i.e. lookups the token cache did not answer"""
+    calls = []
+    decode = jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: calls.append(args[0]) or decode(*args, **kwargs))
+    return calls
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock seen by auth.py, moved forward by setting clock.now"""
+    fake = SimpleNamespace(now=time.time(), perf_counter=time.perf_counter)
+    fake.time = lambda: fake.now
+    monkeypatch.setattr(auth, "time", fake)
+    return fake
+
+def test_verified_token_is_cached(user, decodes):
+    token = auth.create_access_token({"sub": user})
+    first = auth.get_user_from_token(token)
+    assert first.username == user
+    assert auth.get_user_from_token(token) is first
+    assert decodes == [token]
+
+def test_invalid_tokens_are_not_cached(user, decodes):
+    token = auth.create_access_token({"sub": user}) + "x"
+    assert auth.get_user_from_token(token) is None
+    assert auth.get_user_from_token(token) is None
+    assert decodes == [token, token]
+
+def test_update_user_evicts_cached_tokens(user, decodes):
+    token = auth.create_access_token({"sub": user})
+    assert auth.get_user_from_token(token).disabled is False
+
+    auth.update_user(user, disabled=True)
+    assert auth.token_cache.get(token) is None
+    assert auth.get_user_from_token(token).disabled is True
+    assert decodes == [token, token]
+
+def test_invalidate_user_evicts_cached_tokens_of_that_user_only(user, decodes):
+    token, admin_token = auth.create_access_token({"sub": user}), auth.create_access_token({"sub": "admin"})
+    auth.get_user_from_token(token)
+    auth.get_user_from_token(admin_token)
+
+    # A removed user: the cached token must stop resolving to them
+    del auth.fake_users_db[user]
+    auth.invalidate_user(user)
+    assert auth.get_user_from_token(token) is None
+    assert auth.token_cache.get(admin_token) == "admin"
+
+def test_cached_token_expires_at_its_exp(user, clock):
+    token = auth.create_access_token({"sub": user}, expires_delta=timedelta(minutes=5))
+    expires_at = jwt.get_unverified_claims(token)["exp"]
+    assert auth.get_user_from_token(token).username == user
+
+    clock.now = expires_at - 1
+    assert auth.token_cache.get(token) == user
+    clock.now = expires_at
+    assert auth.token_cache.get(token) is None
+
+def test_token_without_exp_is_kept_for_the_ttl(user, clock):
+    auth.token_cache.put("no-exp", user, None)
+    clock.now += auth.TOKEN_CACHE_TTL - 1
+    assert auth.token_cache.get("no-exp") == user
+    clock.now += 1
+    assert auth.token_cache.get("no-exp") is None
+
+def test_cache_drops_least_recently_used_tokens():
+    cache = auth.TokenCache(maxsize=2)
+    expires_at = time.time() + 60
+    cache.put("a", "alice", expires_at)
+    cache.put("b", "bob", expires_at)
+    assert cache.get("a") == "alice"  # "b" is now the least recently used
+    cache.put("c", "carol", expires_at)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("alice", "carol")
@@ -0,0 +1,168 @@
+"""
+Change feed (change_feed.py, SQLiteChangeFeed) and its endpoints:
+GET /employees/changes and the SSE stream /employees/changes/stream
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import threading
+from itertools import islice
+
+import pytest
+
+from change_feed import ChangeFeed
+from migrate_data import stream_employees
+from sqlite_store import SQLiteChangeFeed, SQLiteEmployeeStore
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_employees.json")
+
+def sample_employees(count=10):
+    return list(islice(stream_employees(SAMPLE_FILE, generate_if_missing=False), count))
+
+def fill(feed, count):
+    for employee in sample_employees(count):
+        feed.on_change("create", None, employee)
+
+# The feed itself
+def test_events_after_since_in_order():
+    feed = ChangeFeed()
+    fill(feed, 5)
+    assert feed.last_seq == 5
+    assert [event.seq for event in feed.since(2)] == [3, 4, 5]
+    assert [event.seq for event in feed.since(0, limit=2)] == [1, 2]
+    assert feed.since(5) == []
+
+def test_consumer_behind_the_buffer_must_resync():
+    feed = ChangeFeed(capacity=3)
+    fill(feed, 5)
+    # Events 1 and 2 have been dropped: a consumer at 0 or 1 missed some
+    assert not feed.is_current(feed.epoch, 0)
+    assert not feed.is_current(feed.epoch, 1)
+    assert feed.is_current(feed.epoch, 2)
+    assert [event.seq for event in feed.since(2)] == [3, 4, 5]
+    # Ahead of the feed: a sequence number this feed never handed out
+    assert not feed.is_current(feed.epoch, 6)
+
+def test_other_epoch_must_resync():
+    feed = ChangeFeed()
+    fill(feed, 2)
+    assert feed.is_current(feed.epoch, 1)
+    assert feed.is_current(None, 1)
+    assert not feed.is_current(ChangeFeed().epoch, 1)
+
+def test_wait_returns_when_an_event_arrives():
+    feed = ChangeFeed()
+    employee = sample_employees(1)[0]
+
+    async def scenario():
+        assert not await feed.wait(0, 0.01)
+        threading.Timer(0.05, feed.on_change, ("create", None, employee)).start()
+        assert await feed.wait(0, 5)
+        assert await feed.wait(0, 0)  # already past `since`: no waiting
+    asyncio.run(scenario())
+
+def test_sqlite_feed_is_shared_by_every_process(tmp_path):
+    # Two stores on one database stand in for two workers
+    path = str(tmp_path / "employees.db")
+    first, second = SQLiteEmployeeStore(path), SQLiteEmployeeStore(path)
+    try:
+        first_feed, second_feed = SQLiteChangeFeed(first), SQLiteChangeFeed(second)
+        assert first_feed.epoch == second_feed.epoch
+        created = first.create_many(sample_employees(3))
+        second.delete(created[0].employee_id)
+
+        events = first_feed.since(0)
+        assert [(event.seq, event.op) for event in events] == [(1, "create"), (2, "create"), (3, "create"), (4, "delete")]
+        assert events[1].employee == created[1]
+        assert events[3].employee_id == created[0].employee_id and events[3].employee is None
+        assert second_feed.since(0) == events
+        assert second_feed.last_seq == 4 and second_feed.is_current(first_feed.epoch, 0)
+        # The epoch survives a restart, so consumers carry on from where they were
+        restarted = SQLiteEmployeeStore(path)
+        assert SQLiteChangeFeed(restarted).epoch == first_feed.epoch
+        restarted.close()
+    finally:
+        first.close()
+        second.close()
+
+def test_sqlite_feed_wait_sees_other_processes_writes(tmp_path):
+    path = str(tmp_path / "employees.db")
+    writer, reader = SQLiteEmployeeStore(path), SQLiteEmployeeStore(path)
+    try:
+        feed = SQLiteChangeFeed(reader)
+        employee = sample_employees(1)[0]
+
+        async def scenario():
+            threading.Timer(0.05, writer.create, (employee,)).start()
+            # No local notification reaches `feed`: it must find the write itself
+            assert await feed.wait(0, 5)
+        asyncio.run(scenario())
+    finally:
+        writer.close()
+        reader.close()
+
+# Endpoints
+@pytest.mark.parametrize("event_id, expected", [
+    ("abcd1234:17", ("abcd1234", 17)),
+    ("abcd1234:0", ("abcd1234", 0)),
+    ("abcd1234:", None),
+    ("abcd1234:-1", None),
+    ("abcd1234:1e3", None),
+    ("17", None),
+    ("", None),
+])
+def test_parse_event_id(app_module, event_id, expected):
+    assert app_module.parse_event_id(event_id) == expected
+
+def test_long_poll_follows_writes(client, new_employee):
+    start = client.get("/employees/changes").json()
+    assert start["events"] == [] and not start["resync_required"]
+    employee_id = new_employee()["employee_id"]
+    client.put(f"/employees/{employee_id}/change-department", json={"department": "Followed"})
+
+    page = client.get("/employees/changes", params={"since": start["last_seq"], "epoch": start["epoch"]}).json()
+    assert not page["resync_required"]
+    assert [(event["op"], event["employee_id"]) for event in page["events"]] == \
+        [("create", employee_id), ("update", employee_id)]
+    assert page["events"][-1]["employee"]["department"] == "Followed"
+    assert page["last_seq"] == page["events"][-1]["seq"]
+
+@pytest.mark.parametrize("position", ["other epoch", "ahead of the feed"])
+def test_long_poll_tells_lost_consumers_to_resync(client, position):
+    start = client.get("/employees/changes").json()
+    params = {"since": 0, "epoch": "00000000"} if position == "other epoch" else \
+        {"since": start["last_seq"] + 100, "epoch": start["epoch"]}
+    page = client.get("/employees/changes", params=params).json()
+    assert page["resync_required"]
+    assert page["events"] == []
+    assert page["epoch"] == start["epoch"] and page["last_seq"] == start["last_seq"]
+
+def sse_events(response):
+    """(event type, data) of every event in a finished SSE response"""
+    events = []
+    for block in response.text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("event"), fields.get("data")))
+    return events
+
+@pytest.mark.parametrize("last_event_id", ["00000000:1", "{epoch}:{ahead}"])
+def test_stream_resyncs_on_a_stale_last_event_id(client, last_event_id):
+    start = client.get("/employees/changes").json()
+    last_event_id = last_event_id.format(epoch=start["epoch"], ahead=start["last_seq"] + 100)
+    # Last-Event-ID from another epoch, or past the feed: the stream sends
+    # a resync event and ends
+    response = client.get("/employees/changes/stream", headers={"Last-Event-ID": last_event_id})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert sse_events(response) == [("resync", json.dumps({"epoch": start["epoch"], "last_seq": start["last_seq"]}))]
+
+def test_stream_ignores_a_malformed_last_event_id(client):
+    start = client.get("/employees/changes").json()
+    # Unparseable, so ?since= applies (here, past the feed: resync at once)
+    response = client.get("/employees/changes/stream", params={"since": start["last_seq"] + 100},
+                          headers={"Last-Event-ID": "garbage"})
+    assert [event for event, data in sse_events(response)] == ["resync"]
@@ -0,0 +1,102 @@
+"""
+If-Match on the single-employee writes, and the optimistic retry loop behind
+them (main.modify_employee)
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import pytest
+
+from http_cache import if_match_matches
+
+def move(client, employee_id, department, if_match=None):
+    headers = {"If-Match": if_match} if if_match is not None else {}
+    return client.put(f"/employees/{employee_id}/change-department", json={"department": department}, headers=headers)
+
+@pytest.fixture
+def race(app_module, monkeypatch):
+    """
+    Makes the next `count` store updates of the endpoint lose a race: another
+    writer changes the employee's city between the endpoint's read and its
+    compare-and-set write
+    """
+    def arm(count=1):
+        update_employee = app_module.update_employee
+        calls = []
+
+        def racing_update(employee_id, changes, expected_version=None):
+            calls.append(expected_version)
+            if len(calls) <= count:
+                app_module.employees_db.update(employee_id, {"city": f"Raced {len(calls)}"})
+            return update_employee(employee_id, changes, expected_version)
+        monkeypatch.setattr(app_module, "update_employee", racing_update)
+        return calls
+    return arm
+
+def test_current_etag_applies_the_write(client, new_employee):
+    employee_id = new_employee()["employee_id"]
+    etag = client.get(f"/employees/{employee_id}").headers["etag"]
+
+    response = move(client, employee_id, "Matched", etag)
+    assert response.status_code == 200
+    # The response carries the new ETag, ready for the next conditional write
+    assert response.headers["etag"] == client.get(f"/employees/{employee_id}").headers["etag"] != etag
+    assert move(client, employee_id, "Again", response.headers["etag"]).status_code == 200
+
+def test_stale_etag_gets_412_and_changes_nothing(client, new_employee):
+    employee_id = new_employee()["employee_id"]
+    stale = client.get(f"/employees/{employee_id}").headers["etag"]
+    assert move(client, employee_id, "First", stale).status_code == 200
+
+    for endpoint in ("change-department", "resign"):
+        response = client.put(f"/employees/{employee_id}/{endpoint}", json={"department": "Second"},
+                              headers={"If-Match": stale})
+        assert response.status_code == 412
+    employee = client.get(f"/employees/{employee_id}").json()
+    assert employee["department"] == "First"
+    assert employee["status"] != "Resigned"
+
+def test_weak_etag_never_matches_if_match(client, new_employee):
+    employee_id = new_employee()["employee_id"]
+    etag = client.get(f"/employees/{employee_id}").headers["etag"]
+    assert move(client, employee_id, "Weak", f"W/{etag}").status_code == 412
+    assert move(client, employee_id, "Star", "*").status_code == 200
+
+def test_unknown_employee_is_404_not_412(client):
+    assert move(client, "EMP999999999", "Nowhere", '"x"').status_code == 404
+
+def test_lost_race_without_if_match_is_retried(client, new_employee, race):
+    employee_id = new_employee()["employee_id"]
+    calls = race(count=2)
+
+    response = move(client, employee_id, "Retried")
+    assert response.status_code == 200
+    # Two compare-and-set writes lost, the third (against a fresh read) won
+    assert len(calls) == 3 and calls[0] < calls[1] < calls[2]
+    employee = client.get(f"/employees/{employee_id}").json()
+    # Both writes survive: the retry started from the racing writer's record
+    assert employee["department"] == "Retried"
+    assert employee["city"] == "Raced 2"
+
+def test_lost_race_with_if_match_is_412(client, new_employee, race):
+    employee_id = new_employee()["employee_id"]
+    etag = client.get(f"/employees/{employee_id}").headers["etag"]
+    calls = race(count=1)
+
+    assert move(client, employee_id, "Conditional", etag).status_code == 412
+    assert len(calls) == 1
+    employee = client.get(f"/employees/{employee_id}").json()
+    assert employee["department"] != "Conditional"
+    assert employee["city"] == "Raced 1"
+
+@pytest.mark.parametrize("if_match, etag, expected", [
+    ('"a"', '"a"', True),
+    ('"b", "a"', '"a"', True),
+    ("*", '"a"', True),
+    ('W/"a"', '"a"', False),
+    ('"a"', 'W/"a"', False),
+    ('"b"', '"a"', False),
+])
+def test_if_match_matches(if_match, etag, expected):
+    assert if_match_matches(if_match, etag) is expected
@@ -0,0 +1,81 @@
+"""
+ETags and conditional reads (http_cache.py, GET /employees/...)
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import pytest
+
+from http_cache import content_etag, etag_matches
+
+def get(client, path, etag=None, **params):
+    headers = {"If-None-Match": etag} if etag is not None else {}
+    return client.get(path, headers=headers, params=params)
+
+def test_matching_etag_gets_304(client, new_employee):
+    path = f"/employees/{new_employee()['employee_id']}"
+    first = get(client, path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    not_modified = get(client, path, etag)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+    # Weak forms, lists and * match too (If-None-Match compares weakly)
+    for if_none_match in (f"W/{etag}", f'"other", {etag}', "*"):
+        assert get(client, path, if_none_match).status_code == 304
+    assert get(client, path, '"other"').status_code == 200
+
+def test_other_employees_writes_keep_the_etag_valid(client, new_employee):
+    employee_id, other_id = new_employee()["employee_id"], new_employee()["employee_id"]
+    path = f"/employees/{employee_id}"
+    etag = get(client, path).headers["etag"]
+
+    client.put(f"/employees/{other_id}/change-department", json={"department": "Elsewhere"})
+    assert get(client, path, etag).status_code == 304
+
+    client.put(f"/employees/{employee_id}/change-department", json={"department": "Moved"})
+    changed = get(client, path, etag)
+    assert changed.status_code == 200
+    assert changed.json()["department"] == "Moved"
+    assert changed.headers["etag"] != etag
+    assert get(client, path, changed.headers["etag"]).status_code == 304
+
+def test_any_write_changes_the_collection_etag(client, new_employee):
+    employee_id = new_employee()["employee_id"]
+    listing = get(client, "/employees/", limit=5)
+    etag = listing.headers["etag"]
+    assert get(client, "/employees/", etag, limit=5).status_code == 304
+
+    client.put(f"/employees/{employee_id}/change-department", json={"department": "Listed"})
+    assert get(client, "/employees/", etag, limit=5).status_code == 200
+
+def test_unknown_employee_is_404_whatever_the_precondition(client):
+    for etag in (None, "*", '"0-r0"'):
+        assert get(client, "/employees/EMP999999999", etag).status_code == 404
+
+def test_cached_body_matches_a_fresh_render(app_module, client, new_employee):
+    path = f"/employees/{new_employee()['employee_id']}"
+    hits = app_module.response_cache.hits
+    first, second = get(client, path), get(client, path)
+    assert app_module.response_cache.hits > hits
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+
+@pytest.mark.parametrize("if_none_match, etag, expected", [
+    ('"a"', '"a"', True),
+    ('W/"a"', '"a"', True),
+    ('"a"', 'W/"a"', True),
+    (' "b" , "a" ', '"a"', True),
+    ("*", '"a"', True),
+    ('"b"', '"a"', False),
+    ('"a-r1"', '"a-r10"', False),
+])
+def test_etag_matches(if_none_match, etag, expected):
+    assert etag_matches(if_none_match, etag) is expected
+
+def test_content_etag_depends_only_on_the_body():
+    assert content_etag(b"{}") == content_etag(b"{}")
+    assert content_etag(b"{}") != content_etag(b"[]")
@@ -0,0 +1,125 @@
+"""
+Streaming employee file parser (migrate_data.iter_employee_file and
+stream_employees)
+
+The parser reads READ_BLOCK_SIZE bytes at a time; the tests shrink the block
+size so every record, number, string escape and multi-byte character ends up
+split across blocks somewhere.
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import json
+import logging
+import os
+
+import pytest
+
+import migrate_data
+from migrate_data import iter_employee_file, stream_employees
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_employees.json")
+
+# Records with the awkward parts: brackets, commas and escaped quotes inside
+# strings, multi-byte characters, numbers of every shape, nesting, and empties
+RECORDS = [
+    {"employee_id": "EMP1", "name": "Zoë Ångström", "salary": 123456.75, "note": "a, b] c\" d\\"},
+    {"employee_id": "EMP2", "salary": 1e-3, "count": -42, "flags": [True, False, None], "nested": {"x": [1, [2]]}},
+    {},
+    {"employee_id": "EMP3", "emoji": "\U0001F600 é中", "salary": 100000},
+]
+
+BLOCK_SIZES = [1, 2, 3, 5, 8, 64, 1 << 20]
+
+@pytest.fixture(params=BLOCK_SIZES)
+def block_size(request, monkeypatch):
+    monkeypatch.setattr(migrate_data, "READ_BLOCK_SIZE", request.param)
+    return request.param
+
+def write(tmp_path, text, name="employees.json", bom=False):
+    path = tmp_path / name
+    path.write_bytes((b"\xef\xbb\xbf" if bom else b"") + text.encode())
+    return str(path)
+
+ARRAY_LAYOUTS = {
+    "compact": json.dumps(RECORDS, separators=(",", ":"), ensure_ascii=False),
+    "pretty": json.dumps(RECORDS, indent=2, ensure_ascii=False),
+    "padded": "\r\n  [ " + " ,\r\n ".join(json.dumps(record, ensure_ascii=False) for record in RECORDS) + " ]\r\n\r\n",
+}
+
+@pytest.mark.parametrize("layout", ARRAY_LAYOUTS)
+@pytest.mark.parametrize("bom", [False, True])
+def test_json_array(tmp_path, block_size, layout, bom):
+    path = write(tmp_path, ARRAY_LAYOUTS[layout], bom=bom)
+    assert list(iter_employee_file(path)) == RECORDS
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+@pytest.mark.parametrize("bom", [False, True])
+@pytest.mark.parametrize("trailer", ["", "\n", "\n\n  \n"])
+def test_ndjson(tmp_path, block_size, newline, bom, trailer):
+    lines = [json.dumps(record, ensure_ascii=False) for record in RECORDS]
+    # Blank lines between records are skipped
+    text = newline.join(lines[:2] + ["", "  "] + lines[2:]) + trailer.replace("\n", newline)
+    path = write(tmp_path, text, bom=bom)
+    assert list(iter_employee_file(path)) == RECORDS
+
+@pytest.mark.parametrize("text", ["[]", " [ ] \n", "", "\n\n"])
+def test_no_employees(tmp_path, block_size, text):
+    assert list(iter_employee_file(write(tmp_path, text))) == []
+
+@pytest.mark.parametrize("text, message", [
+    ('[{"a": 1}] x', "after the employee array"),
+    ('[{"a": 1}]\n[{"b": 2}]', "after the employee array"),
+    ('[{"a": 1} {"b": 2}]', "Expected ',' or ']'"),
+    ('[{"a": 1},', "end of file"),
+    ('[{"a": 1}', "end of file"),
+    ('[{"a": 1}, {"b": ', ""),
+    ('[{"a": 1}, ]', ""),
+    ('[{"a": 12x}]', ""),
+    ('{"a": 1}\n{"b": \n', ""),
+    ('{"a": 1}\nnot json\n', ""),
+])
+def test_malformed_files_raise(tmp_path, block_size, text, message):
+    with pytest.raises(ValueError, match=message):
+        list(iter_employee_file(write(tmp_path, text)))
+
+def test_records_before_an_error_are_still_yielded(tmp_path, block_size):
+    path = write(tmp_path, json.dumps(RECORDS[:2])[:-1] + ', {"broken": }]')
+    records = iter_employee_file(path)
+    assert [next(records), next(records)] == RECORDS[:2]
+    with pytest.raises(ValueError):
+        next(records)
+
+def test_ndjson_and_array_give_the_same_employees(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrate_data, "READ_BLOCK_SIZE", 97)
+    with open(SAMPLE_FILE, encoding="utf-8") as sample:
+        records = json.load(sample)
+    ndjson = write(tmp_path, "\r\n".join(json.dumps(record) for record in records) + "\r\n", "employees.ndjson", bom=True)
+    from_array = list(stream_employees(SAMPLE_FILE, generate_if_missing=False))
+    assert list(stream_employees(ndjson, generate_if_missing=False)) == from_array
+    assert len(from_array) == len(records)
+
+def test_legacy_records_are_converted(tmp_path):
+    employee = next(stream_employees(SAMPLE_FILE, generate_if_missing=False)).model_dump(mode="json")
+    legacy = {key: value for key, value in employee.items() if key not in ("first_name", "last_name")}
+    legacy.update(name="Ada King Lovelace", is_active=True)
+    converted = next(stream_employees(write(tmp_path, json.dumps([legacy])), generate_if_missing=False))
+    assert (converted.first_name, converted.last_name, converted.is_active) == ("Ada", "King Lovelace", 1)
+
+def test_invalid_record_is_named(tmp_path):
+    employee = next(stream_employees(SAMPLE_FILE, generate_if_missing=False)).model_dump(mode="json")
+    path = write(tmp_path, json.dumps([employee, employee, {**employee, "salary": "lots"}]))
+    with pytest.raises(ValueError, match=r"employees\.json: employee 3: "):
+        list(stream_employees(path, generate_if_missing=False))
+    with pytest.raises(ValueError, match="employee 1: expected a JSON object, found list"):
+        list(stream_employees(write(tmp_path, "[[1, 2]]"), generate_if_missing=False))
+
+def test_progress_is_logged(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(migrate_data, "PROGRESS_EVERY", 2)
+    path = write(tmp_path, "\n".join(json.dumps(record) for record in RECORDS))
+    with caplog.at_level(logging.INFO, logger="migrate_data"):
+        assert len(list(iter_employee_file(path))) == len(RECORDS)
+    messages = [record.getMessage() for record in caplog.records if record.name == "migrate_data"]
+    assert messages[:2] == [f"Loading {path}: 2 employees (100%)", f"Loading {path}: 4 employees (100%)"]
+    assert messages[-1] == f"Loaded {len(RECORDS)} employees from {path}"
@@ -0,0 +1,86 @@
+"""
+Keyset pagination of GET /employees/ (cursor=...)
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from store import employee_sort_key
+
+def walk(client, limit, between_pages=lambda page: None, **filters):
+    """IDs of every page of a cursor walk, calling between_pages after each"""
+    found, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/employees/", params={"cursor": cursor, "limit": limit, **filters})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        found.extend(employee["employee_id"] for employee in page["items"])
+        cursor = page["next_cursor"]
+        between_pages(page)
+    return found
+
+@pytest.mark.parametrize("employee_id", ["EMP1001", "EMP123456789", "X-1/2+3?", "é"])
+def test_cursor_round_trip(app_module, employee_id):
+    cursor = app_module.encode_cursor(employee_id)
+    # Safe in a query string as-is: base64url without padding
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert app_module.decode_cursor(cursor) == employee_id
+
+def test_empty_cursor_starts_from_the_first_page(app_module, client):
+    assert app_module.decode_cursor("") is None
+    first = client.get("/employees/", params={"cursor": "", "limit": 3}).json()
+    assert [employee["employee_id"] for employee in first["items"]] == \
+        [employee["employee_id"] for employee in client.get("/employees/", params={"limit": 3}).json()]
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",                                                    # outside the base64url alphabet
+    "RU1QMTAwMQ=x",                                                   # padding in the middle
+    base64.urlsafe_b64encode(b"\xff\xfe").decode().rstrip("="),       # not UTF-8
+    "A",                                                              # truncated
+])
+def test_tampered_cursor_is_rejected(app_module, client, cursor):
+    with pytest.raises(HTTPException) as raised:
+        app_module.decode_cursor(cursor)
+    assert raised.value.status_code == 400
+    response = client.get("/employees/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_walk_is_stable_while_employees_are_added_and_removed(app_module, client, new_employee):
+    before = [employee.employee_id for employee in app_module.employees_db.snapshot()]
+    added, removed = [], []
+
+    def write(page):
+        # New IDs sort after every page handed out so far, so each one must
+        # turn up exactly once; a removed employee the walk has not reached
+        # must not turn up at all
+        if page["next_cursor"] is None:
+            return
+        added.append(new_employee()["employee_id"])
+        last = page["items"][-1]["employee_id"]
+        ahead = [employee_id for employee_id in before
+                 if employee_sort_key(employee_id) > employee_sort_key(last) and employee_id not in removed]
+        if len(ahead) > 1:
+            removed.append(ahead[1])
+            # There is no DELETE endpoint; remove it through the store
+            assert app_module.employees_db.delete(ahead[1])
+
+    found = walk(client, 7, write)
+    assert added and removed
+    assert found == sorted(set(found), key=employee_sort_key)
+    assert found == [employee.employee_id for employee in app_module.employees_db.snapshot()]
+    assert set(added) <= set(found)
+    assert not set(removed) & set(found)
+
+def test_filtered_walk_matches_the_filtered_list(client, new_employee):
+    for _ in range(3):
+        new_employee(department="Paging")
+    expected = [employee["employee_id"] for employee in
+                client.get("/employees/", params={"department": "Paging", "limit": 1000}).json()]
+    assert len(expected) >= 3
+    assert walk(client, 2, department="Paging") == expected
@@ -0,0 +1,145 @@
+"""
+Crash recovery of the write-ahead log and snapshots (persistence.py)
+
+Each test writes through an EmployeePersistence, leaves its data directory
+the way a crash would, and checks what a fresh instance recovers from it.
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+from itertools import islice
+
+import pytest
+
+from migrate_data import stream_employees
+from persistence import (
+    ROTATED_WAL_FILE, WAL_FILE, EmployeePersistence, WriteAheadLogFailed, encode_log_line, replay_log,
+)
+from store import CompactEmployeeStore, EmployeeStore
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_employees.json")
+
+def sample_employees(count=10):
+    return list(islice(stream_employees(SAMPLE_FILE, generate_if_missing=False), count))
+
+def open_store(data_dir, store_class=EmployeeStore):
+    persistence = EmployeePersistence(str(data_dir), store_class=store_class)
+    return persistence, persistence.open(sample_employees)
+
+def crash(persistence):
+    """Stop without the final snapshot, as if the process had died"""
+    persistence.sync().result()
+    persistence.close(compact=False)
+
+def log_lines(data_dir, name=WAL_FILE):
+    with open(os.path.join(data_dir, name), "rb") as log_file:
+        return log_file.readlines()
+
+def test_torn_last_line_is_truncated(tmp_path):
+    persistence, store = open_store(tmp_path)
+    first = store.create(sample_employees(1)[0])
+    store.update(first.employee_id, {"department": "Logged"})
+    crash(persistence)
+    wal_path = tmp_path / WAL_FILE
+    intact_size = wal_path.stat().st_size
+    # An append cut short by the crash: no newline, so no complete entry
+    with open(wal_path, "ab") as log_file:
+        log_file.write(encode_log_line('{"seq":99,"op":"delete","employee_id":"%s"}' % first.employee_id)[:-5])
+
+    persistence, store = open_store(tmp_path)
+    assert store.get(first.employee_id).department == "Logged"
+    assert wal_path.stat().st_size == intact_size
+    # The log carries on cleanly after the truncated tail
+    store.update(first.employee_id, {"department": "After"})
+    crash(persistence)
+    persistence, store = open_store(tmp_path)
+    assert store.get(first.employee_id).department == "After"
+    crash(persistence)
+
+def test_crc_mismatch_stops_replay(tmp_path):
+    persistence, store = open_store(tmp_path)
+    employee_id = store.snapshot()[0].employee_id
+    for department in ("One", "Two", "Three"):
+        store.update(employee_id, {"department": department})
+    crash(persistence)
+    lines = log_lines(tmp_path)
+    assert len(lines) == 3
+    # Flip a byte inside the second entry's JSON, keeping its checksum
+    lines[1] = lines[1].replace(b"Two", b"Twx")
+    with open(tmp_path / WAL_FILE, "wb") as log_file:
+        log_file.writelines(lines)
+
+    assert replay_log(str(tmp_path / WAL_FILE), lambda entry: None) == len(lines[0])
+    persistence, store = open_store(tmp_path)
+    # Nothing from the corrupt entry on is applied, and it is cut off
+    assert store.get(employee_id).department == "One"
+    assert (tmp_path / WAL_FILE).stat().st_size == len(lines[0])
+    crash(persistence)
+
+def test_rotated_log_left_by_interrupted_snapshot_is_replayed(tmp_path):
+    persistence, store = open_store(tmp_path)
+    employee_id = store.snapshot()[0].employee_id
+    store.update(employee_id, {"department": "Rotated"})
+    created = store.create(sample_employees(1)[0])
+    # The compactor rotated the log, then died before writing the snapshot
+    persistence._wal.rotate().result()
+    store.update(created.employee_id, {"department": "Current"})
+    crash(persistence)
+    assert (tmp_path / ROTATED_WAL_FILE).exists()
+
+    persistence, store = open_store(tmp_path)
+    assert store.get(employee_id).department == "Rotated"
+    assert store.get(created.employee_id).department == "Current"
+    # The next snapshot folds both logs in and removes the rotated one
+    persistence.compact()
+    assert not (tmp_path / ROTATED_WAL_FILE).exists()
+    crash(persistence)
+    persistence, store = open_store(tmp_path)
+    assert store.get(created.employee_id).department == "Current"
+    crash(persistence)
+
+@pytest.mark.parametrize("store_class", [EmployeeStore, CompactEmployeeStore])
+def test_id_allocator_recovers_last_number_from_log(tmp_path, store_class):
+    persistence, store = open_store(tmp_path, store_class)
+    created = store.create_many(sample_employees(3))
+    last_number = store.last_number
+    # The newest employee only exists in the log, as a create and a delete
+    store.delete(created[-1].employee_id)
+    crash(persistence)
+
+    persistence, store = open_store(tmp_path, store_class)
+    assert created[-1].employee_id not in store
+    assert store.last_number == last_number
+    assert store.create(sample_employees(1)[0]).employee_id == f"EMP{last_number + 1}"
+    crash(persistence)
+
+def test_failed_flush_poisons_the_log(tmp_path, monkeypatch):
+    persistence, store = open_store(tmp_path)
+    employee_id = store.snapshot()[0].employee_id
+    store.update(employee_id, {"department": "Durable"})
+    persistence.sync().result()
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    store.update(employee_id, {"department": "Lost"})
+    with pytest.raises(OSError):
+        persistence.sync().result()
+    monkeypatch.undo()
+
+    # Nothing more is logged or snapshotted once a flush has failed
+    assert persistence.failure is not None
+    store.update(employee_id, {"department": "Refused"})
+    with pytest.raises(WriteAheadLogFailed):
+        persistence.sync().result()
+    with pytest.raises(WriteAheadLogFailed):
+        persistence.compact()
+    persistence.close()
+    assert all(b"Refused" not in line for line in log_lines(tmp_path))
+
+    persistence, store = open_store(tmp_path)
+    assert persistence.failure is None
+    assert store.get(employee_id).department in ("Durable", "Lost")
+    crash(persistence)
@@ -0,0 +1,116 @@
+"""
+Filtered queries of the employee stores (store.py, sqlite_store.py)
+
+find() and filtered page() are checked against a brute-force filter over a
+snapshot, on the in-memory store (model and compact records) and on SQLite,
+before and after writes that move employees between index keys.
+
+Run from the repository root:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import heapq
+import os
+from itertools import islice
+
+import pytest
+
+from migrate_data import stream_employees
+from models import RoleType, StatusType
+from sqlite_store import SQLiteEmployeeStore
+from store import CompactEmployeeStore, EmployeeStore, employee_sort_key, index_key
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_employees.json")
+
+# Filter combinations covering one index, intersections of several, enum
+# members and their string values, ignored None values and empty results
+FILTERS = [
+    {"department": "Data"},
+    {"status": StatusType.employed},
+    {"status": "Employed", "department": "HR"},
+    {"department": "Design", "employment_type": "Intern", "is_active": 1},
+    {"role": RoleType.developer, "status": None},
+    {"department": "Sales", "role": "CFO", "status": "Resigned"},
+    {"department": "No such department"},
+    {"status": None},
+]
+
+def sample_employees(count=100):
+    return list(islice(stream_employees(SAMPLE_FILE, generate_if_missing=False), count))
+
+@pytest.fixture(params=["model", "compact", "sqlite"])
+def store(request, tmp_path):
+    employees = sample_employees()
+    if request.param == "sqlite":
+        store = SQLiteEmployeeStore(str(tmp_path / "employees.db"), seed=lambda: employees)
+        yield store
+        store.close()
+    else:
+        yield {"model": EmployeeStore, "compact": CompactEmployeeStore}[request.param](employees)
+
+def brute_force(store, filters):
+    """IDs of the employees matching `filters`, in ID order, by a full scan"""
+    wanted = {field: index_key(value) for field, value in filters.items() if value is not None}
+    employees = sorted(store.snapshot(), key=lambda employee: employee_sort_key(employee.employee_id))
+    return [employee.employee_id for employee in employees
+            if all(index_key(getattr(employee, field)) == value for field, value in wanted.items())]
+
+def ids(employees):
+    return [employee.employee_id for employee in employees]
+
+def walk_pages(store, filters, limit):
+    found, cursor = [], None
+    while True:
+        page, cursor = store.page(cursor, limit, filters)
+        found.extend(ids(page))
+        if cursor is None:
+            return found
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_find_matches_brute_force(store, filters):
+    expected = brute_force(store, filters)
+    assert ids(store.find(filters, limit=1000)) == expected
+    for skip, limit in ((0, 1), (0, 5), (3, 4), (len(expected), 10)):
+        assert ids(store.find(filters, skip=skip, limit=limit)) == expected[skip:skip + limit]
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_filtered_pages_match_brute_force(store, filters):
+    expected = brute_force(store, filters)
+    for limit in (1, 7, 1000):
+        assert walk_pages(store, filters, limit) == expected
+
+def test_indexes_follow_writes(store):
+    employees = list(store.snapshot())
+    moved, resigned, deleted = employees[0], employees[1], employees[2]
+    store.update(moved.employee_id, {"department": "Legal"})
+    store.update(resigned.employee_id, {"status": "Resigned", "department": "Legal"})
+    store.delete(deleted.employee_id)
+    # Stores allocate the new ID themselves, whatever the record carries
+    created = store.create({**employees[3].model_dump(), "department": "Legal"})
+
+    for filters in ({"department": "Legal"}, {"department": moved.department},
+                    {"department": "Legal", "status": "Resigned"}, {"department": deleted.department}):
+        assert ids(store.find(filters, limit=1000)) == brute_force(store, filters)
+    assert ids(store.find({"department": "Legal"})) == [moved.employee_id, resigned.employee_id, created.employee_id]
+
+def test_sparse_matches_picked_from_the_smallest_posting_set(store, monkeypatch):
+    # A department only the last few employees are in: walking the ID order
+    # from the start would pass over most of the store to find them
+    late = list(store.snapshot())[-3:]
+    for employee in late:
+        store.update(employee.employee_id, {"department": "Rare"})
+    picked = []
+    nsmallest = heapq.nsmallest
+    monkeypatch.setattr(heapq, "nsmallest", lambda *args, **kwargs: picked.append(args) or nsmallest(*args, **kwargs))
+
+    for filters in ({"department": "Rare"}, {"department": "Rare", "status": late[-1].status}):
+        expected = brute_force(store, filters)
+        assert ids(store.find(filters, limit=10)) == expected
+        assert ids(store.find(filters, skip=1, limit=1)) == expected[1:2]
+        assert walk_pages(store, filters, 2) == expected
+    if not isinstance(store, SQLiteEmployeeStore):
+        assert picked
+
+def test_unknown_filter_field_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.find({"first_name": "Ann"})
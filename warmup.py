@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from models import Employee
+from store import EmployeeStore
+
+logger = logging.getLogger(__name__)
+
+# A component derived from the store (the search index, the aggregates:
+# anything built from a list of employees and then kept current through
+# on_change), built either right away or on a background thread so the app
+# can serve while it warms up.
+#
+# The store hands over its snapshot and subscribes the component in one step,
+# so the writes the snapshot misses are exactly those it is told about. While
+# the component is being built they queue up here; they are applied in order
+# once it is ready, and from then on every change goes straight to it.
+class WarmIndex:
+    def __init__(self, name: str, build: Callable[[Sequence[Employee]], object]):
+        self.name = name
+        self._build = build
+        self._index = None
+        self._pending: Optional[List[tuple]] = []  # None once a build has failed
+        self._lock = threading.Lock()
+        # Resolves to the component once it is built
+        self.ready: Future = Future()
+
+    @property
+    def index(self) -> Optional[object]:
+        """The component, or None while it is still being built"""
+        return self._index
+
+    async def wait(self):
+        """The component, once it is built (for async callers)"""
+        if self._index is not None:
+            return self._index
+        return await asyncio.wrap_future(self.ready)
+
+    def on_change(self, operation: str, old: Optional[Employee], new: Optional[Employee]) -> None:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    if self._pending is not None:
+                        self._pending.append((operation, old, new))
+                    return
+        self._index.on_change(operation, old, new)
+
+    def start(self, store: EmployeeStore, background: bool = False) -> None:
+        """Subscribe to `store` and build the component, here or on a background thread"""
+        employees = store.subscribe_with_snapshot(self.on_change)
+        if background:
+            threading.Thread(target=self._run, args=(employees,), name=f"warm-{self.name}", daemon=True).start()
+        else:
+            self._run(employees)
+
+    def _run(self, employees: List[Employee]) -> None:
+        started = time.perf_counter()
+        try:
+            index = self._build(employees)
+        except BaseException as exc:
+            logger.exception("Building the %s failed", self.name)
+            with self._lock:
+                self._pending = None
+            self.ready.set_exception(exc)
+            return
+        with self._lock:
+            for change in self._pending:
+                index.on_change(*change)
+            self._pending = []
+            self._index = index
+        self.ready.set_result(index)
+        logger.info("Built the %s over %d employees in %.1f s", self.name, len(employees),
+                    time.perf_counter() - started)
+
+# A component rebuilt from a snapshot whenever the store's data version has
+# moved since it was built. For the SQLite backend, where other workers write
+# too and subscribing would only hear about this process's writes: requests
+# between writes share one build instead of each building their own. Call
+# `current` off the event loop.
+class VersionedIndex:
+    def __init__(self, name: str, build: Callable[[Iterable[Employee]], object], store):
+        self.name = name
+        self._build = build
+        self._store = store
+        self._built: Tuple[Optional[object], Optional[int]] = (None, None)
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> Optional[object]:
+        """The last component built, or None before the first request"""
+        return self._built[0]
+
+    def current(self):
+        """The component, rebuilt first if the store has changed since"""
+        version = self._store.data_version()
+        index, built_version = self._built
+        if built_version == version:
+            return index
+        # One rebuild at a time; requests waiting on it reuse the result
+        with self._lock:
+            index, built_version = self._built
+            if built_version == version:
+                return index
+            # Read before the snapshot, so a write in between only costs
+            # another rebuild
+            version = self._store.data_version()
+            index = self._build(self._store.snapshot())
+            self._built = (index, version)
+        return index